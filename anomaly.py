@@ -0,0 +1,217 @@
+from collections import deque
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from fleet_metrics import METRIC_COLUMNS
+
+DEFAULT_ANOMALY_DETECTION = {
+    'alpha': 0.05,
+    'threshold': 4.0,
+    'clip': 3.0,
+    'cusum_drift': 0.5,
+    'cusum_threshold': 8.0,
+    'warmup': 30,
+    'min_scale': 1e-3
+}
+
+
+class StreamingDetector:
+    """Anomaly detection for many series at once, O(1) state per series.
+
+    Each series keeps an EWMA mean and variance plus a two-sided CUSUM of
+    its standardized residuals, all as NumPy arrays, so one `update` call
+    advances any subset of series in a single vectorized pass. A sample is
+    a spike (or drop) when it sits more than `threshold` standard
+    deviations from the mean; the CUSUM catches smaller shifts that
+    persist. Samples feed the baseline winsorized at `clip` deviations, so
+    a spike does not drag the mean and variance up with it and the next
+    normal sample is not flagged as a drop.
+    """
+
+    def __init__(self, size, alpha=0.05, threshold=4.0, clip=3.0, cusum_drift=0.5, cusum_threshold=8.0,
+                 warmup=30, min_scale=1e-3):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.clip = clip
+        self.cusum_drift = cusum_drift
+        self.cusum_threshold = cusum_threshold
+        self.warmup = warmup
+        self.min_scale = min_scale
+        self.mean = np.zeros(size)
+        self.var = np.zeros(size)
+        self.count = np.zeros(size, dtype=np.int64)
+        self.cusum_high = np.zeros(size)
+        self.cusum_low = np.zeros(size)
+        self.last_score = np.zeros(size)
+
+    def __len__(self):
+        return len(self.mean)
+
+    @property
+    def ready(self):
+        """True for series past their warmup"""
+        return self.count >= self.warmup
+
+    def reset(self, rows):
+        """Forget the state of `rows`, e.g. when a slot is reused for a new series"""
+        for name in ('mean', 'var', 'count', 'cusum_high', 'cusum_low', 'last_score'):
+            getattr(self, name)[rows] = 0
+
+    def resize(self, size):
+        """Grow (or shrink) to `size` series; existing rows keep their state"""
+        for name in ('mean', 'var', 'count', 'cusum_high', 'cusum_low', 'last_score'):
+            old = getattr(self, name)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:min(size, len(old))] = old[:size]
+            setattr(self, name, new)
+
+    def _scale(self, rows):
+        # Floors keep a flat series (variance 0) from turning noise into huge scores
+        return np.maximum(np.sqrt(self.var[rows]), np.maximum(self.min_scale, 0.01 * np.abs(self.mean[rows])))
+
+    def score(self, values, rows=slice(None)):
+        """Standardized distance of `values` from the baseline, without updating anything"""
+        return (np.asarray(values, dtype=np.float64) - self.mean[rows]) / self._scale(rows)
+
+    def update(self, values, rows=slice(None)):
+        """Feed one sample to each series in `rows`; returns (scores, spike codes, shift codes).
+
+        Codes are +1 (up), -1 (down) or 0, and always 0 while a series has
+        fewer than `warmup` samples.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        count = self.count[rows]
+        fresh = count == 0
+        warm = count >= self.warmup
+
+        scores = np.where(fresh, 0.0, self.score(values, rows))
+        spikes = np.where(warm & (np.abs(scores) > self.threshold), np.sign(scores), 0).astype(np.int8)
+
+        # The CUSUM sees winsorized scores, so a lone spike cannot pass for a level shift,
+        # and only starts once the baseline has settled
+        clipped_scores = np.clip(scores, -self.clip, self.clip)
+        high = np.where(warm, np.maximum(0.0, self.cusum_high[rows] + clipped_scores - self.cusum_drift), 0.0)
+        low = np.where(warm, np.maximum(0.0, self.cusum_low[rows] - clipped_scores - self.cusum_drift), 0.0)
+        shifts = np.where(high > self.cusum_threshold, 1, np.where(low > self.cusum_threshold, -1, 0)).astype(np.int8)
+        # A detected shift restarts the CUSUM, so one level change raises one event
+        self.cusum_high[rows] = np.where(shifts != 0, 0.0, high)
+        self.cusum_low[rows] = np.where(shifts != 0, 0.0, low)
+
+        mean = np.where(fresh, values, self.mean[rows])
+        clipped = np.where(fresh, values, mean + clipped_scores * self._scale(rows))
+        diff = clipped - mean
+        increment = self.alpha * diff
+        self.mean[rows] = mean + increment
+        self.var[rows] = np.where(fresh, 0.0, (1 - self.alpha) * (self.var[rows] + diff * increment))
+        self.count[rows] = count + 1
+        self.last_score[rows] = scores
+        return scores, spikes, shifts
+
+
+def event_kind(spike, shift):
+    if spike:
+        return 'spike' if spike > 0 else 'drop'
+    return 'shift_up' if shift > 0 else 'shift_down'
+
+
+@dataclass(frozen=True)
+class AnomalyEvent:
+    """One detected anomaly on one series"""
+    timestamp: float
+    series: str  # server id, or 'traffic'
+    metric: str
+    kind: str  # 'spike', 'drop', 'shift_up' or 'shift_down'
+    value: float
+    baseline: float
+    score: float
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def detector_params(config):
+    """StreamingDetector keyword arguments from an anomaly_detection config section"""
+    config = {**DEFAULT_ANOMALY_DETECTION, **(config or {})}
+    return {name: config[name] for name in DEFAULT_ANOMALY_DETECTION}
+
+
+class AnomalyMonitor:
+    """Runs a StreamingDetector over every server x metric of the fleet.
+
+    `observe` is a snapshot listener: it feeds only the servers whose
+    metrics were updated since the last snapshot, realigns state when
+    membership changes, and calls each of `listeners` with the list of
+    events found. Traffic anomalies come from the predictor's own detector
+    through `publish`. Recent events are kept for the API.
+    """
+
+    def __init__(self, config=None, history=200):
+        config = config or {}
+        self.metrics = tuple(config.get('metrics', METRIC_COLUMNS))
+        self._params = detector_params(config)
+        self.fleet_detector = StreamingDetector(0, **self._params)
+        self.server_ids = ()
+        self.last_update = np.zeros(0)
+        self.listeners = []
+        self.events = deque(maxlen=history)
+
+    def _realign(self, fleet):
+        """Map detector rows onto a fleet with different members; kept servers keep their state"""
+        width = len(self.metrics)
+        old_slots = {server_id: slot for slot, server_id in enumerate(self.server_ids)}
+        kept = [(slot, old_slots[server_id]) for slot, server_id in enumerate(fleet.server_ids)
+                if server_id in old_slots]
+        detector = StreamingDetector(len(fleet) * width, **self._params)
+        last_update = np.zeros(len(fleet))
+        if kept:
+            new_slots, old = map(np.array, zip(*kept))
+            new_rows = (new_slots[:, None] * width + np.arange(width)).ravel()
+            old_rows = (old[:, None] * width + np.arange(width)).ravel()
+            for name in ('mean', 'var', 'count', 'cusum_high', 'cusum_low', 'last_score'):
+                getattr(detector, name)[new_rows] = getattr(self.fleet_detector, name)[old_rows]
+            last_update[new_slots] = self.last_update[old]
+        self.fleet_detector = detector
+        self.last_update = last_update
+        self.server_ids = fleet.server_ids
+
+    def observe_fleet(self, fleet):
+        """Feed updated servers' metrics; returns the events found"""
+        if fleet.server_ids is not self.server_ids:
+            self._realign(fleet)
+        slots = np.flatnonzero(fleet.last_update > self.last_update)
+        if not len(slots):
+            return []
+        self.last_update = np.maximum(self.last_update, fleet.last_update)
+        width = len(self.metrics)
+        values = np.column_stack([fleet.columns[name][slots] for name in self.metrics]).ravel()
+        rows = (slots[:, None] * width + np.arange(width)).ravel()
+        baseline = self.fleet_detector.mean[rows]
+        scores, spikes, shifts = self.fleet_detector.update(values, rows)
+
+        events = []
+        for index in np.flatnonzero((spikes != 0) | (shifts != 0)).tolist():
+            slot, metric = divmod(int(rows[index]), width)
+            events.append(AnomalyEvent(
+                float(fleet.last_update[slot]), fleet.server_ids[slot], self.metrics[metric],
+                event_kind(spikes[index], shifts[index]),
+                float(values[index]), float(baseline[index]), float(scores[index])
+            ))
+        return events
+
+    def observe(self, snapshot):
+        """Snapshot listener: detect on the fleet samples that are new in `snapshot`"""
+        events = self.observe_fleet(snapshot.fleet)
+        self.publish(events)
+        return events
+
+    def publish(self, events):
+        if not events:
+            return
+        self.events.extend(events)
+        for listener in self.listeners:
+            listener(events)
+
+    def recent(self, limit=None):
+        events = list(self.events)
+        return events[-limit:] if limit else events
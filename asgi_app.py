@@ -0,0 +1,149 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from urllib.parse import parse_qs
+
+from consistent_hash import DEFAULT_KEY_HEADER
+from metrics_export import OPENMETRICS_TYPE, PROMETHEUS_TYPE, wants_openmetrics
+
+
+def json_default(value):
+    # Same rendering Flask's jsonify uses for datetimes
+    if isinstance(value, datetime):
+        return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def json_body(data):
+    return json.dumps(data, default=json_default).encode()
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def create_asgi_app(balancer, key_header=DEFAULT_KEY_HEADER):
+    """ASGI app serving the hot routing endpoints (/route, /route/complete, /predict, /metrics).
+
+    `balancer` is anything with the PredictiveLoadBalancer routing interface:
+    `snapshot`, `choose_server`, `in_flight` and `route_leases`. Every
+    handler works from one published snapshot, so no request waits on the
+    balancer's state lock. Responses match the Flask endpoints of the same
+    name. A routing key for sticky routing is read from ?key= or the
+    `key_header` request header. A /metrics request accepting OpenMetrics
+    or text/plain is streamed in the exposition format when the balancer
+    has `render_metrics`.
+    """
+    header_name = key_header.lower().encode('latin-1')
+
+    def route(query, headers):
+        snapshot = balancer.snapshot
+        key = query.get('key', [None])[0]
+        if key is None:
+            key = next((value.decode('latin-1') for name, value in headers if name == header_name), None)
+        try:
+            best_server, strategy = balancer.choose_server(
+                query.get('path', ['/'])[0], query.get('strategy', [None])[0], key
+            )
+        except ValueError as e:
+            return 400, {'error': str(e)}
+
+        if not best_server:
+            return 503, {'error': 'No healthy servers available'}
+
+        token = balancer.route_leases.issue(best_server)
+        return 200, {
+            'server': best_server,
+            'strategy': strategy,
+            'token': token,
+            'token_ttl': balancer.route_leases.ttl,
+            'current_traffic': snapshot.current_traffic,
+            'message': f'Request routed to {best_server}'
+        }
+
+    def route_complete(query, body):
+        token = query.get('token', [None])[0]
+        if not token and body:
+            try:
+                token = json.loads(body).get('token')
+            except (ValueError, AttributeError):
+                pass
+        if not isinstance(token, str) or not token:
+            return 400, {'error': 'Missing token'}
+
+        completed = balancer.route_leases.complete(token)
+        if completed is None:
+            return 409, {'error': 'Unknown or expired route token'}
+        server_id, _, _ = completed
+        return 200, {'server': server_id, 'in_flight': balancer.in_flight.get(server_id)}
+
+    def predict():
+        snapshot = balancer.snapshot
+        return 200, {
+            'current_traffic': snapshot.current_traffic,
+            'predicted_traffic': snapshot.predicted_traffic,
+            'traffic_spike_detected': snapshot.traffic_spike
+        }
+
+    def metrics():
+        return 200, dict(balancer.snapshot.fleet.as_dicts)
+
+    async def stream_metrics(accept, send):
+        openmetrics = 'application/openmetrics-text' in accept.lower()
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', (OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE).encode())]
+        })
+        for chunk in balancer.render_metrics(openmetrics):
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            # Let other requests on this loop run between chunks of a large fleet
+            await asyncio.sleep(0)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        method, path = scope['method'], scope['path']
+        query = parse_qs(scope['query_string'].decode('latin-1'))
+        if path == '/route' and method == 'GET':
+            status, data = route(query, scope['headers'])
+        elif path == '/route/complete' and method == 'POST':
+            status, data = route_complete(query, await read_body(receive))
+        elif path == '/predict' and method == 'GET':
+            status, data = predict()
+        elif path == '/metrics' and method == 'GET':
+            accept = next((value.decode('latin-1') for name, value in scope['headers'] if name == b'accept'), '')
+            if hasattr(balancer, 'render_metrics') and wants_openmetrics(accept):
+                await stream_metrics(accept, send)
+                return
+            status, data = metrics()
+        elif path in ('/route', '/route/complete', '/predict', '/metrics'):
+            status, data = 405, {'error': 'Method not allowed'}
+        else:
+            status, data = 404, {'error': 'Not found'}
+
+        body = json_body(data)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    return app
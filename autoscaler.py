@@ -0,0 +1,198 @@
+import importlib
+import logging
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AUTOSCALING = {
+    'horizon_minutes': 10,
+    'evaluate_interval': 30,
+    'target_utilization': 0.6,
+    'scale_up_utilization': 0.75,
+    'scale_down_utilization': 0.4,
+    'min_servers': 1,
+    'max_servers': 20,
+    'scale_up_cooldown': 60,
+    'scale_down_cooldown': 600,
+    'default_capacity': 100.0,
+    'forecast_quantile': 0.95,
+    'capacity_smoothing': 0.2,
+    'min_cpu': 0.05,
+    'executor': None
+}
+
+
+@dataclass(frozen=True)
+class ScalingPlan:
+    """One planner decision; `desired_servers` is what the fleet should be `horizon_seconds` from now"""
+    timestamp: float
+    action: str  # 'scale_up', 'scale_down' or 'hold'
+    current_servers: int
+    desired_servers: int
+    forecast_peak: float
+    horizon_seconds: float
+    capacity_per_server: float
+    projected_utilization: float
+    reason: str
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class CapacityEstimator:
+    """Learns how many req/s one server handles at full cpu from the fleet metrics.
+
+    Each observation takes the median of request_rate / cpu_usage over the
+    servers busy enough for the ratio to mean something, and folds it into
+    an EWMA so a single noisy metrics round does not swing the plan.
+    """
+
+    def __init__(self, default_capacity=100.0, smoothing=0.2, min_cpu=0.05):
+        self.default_capacity = default_capacity
+        self.smoothing = smoothing
+        self.min_cpu = min_cpu
+        self.capacity = None
+
+    def observe(self, fleet):
+        cpu = fleet.columns['cpu_usage']
+        rate = fleet.columns['request_rate']
+        busy = (cpu >= self.min_cpu) & (rate > 0) & ~fleet.overloaded
+        if not busy.any():
+            return self.value
+        sample = float(np.median(rate[busy] / cpu[busy]))
+        if self.capacity is None:
+            self.capacity = sample
+        else:
+            self.capacity += self.smoothing * (sample - self.capacity)
+        return self.capacity
+
+    @property
+    def value(self):
+        return self.capacity if self.capacity is not None else self.default_capacity
+
+
+class AutoscalePlanner:
+    """Turns a traffic forecast into a server count, with hysteresis and cooldowns.
+
+    The fleet is resized only when the forecast peak would push utilization
+    outside [scale_down_utilization, scale_up_utilization]; it is then sized
+    for target_utilization. Scale-ups and scale-downs each have their own
+    cooldown, and a scale-down also waits out a recent scale-up, so a short
+    dip right after a spike does not give the new capacity straight back.
+    Draining servers are on their way out and do not count as capacity. An
+    executor that raises is logged and its cooldown not started, so the
+    next evaluation tries again. Evaluations are serialised, so the loop
+    thread and the admin endpoint cannot both act on one cooldown window.
+    `latest` is the last plan, holds included; `actions` keeps the last
+    100 that scaled.
+    """
+
+    def __init__(self, config=None, executor=None):
+        self.config = {**DEFAULT_AUTOSCALING, **(config or {})}
+        for name in ('default_capacity', 'target_utilization'):
+            if not self.config[name] > 0:
+                raise ValueError(f"autoscaling.{name} must be greater than 0, got {self.config[name]!r}")
+        self.horizon_seconds = self.config['horizon_minutes'] * 60
+        self.estimator = CapacityEstimator(
+            self.config['default_capacity'], self.config['capacity_smoothing'], self.config['min_cpu']
+        )
+        self.executor = executor
+        if self.executor is None and self.config['executor']:
+            self.executor = load_executor(self.config['executor'])
+        self.last_scale_up = float('-inf')
+        self.last_scale_down = float('-inf')
+        self.lock = threading.Lock()
+        self.latest = None
+        self.actions = deque(maxlen=100)
+
+    def recent_actions(self):
+        """The last scale-ups and scale-downs, oldest first"""
+        with self.lock:
+            return tuple(self.actions)
+
+    def clamp(self, servers):
+        return max(self.config['min_servers'], min(self.config['max_servers'], servers))
+
+    def evaluate(self, snapshot, forecast_peak, now=None):
+        """Plan for the fleet in `snapshot` given the peak traffic forecast over the horizon"""
+        with self.lock:
+            return self._evaluate(snapshot, forecast_peak, now)
+
+    def _evaluate(self, snapshot, forecast_peak, now):
+        now = time.time() if now is None else now
+        config = self.config
+        fleet = snapshot.fleet
+        current = len(fleet) - sum(server_id in fleet for server_id in snapshot.draining)
+        capacity = self.estimator.observe(fleet)
+        # Never plan below what is being served right now
+        peak = max(forecast_peak, snapshot.current_traffic)
+        utilization = peak / max(current * capacity, 1e-9)
+        sized = self.clamp(math.ceil(peak / (capacity * config['target_utilization'])))
+
+        action, desired = 'hold', current
+        if current < config['min_servers'] or current > config['max_servers']:
+            action = 'scale_up' if current < config['min_servers'] else 'scale_down'
+            desired = self.clamp(current)
+            reason = f"fleet of {current} is outside [{config['min_servers']}, {config['max_servers']}]"
+        elif utilization > config['scale_up_utilization'] and sized > current:
+            if now - self.last_scale_up < config['scale_up_cooldown']:
+                reason = f"scale-up cooldown ({utilization:.0%} projected)"
+            else:
+                action, desired = 'scale_up', sized
+                reason = f"{utilization:.0%} projected > {config['scale_up_utilization']:.0%}"
+        elif utilization < config['scale_down_utilization'] and sized < current:
+            since_change = now - max(self.last_scale_down, self.last_scale_up)
+            if since_change < config['scale_down_cooldown']:
+                reason = f"scale-down cooldown ({utilization:.0%} projected)"
+            else:
+                action, desired = 'scale_down', sized
+                reason = f"{utilization:.0%} projected < {config['scale_down_utilization']:.0%}"
+        else:
+            reason = f"{utilization:.0%} projected is within the target band"
+
+        cooldowns = (self.last_scale_up, self.last_scale_down)
+        if action == 'scale_up':
+            self.last_scale_up = now
+        elif action == 'scale_down':
+            self.last_scale_down = now
+
+        plan = ScalingPlan(
+            timestamp=now,
+            action=action,
+            current_servers=current,
+            desired_servers=desired,
+            forecast_peak=peak,
+            horizon_seconds=self.horizon_seconds,
+            capacity_per_server=capacity,
+            projected_utilization=utilization,
+            reason=reason
+        )
+        self.latest = plan
+        if action != 'hold':
+            self.actions.append(plan)
+        if action != 'hold' and self.executor is not None:
+            try:
+                self.executor(plan)
+            except Exception:
+                logger.exception("Autoscale executor failed for %s to %d servers", action, desired)
+                self.last_scale_up, self.last_scale_down = cooldowns
+        return plan
+
+
+def log_executor(plan):
+    """Executor that only reports the plan; use it to dry-run the planner"""
+    print(f"📐 Autoscale {plan.action}: {plan.current_servers} -> {plan.desired_servers} servers ({plan.reason})")
+
+
+def load_executor(spec):
+    """Resolve a 'module:function' executor hook, called with each non-hold ScalingPlan"""
+    module_name, _, attr = spec.partition(':')
+    if not attr:
+        raise ValueError(f"Executor must be 'module:function', got {spec!r}")
+    return getattr(importlib.import_module(module_name), attr)
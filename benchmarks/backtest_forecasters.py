@@ -0,0 +1,102 @@
+"""Backtest every forecasting model on the same traffic trace.
+
+Each sample is first predicted one step ahead and then fed to the model, so
+errors are true out-of-sample errors. Per-call update and predict costs are
+measured alongside MAE, RMSE and MAPE.
+
+Run from the repository root:
+    python -m benchmarks.backtest_forecasters --days 14 --interval 300
+    python -m benchmarks.backtest_forecasters --csv traffic.csv
+"""
+import argparse
+import csv
+import json
+import math
+import random
+import time
+from datetime import datetime
+
+from forecasting import FORECASTERS
+
+
+def synthetic_trace(days, interval, seed=42, start=datetime(2024, 1, 1).timestamp()):
+    """Yield (timestamp, traffic) pairs following the simulator's daily pattern"""
+    rng = random.Random(seed)
+    for i in range(int(days * 86400 / interval)):
+        timestamp = start + i * interval
+        when = datetime.fromtimestamp(timestamp)
+        if 9 <= when.hour <= 17:
+            traffic = rng.randint(150, 300)
+        elif 18 <= when.hour <= 22:
+            traffic = rng.randint(200, 400)
+        else:
+            traffic = rng.randint(50, 150)
+        if when.weekday() >= 5:
+            traffic *= 0.8
+        if rng.random() < 0.02:
+            traffic = rng.randint(500, 800)
+        yield timestamp, float(traffic)
+
+
+def csv_trace(path):
+    """Yield (timestamp, traffic) pairs from a CSV with those two columns"""
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            yield float(row['timestamp']), float(row['traffic'])
+
+
+def backtest(forecaster, trace):
+    abs_error = sq_error = pct_error = 0.0
+    scored = 0
+    update_time = predict_time = 0.0
+    updates = 0
+
+    for timestamp, value in trace:
+        if forecaster.ready:
+            start = time.perf_counter()
+            prediction = forecaster.predict()
+            predict_time += time.perf_counter() - start
+            error = prediction - value
+            abs_error += abs(error)
+            sq_error += error * error
+            pct_error += abs(error) / max(1.0, abs(value))
+            scored += 1
+
+        start = time.perf_counter()
+        forecaster.update(timestamp, value)
+        update_time += time.perf_counter() - start
+        updates += 1
+
+    scored = max(1, scored)
+    return {
+        'mae': abs_error / scored,
+        'rmse': math.sqrt(sq_error / scored),
+        'mape': 100 * pct_error / scored,
+        'update_us': 1e6 * update_time / max(1, updates),
+        'predict_us': 1e6 * predict_time / scored,
+        'predictions': scored
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', help='CSV file with timestamp,traffic columns')
+    parser.add_argument('--days', type=float, default=14)
+    parser.add_argument('--interval', type=float, default=300, help='seconds between samples')
+    parser.add_argument('--models', nargs='*', default=sorted(FORECASTERS))
+    args = parser.parse_args()
+
+    with open('config.json', 'r') as f:
+        model_params = json.load(f).get('forecasting', {})
+
+    print(f"{'model':<14}{'MAE':>10}{'RMSE':>10}{'MAPE %':>10}{'update µs':>12}{'predict µs':>12}")
+    for name in args.models:
+        trace = csv_trace(args.csv) if args.csv else synthetic_trace(args.days, args.interval)
+        forecaster = FORECASTERS[name](**model_params.get(name, {}))
+        result = backtest(forecaster, trace)
+        print(f"{name:<14}{result['mae']:>10.1f}{result['rmse']:>10.1f}{result['mape']:>10.1f}"
+              f"{result['update_us']:>12.1f}{result['predict_us']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Circuit breakers against a flapping backend: tail latency and errors with and without ejection.
+
+Routes requests on a virtual clock across a fleet where a few servers
+flap between healthy and sick (slow and mostly failing) every `--period`
+seconds. Each request's outcome is fed back to the BreakerBoard and the
+snapshot is republished when ejections change, as the balancer does. The
+same request stream is replayed without breakers for comparison. Reports
+p50/p99 latency, error rate, the share of requests sent to sick servers
+and the cost of `record` per outcome.
+
+Run from the repository root:
+    python -m benchmarks.bench_circuit_breaker --servers 20 --flapping 2
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import make_fleet
+from circuit_breaker import BreakerBoard
+from routing_strategies import Router
+from snapshot import BalancerSnapshot
+
+
+def run(server_ids, flapping, args, breakers):
+    rng = np.random.default_rng(args.seed)
+    fleet = make_fleet(server_ids)
+    router = Router({'default_strategy': 'power_of_two_choices'}, server_ids, breakers=breakers)
+    state = {'version': 0, 'snapshot': None}
+
+    def publish():
+        state['version'] += 1
+        state['snapshot'] = BalancerSnapshot.from_fleet(
+            state['version'], 100.0, 100.0, False, fleet,
+            ejected=breakers.ejected if breakers else frozenset()
+        )
+
+    publish()
+    if breakers:
+        breakers.listeners.append(publish)
+
+    latencies, errors, sick_hits = [], 0, 0
+    next_sweep = 0.0
+    for i in range(args.requests):
+        now = i / args.rate
+        if breakers and now >= next_sweep:
+            breakers.sweep(now)
+            next_sweep = now + breakers.config['sweep_interval']
+        server_id, _ = router.choose(state['snapshot'])
+        sick = server_id in flapping and int(now / args.period) % 2 == 1
+        if sick:
+            ok, latency = rng.random() > 0.8, rng.exponential(1.0)
+        else:
+            ok, latency = rng.random() > 0.001, rng.exponential(0.02)
+        latencies.append(latency)
+        errors += not ok
+        sick_hits += sick
+        if breakers:
+            breakers.record(server_id, ok, latency, now)
+    return np.array(latencies), errors, sick_hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, default=20)
+    parser.add_argument('--flapping', type=int, default=2)
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--rate', type=float, default=1000.0, help='requests per virtual second')
+    parser.add_argument('--period', type=float, default=10.0, help='seconds sick / healthy')
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    server_ids = [f'server{i}' for i in range(args.servers)]
+    flapping = frozenset(server_ids[:args.flapping])
+    print(f"⚡ {args.servers} servers, {args.flapping} flapping every {args.period:.0f}s, "
+          f"{args.requests} requests at {args.rate:.0f}/s")
+    print(f"{'':>16}{'p50 ms':>9}{'p99 ms':>9}{'errors':>9}{'to sick':>9}")
+    for label, breakers in (('no breakers', None), ('breakers', BreakerBoard())):
+        latencies, errors, sick_hits = run(server_ids, flapping, args, breakers)
+        print(f"{label:>16}{np.percentile(latencies, 50) * 1000:>9.1f}{np.percentile(latencies, 99) * 1000:>9.1f}"
+              f"{errors / len(latencies):>9.2%}{sick_hits / len(latencies):>9.2%}")
+
+    board = BreakerBoard()
+    start = time.perf_counter()
+    for i in range(args.requests):
+        board.record(server_ids[i % len(server_ids)], True, 0.01, 0.0)
+    print(f"   record: {(time.perf_counter() - start) / args.requests * 1e6:.2f} µs per outcome")
+
+
+if __name__ == '__main__':
+    main()
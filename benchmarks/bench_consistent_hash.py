@@ -0,0 +1,75 @@
+"""Consistent-hash routing: lookup cost, key movement on churn and bounded-load spread.
+
+For each fleet size, measures ring lookups per second, how long adding or
+removing a batch of servers takes compared with building the ring from
+scratch, what fraction of keys change owner (ideally batch / servers), and
+the max / mean load when many keys are routed through the bounded-load
+strategy with a skewed (Zipf) key popularity.
+
+Run from the repository root:
+    python -m benchmarks.bench_consistent_hash --servers 100 1000 10000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import make_snapshot
+from consistent_hash import HashRing
+from routing_strategies import ConsistentHashStrategy, InFlightCounters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, nargs='*', default=[100, 1000, 10000])
+    parser.add_argument('--keys', type=int, default=100000)
+    parser.add_argument('--vnodes', type=int, default=160)
+    parser.add_argument('--churn', type=float, default=0.01, help='fraction of servers added / removed')
+    parser.add_argument('--load-factor', type=float, default=1.25)
+    args = parser.parse_args()
+
+    keys = [f'session-{i}' for i in range(args.keys)]
+    print(f"🔑 {args.keys} keys, {args.vnodes} vnodes per server, {args.churn:.0%} churn")
+    print(f"{'servers':>8}{'lookups/s':>12}{'build ms':>10}{'add ms':>9}{'remove ms':>11}"
+          f"{'moved':>9}{'ideal':>9}{'max/mean':>10}")
+    for servers in args.servers:
+        server_ids = [f'server{i}' for i in range(servers)]
+        batch = max(1, int(servers * args.churn))
+
+        start = time.perf_counter()
+        ring = HashRing(args.vnodes)
+        ring.add(server_ids)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        before = [ring.lookup(key) for key in keys]
+        lookups = len(keys) / (time.perf_counter() - start)
+
+        extra = [f'extra{i}' for i in range(batch)]
+        start = time.perf_counter()
+        ring.add(extra)
+        add = time.perf_counter() - start
+        after = [ring.lookup(key) for key in keys]
+        moved = sum(a != b for a, b in zip(before, after)) / len(keys)
+
+        start = time.perf_counter()
+        ring.remove(extra)
+        remove = time.perf_counter() - start
+        if [ring.lookup(key) for key in keys[:1000]] != before[:1000]:
+            raise SystemExit('❌ Removing the added servers did not restore the original owners')
+
+        # Every request stays in flight, so the bound is what spreads hot keys
+        strategy = ConsistentHashStrategy(args.vnodes, args.load_factor)
+        snapshot = make_snapshot(server_ids)
+        in_flight = InFlightCounters(server_ids)
+        popularity = np.random.default_rng(1).zipf(1.2, args.keys) % len(keys)
+        for index in popularity.tolist():
+            in_flight.start(strategy.choose(snapshot, in_flight, keys[index]))
+        loads = np.array([in_flight.get(server_id) for server_id in server_ids])
+
+        print(f"{servers:>8}{lookups:>12.0f}{build * 1000:>10.1f}{add * 1000:>9.2f}{remove * 1000:>11.2f}"
+              f"{moved:>9.2%}{batch / (servers + batch):>9.2%}{loads.max() / loads.mean():>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
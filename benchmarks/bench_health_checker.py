@@ -0,0 +1,96 @@
+"""Active health checker against local stub backends.
+
+Thousands of backend ids are spread over four local stubs: healthy, slow
+(answers after the probe timeout), failing (HTTP 500) and down (connection
+refused). Each round's duration and the error rate / response time measured
+for each kind are printed, all from a single thread.
+
+Run from the repository root:
+    python -m benchmarks.bench_health_checker --backends 5000 --rounds 3
+"""
+import argparse
+import asyncio
+import socket
+import time
+
+from health_checker import HealthChecker
+from server_health import ServerHealthMonitor
+
+
+def stub(status, delay=0.0):
+    async def handle(reader, writer):
+        try:
+            await reader.readuntil(b'\r\n\r\n')
+            if delay:
+                await asyncio.sleep(delay)
+            writer.write(f'HTTP/1.1 {status} X\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'.encode())
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass  # slow handlers are still sleeping when the benchmark shuts down
+        finally:
+            writer.close()
+    return handle
+
+
+def refused_port():
+    """A local port with nothing listening on it"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def run(args):
+    servers = {
+        'healthy': await asyncio.start_server(stub(200), '127.0.0.1', 0, backlog=4096),
+        'slow': await asyncio.start_server(stub(200, delay=args.timeout * 2), '127.0.0.1', 0, backlog=4096),
+        'failing': await asyncio.start_server(stub(500), '127.0.0.1', 0, backlog=4096),
+    }
+    ports = {kind: server.sockets[0].getsockname()[1] for kind, server in servers.items()}
+    ports['down'] = refused_port()
+
+    kinds = list(ports)
+    targets = {}
+    kind_of = {}
+    for i in range(args.backends):
+        kind = kinds[i % len(kinds)]
+        targets[f'backend{i}'] = f'127.0.0.1:{ports[kind]}'
+        kind_of[f'backend{i}'] = kind
+
+    monitor = ServerHealthMonitor()
+    monitor.bulk_update_server_metrics({server_id: {} for server_id in targets})
+    checker = HealthChecker(
+        monitor, targets, timeout=args.timeout, jitter=args.jitter,
+        interval=args.interval, concurrency=args.concurrency
+    )
+
+    print(f"🩺 {args.backends} backends, concurrency {args.concurrency}, timeout {args.timeout}s")
+    for round_number in range(args.rounds):
+        start = time.perf_counter()
+        updates = await checker.run_round()
+        elapsed = time.perf_counter() - start
+        print(f"round {round_number + 1}: {elapsed:.2f}s ({args.backends / elapsed:.0f} probes/s)")
+
+    for kind in kinds:
+        rows = [updates[server_id] for server_id, k in kind_of.items() if k == kind]
+        error_rate = sum(row['error_rate'] for row in rows) / len(rows)
+        response_time = sum(row['response_time'] for row in rows) / len(rows)
+        print(f"   {kind:<8} error_rate={error_rate:.2f} response_time={response_time * 1000:.1f}ms")
+
+    for server in servers.values():
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=256)
+    parser.add_argument('--timeout', type=float, default=0.5)
+    parser.add_argument('--interval', type=float, default=10.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Fleet health scoring: per-server Python loop vs. one vectorized pass.
+
+For each fleet size this times a full metrics update followed by health
+scoring, overload flags and best-server selection, first the old way
+(one dict and one calculate_health_score call per server) and then with
+a FleetMetrics table. The last column is scoring alone over columns that
+are already loaded, i.e. the cost once metrics arrive in columnar form.
+
+Run from the repository root:
+    python -m benchmarks.bench_health_scoring --sizes 4 100 1000 10000 100000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from fleet_metrics import FleetMetrics, health_scores, overload_mask
+from server_health import ServerHealthMonitor
+
+
+def random_updates(server_ids, rng):
+    return {
+        server_id: {
+            'cpu_usage': rng.uniform(0.1, 0.95),
+            'memory_usage': rng.uniform(0.3, 0.95),
+            'response_time': rng.uniform(0.1, 2.5),
+            'error_rate': rng.uniform(0.0, 0.15),
+            'request_rate': rng.uniform(10, 200)
+        }
+        for server_id in server_ids
+    }
+
+
+def per_server_loop(monitor, updates, thresholds):
+    metrics = {}
+    for server_id, values in updates.items():
+        metrics[server_id] = {**values, 'health_score': monitor.calculate_health_score(values)}
+    overloaded = {
+        server_id: any(values.get(name, 0) > limit for name, limit in thresholds.items())
+        for server_id, values in metrics.items()
+    }
+    best = max(metrics.items(), key=lambda item: item[1]['health_score'])[0]
+    return best, overloaded
+
+
+def vectorized(fleet, updates):
+    fleet = fleet.with_updates(updates, time.time())
+    return fleet.best_server(), fleet.overloaded
+
+
+def score_only(fleet, weights, thresholds):
+    health = health_scores(fleet.columns, weights)
+    return fleet.server_ids[int(np.argmax(health))], overload_mask(fleet.columns, thresholds)
+
+
+def best_of(fn, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[4, 100, 1000, 10000, 100000])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    monitor = ServerHealthMonitor()
+    thresholds = monitor.config['overload_thresholds']
+    rng = random.Random(3)
+
+    print(f"{'servers':>10}{'loop ms':>12}{'vector ms':>12}{'speedup':>10}{'score ms':>12}")
+    for size in args.sizes:
+        server_ids = [f'server{i}' for i in range(size)]
+        updates = random_updates(server_ids, rng)
+        fleet = FleetMetrics.empty(monitor.health_weights, thresholds).with_updates(updates, 0.0)
+
+        loop_time = best_of(lambda: per_server_loop(monitor, updates, thresholds), args.repeats)
+        vector_time = best_of(lambda: vectorized(fleet, updates), args.repeats)
+        score_time = best_of(lambda: score_only(fleet, monitor.health_weights, thresholds), args.repeats)
+        print(f"{size:>10}{loop_time * 1000:>12.3f}{vector_time * 1000:>12.3f}"
+              f"{loop_time / vector_time:>9.1f}x{score_time * 1000:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
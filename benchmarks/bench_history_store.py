@@ -0,0 +1,100 @@
+"""Warm-start time of the on-disk history store as history grows.
+
+For each history size a fresh store is filled with one traffic sample per
+second, then reopened the way PredictiveLoadBalancer does at startup: open
+the series, read the last `--warm` samples and replay them into a
+predictor. That time is compared with reading the whole raw file and with
+replaying all of it, which is what parsing a full history would cost.
+Single-sample append latency (raw file plus three rollups) is also
+reported.
+
+Run from the repository root:
+    python -m benchmarks.bench_history_store --sizes 10000 100000 1000000 --warm 100
+"""
+import argparse
+import io
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from simple_predictor import SimpleTrafficPredictor
+from timeseries_store import TimeSeriesStore, raw_dtype
+
+CHUNK = 100000
+
+
+def fill(directory, size, start):
+    store = TimeSeriesStore(directory)
+    series = store.traffic()
+    for first in range(0, size, CHUNK):
+        timestamps = start + np.arange(first, min(size, first + CHUNK), dtype=np.float64)
+        series.extend(timestamps, 100 + 50 * np.sin(timestamps / 3600.0))
+    store.close()
+
+
+def timed(fn, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10000, 100000, 1000000])
+    parser.add_argument('--warm', type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"💾 warm start reads the last {args.warm} samples")
+    print(f"{'samples':>10}{'1m buckets':>12}{'warm start':>14}{'full read':>14}{'full replay':>14}{'append':>12}")
+    for size in args.sizes:
+        directory = tempfile.mkdtemp(prefix='plb_history_')
+        try:
+            start = time.time() - size
+            fill(directory, size, start)
+
+            def replay(timestamps, values):
+                predictor = SimpleTrafficPredictor(args.warm)
+                for timestamp, traffic in zip(timestamps.tolist(), values.tolist()):
+                    predictor.add_traffic_data(traffic, timestamp)
+                return len(predictor.traffic_history)
+
+            def warm_start():
+                store = TimeSeriesStore(directory)
+                timestamps, values = store.traffic_tail(args.warm)
+                store.close()
+                return replay(timestamps, values)
+
+            def full_load():
+                data = np.fromfile(f'{directory}/traffic.raw', dtype=np.uint8)
+                return data[32:32 + size * raw_dtype(1).itemsize].view(raw_dtype(1))
+
+            with redirect_stdout(io.StringIO()):
+                warm, warmed = timed(warm_start)
+                full, records = timed(full_load)
+                replay_all, _ = timed(lambda: replay(records['ts'], records['values'][:, 0]), repeats=1)
+            assert warmed == min(size, args.warm)
+
+            store = TimeSeriesStore(directory)
+            series = store.traffic()
+            minutes = len(series.rollups['1m'])
+            appends = 2000
+            begin = time.perf_counter()
+            for i in range(appends):
+                store.record_traffic(start + size + i, 100.0)
+            append = (time.perf_counter() - begin) / appends
+            store.close()
+
+            print(f"{size:>10}{minutes:>12}{warm * 1000:>12.2f}ms{full * 1000:>12.2f}ms"
+                  f"{replay_all * 1000:>12.0f}ms{append * 1e6:>10.1f}µs")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Metrics ingestion throughput for JSON lines and the binary batch format.
+
+Batches of samples for a fleet of servers are decoded and applied to a
+ServerHealthMonitor, reporting samples/s per format and batch size.
+
+Run from the repository root:
+    python -m benchmarks.bench_ingest --servers 1000 --samples 200000
+"""
+import argparse
+import json
+import random
+import time
+
+from metrics_ingest import BINARY_TYPE, encode_binary, ingest
+from server_health import ServerHealthMonitor
+
+
+def make_samples(server_ids, count, rng):
+    return [
+        (rng.choice(server_ids), {
+            'cpu_usage': rng.random(),
+            'memory_usage': rng.random(),
+            'response_time': rng.uniform(0.05, 1.0),
+            'error_rate': rng.uniform(0.0, 0.05),
+            'request_rate': rng.uniform(10, 200)
+        })
+        for _ in range(count)
+    ]
+
+
+def encode_json_lines(samples):
+    return '\n'.join(json.dumps({'server': server_id, **metrics}) for server_id, metrics in samples).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, default=1000)
+    parser.add_argument('--samples', type=int, default=200000)
+    parser.add_argument('--batch-sizes', type=int, nargs='*', default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    server_ids = [f'server{i}' for i in range(args.servers)]
+    monitor = ServerHealthMonitor()
+    monitor.bulk_update_server_metrics({server_id: {} for server_id in server_ids})
+    samples = make_samples(server_ids, args.samples, rng)
+
+    print(f"📥 {args.samples} samples over {args.servers} servers")
+    print(f"{'format':<12}{'batch':>8}{'samples/s':>14}{'bytes/sample':>14}")
+    for batch_size in args.batch_sizes:
+        batches = [samples[i:i + batch_size] for i in range(0, len(samples), batch_size)]
+        for label, content_type, encoder in (
+            ('jsonl', 'application/x-ndjson', encode_json_lines),
+            ('binary', BINARY_TYPE, encode_binary),
+        ):
+            payloads = [encoder(batch) for batch in batches]
+            start = time.perf_counter()
+            for payload in payloads:
+                ingest(monitor, payload, content_type, server_ids)
+            elapsed = time.perf_counter() - start
+            size = sum(len(p) for p in payloads) / len(samples)
+            print(f"{label:<12}{batch_size:>8}{len(samples) / elapsed:>14.0f}{size:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Routing under heavy membership churn.
+
+A churn thread repeatedly drains a batch of active servers, adds as many
+new ones and reaps the drained ones, while router threads keep picking
+servers. Reports how long each membership batch takes to apply, routing
+throughput and latency during the churn, and checks that no decision
+lands on a server that is draining or gone in the snapshot it was made
+from. Exits non-zero on any violation.
+
+Run from the repository root:
+    python -m benchmarks.bench_membership --servers 5000 --batch 500 --seconds 5
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+import numpy as np
+
+from predictive_balancer import PredictiveLoadBalancer
+
+
+def routable_metrics():
+    # High request_rate keeps the default forecast from marking servers high risk
+    return {
+        'cpu_usage': random.uniform(0.2, 0.5),
+        'memory_usage': random.uniform(0.3, 0.6),
+        'response_time': random.uniform(0.1, 0.3),
+        'error_rate': 0.01,
+        'request_rate': 1000.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, default=5000)
+    parser.add_argument('--batch', type=int, default=500, help='servers drained and added per churn round')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--routers', type=int, default=2)
+    args = parser.parse_args()
+
+    with redirect_stdout(StringIO()):
+        balancer = PredictiveLoadBalancer(start_background_tasks=False)
+        # Per-server history files are not what is measured here
+        balancer.snapshot_listeners.clear()
+        balancer.sync_servers({f'node{i}': f'10.0.{i // 256}.{i % 256}:80' for i in range(args.servers)})
+        balancer.reap_drained(now=time.time() + 3600)
+        balancer.health_monitor.bulk_update_server_metrics(
+            {server_id: routable_metrics() for server_id in balancer.pool.active}
+        )
+        balancer.publish_snapshot()
+
+    stop = threading.Event()
+    errors = []
+    batch_times = []
+    decisions = [0] * args.routers
+    latencies = [[] for _ in range(args.routers)]
+
+    def churn():
+        next_id = args.servers
+        while not stop.is_set():
+            start = time.perf_counter()
+            with redirect_stdout(StringIO()):
+                balancer.drain_servers(random.sample(balancer.pool.active, args.batch))
+                added = {f'node{next_id + i}': f'10.1.{i // 256}.{i % 256}:80' for i in range(args.batch)}
+                next_id += args.batch
+                balancer.add_servers(added)
+                balancer.health_monitor.bulk_update_server_metrics(
+                    {server_id: routable_metrics() for server_id in added}
+                )
+                balancer.publish_snapshot()
+                balancer.reap_drained(now=time.time() + 3600)
+            batch_times.append(time.perf_counter() - start)
+
+    def route(index):
+        samples = latencies[index]
+        count = 0
+        while not stop.is_set():
+            snapshot = balancer.snapshot
+            start = time.perf_counter()
+            server_id, _ = balancer.router.choose(snapshot, '/')
+            elapsed = time.perf_counter() - start
+            count += 1
+            if count % 16 == 0:
+                samples.append(elapsed)
+            if server_id in snapshot.draining or server_id not in snapshot.fleet:
+                errors.append(f'{server_id} chosen from snapshot {snapshot.version} while draining or removed')
+        decisions[index] = count
+
+    threads = [threading.Thread(target=churn)] + [
+        threading.Thread(target=route, args=(i,)) for i in range(args.routers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    batches = np.array(batch_times) * 1000
+    routing = np.concatenate([np.array(samples) for samples in latencies]) * 1e6
+    print(f"🧩 {args.servers} servers, {len(batches)} churn rounds of -{args.batch}/+{args.batch} "
+          f"({len(batches) * args.batch * 2 / args.seconds:.0f} membership changes/s)")
+    print(f"   round apply: p50 {np.percentile(batches, 50):.1f} ms, max {batches.max():.1f} ms")
+    print(f"🔀 {sum(decisions) / args.seconds:.0f} routing decisions/s across {args.routers} threads")
+    print(f"   decision latency: p50 {np.percentile(routing, 50):.1f} µs, "
+          f"p99 {np.percentile(routing, 99):.1f} µs, max {routing.max():.0f} µs")
+    if errors:
+        print(f"❌ {len(errors)} violations, first: {errors[0]}")
+        sys.exit(1)
+    print("✅ No decision hit a draining or removed server")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Metrics export cost: histogram overhead on the hot path and scrape render time.
+
+Times `Histogram.observe` and an instrumented Router decision against an
+uninstrumented one, then renders the OpenMetrics exposition for fleets of
+increasing size. For the render it reports the total time, the time to the
+first chunk and the longest single chunk, which bounds how long a scrape
+holds the GIL away from request threads, plus the cost of re-rendering
+the same snapshot (cached fleet chunks).
+
+Run from the repository root:
+    python -m benchmarks.bench_metrics_export --servers 1000 10000 50000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import make_snapshot, random_columns
+from metrics_export import Histogram, Instrumentation, OpenMetricsExporter
+from routing_strategies import InFlightCounters, Router
+
+
+def time_render(exporter, snapshot, in_flight):
+    chunks, longest, first = 0, 0.0, None
+    size = 0
+    start = last = time.perf_counter()
+    for chunk in exporter.render(snapshot, in_flight):
+        now = time.perf_counter()
+        longest = max(longest, now - last)
+        first = now - start if first is None else first
+        chunks += 1
+        size += len(chunk)
+        last = now
+    return time.perf_counter() - start, first, longest, chunks, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, nargs='*', default=[1000, 10000, 50000])
+    parser.add_argument('--decisions', type=int, default=200000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    histogram = Histogram()
+    values = np.random.default_rng(0).lognormal(-9, 1, args.decisions).tolist()
+    start = time.perf_counter()
+    for value in values:
+        histogram.observe(value)
+    observe = (time.perf_counter() - start) / len(values)
+    print(f"📏 Histogram.observe: {observe * 1e9:.0f} ns per call")
+
+    server_ids = [f'server{i}' for i in range(100)]
+    snapshot = make_snapshot(server_ids)
+    for label, instrumentation in (('plain', None), ('instrumented', Instrumentation())):
+        router = Router({'default_strategy': 'least_outstanding_requests'}, server_ids, instrumentation)
+        start = time.perf_counter()
+        for _ in range(args.decisions):
+            router.choose(snapshot)
+        elapsed = time.perf_counter() - start
+        print(f"   {label:>12} route decision: {elapsed / args.decisions * 1e6:.2f} µs")
+
+    print(f"{'servers':>8}{'render ms':>11}{'first ms':>10}{'max chunk ms':>14}{'chunks':>8}{'MB':>7}{'cached ms':>11}")
+    for servers in args.servers:
+        server_ids = [f'server{i}' for i in range(servers)]
+        # Distinct values per server, so the exposition is as long as a real fleet's
+        snapshot = make_snapshot(server_ids, columns=random_columns(servers), last_update=1.0)
+        in_flight = InFlightCounters(server_ids)
+        instrumentation = Instrumentation()
+        for i, server_id in enumerate(server_ids):
+            instrumentation.routes.inc((server_id, 'predictive_load_balancing'))
+            instrumentation.route_histogram('predictive_load_balancing').observe(i * 1e-7)
+        exporter = OpenMetricsExporter(instrumentation, args.chunk_size)
+
+        total, first, longest, chunks, size = time_render(exporter, snapshot, in_flight)
+        cached = time_render(exporter, snapshot, in_flight)[0]
+        print(f"{servers:>8}{total * 1000:>11.1f}{first * 1000:>10.2f}{longest * 1000:>14.2f}"
+              f"{chunks:>8}{size / 1e6:>7.1f}{cached * 1000:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
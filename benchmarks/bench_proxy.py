@@ -0,0 +1,132 @@
+"""Reverse proxy throughput benchmark against local stub upstreams.
+
+Run from the repository root:
+    python -m benchmarks.bench_proxy --connections 64 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+
+from predictive_balancer import PredictiveLoadBalancer
+from proxy import ReverseProxy
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+async def stub_handler(reader, writer, body):
+    """Minimal keep-alive HTTP/1.1 upstream returning a fixed body"""
+    response = (
+        b'HTTP/1.1 200 OK\r\nContent-Type: text/plain\r\n'
+        b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body
+    )
+    try:
+        while True:
+            head = await reader.readuntil(b'\r\n\r\n')
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    await reader.readexactly(int(line.split(b':', 1)[1]))
+            writer.write(response)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def run_stubs(count, body_size, port_queue):
+    async def serve():
+        body = b'x' * body_size
+        servers = []
+        for _ in range(count):
+            server = await asyncio.start_server(
+                lambda r, w: stub_handler(r, w, body), '127.0.0.1', 0
+            )
+            servers.append(server)
+            port_queue.put(server.sockets[0].getsockname()[1])
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def run_proxy(upstreams, port_queue):
+    async def serve():
+        balancer = PredictiveLoadBalancer(start_background_tasks=False)
+        proxy = ReverseProxy(balancer, upstreams)
+        server = await proxy.start('127.0.0.1', 0)
+        port_queue.put(server.sockets[0].getsockname()[1])
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+async def client_loop(port, deadline, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    request = b'GET / HTTP/1.1\r\nHost: bench\r\n\r\n'
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    await reader.readexactly(int(line.split(b':', 1)[1]))
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def load(port, connections, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(port, deadline, latencies) for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+
+def report(label, latencies, elapsed):
+    latencies.sort()
+    print(f"{label:<10} {len(latencies) / elapsed:>10.0f} req/s   "
+          f"p50={percentile(latencies, 0.50) * 1000:.2f}ms   "
+          f"p99={percentile(latencies, 0.99) * 1000:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--body-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    with open('config.json', 'r') as f:
+        server_ids = json.load(f)['servers']
+
+    port_queue = multiprocessing.Queue()
+    stubs = multiprocessing.Process(
+        target=run_stubs, args=(len(server_ids), args.body_size, port_queue), daemon=True
+    )
+    stubs.start()
+    stub_ports = [port_queue.get() for _ in server_ids]
+    upstreams = {server_id: f'127.0.0.1:{port}' for server_id, port in zip(server_ids, stub_ports)}
+
+    proxy = multiprocessing.Process(target=run_proxy, args=(upstreams, port_queue), daemon=True)
+    proxy.start()
+    proxy_port = port_queue.get()
+
+    print(f"📈 {args.connections} keep-alive connections, {args.duration:.0f}s per run")
+    report('direct', *asyncio.run(load(stub_ports[0], args.connections, args.duration)))
+    report('proxied', *asyncio.run(load(proxy_port, args.connections, args.duration)))
+
+    proxy.terminate()
+    stubs.terminate()
+
+
+if __name__ == '__main__':
+    main()
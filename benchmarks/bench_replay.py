@@ -0,0 +1,70 @@
+"""Replay throughput and memory for growing request logs.
+
+Writes synthetic gzip-compressed request logs (a daily traffic cycle with
+occasional spikes, a mix of paths, lognormal latencies, 1% server errors),
+replays each one with `replay.py --speed 0` in a child process and reports
+requests/s and the child's peak RSS, which should not grow with log size.
+
+Run from the repository root:
+    python -m benchmarks.bench_replay --sizes 100000 1000000
+"""
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PATHS = ('/', '/api/items', '/api/orders', '/upload', '/static/app.js')
+
+
+def write_log(path, size, rng, start=1700000000.0):
+    timestamp = start
+    with gzip.open(path, 'wt', compresslevel=1) as f:
+        for _ in range(size):
+            hour = (timestamp / 3600) % 24
+            rate = 60 + 40 * math.sin((hour - 6) / 24 * 2 * math.pi)
+            if rng.random() < 0.0005:
+                rate *= 4
+            timestamp += rng.expovariate(rate)
+            f.write(json.dumps({
+                'timestamp': round(timestamp, 3),
+                'path': rng.choice(PATHS),
+                'latency': round(rng.lognormvariate(-2.5, 0.6), 4),
+                'status': 500 if rng.random() < 0.01 else 200
+            }) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='*', default=[100000, 1000000])
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    directory = tempfile.mkdtemp(prefix='plb_replay_')
+    try:
+        print(f"{'requests':>10}{'log size':>12}{'replay':>10}{'req/s':>10}{'peak rss':>12}")
+        for size in args.sizes:
+            path = os.path.join(directory, f'requests-{size}.jsonl.gz')
+            write_log(path, size, rng)
+            start = time.perf_counter()
+            child = subprocess.Popen(
+                [sys.executable, 'replay.py', path, '--speed', '0'], stdout=subprocess.DEVNULL
+            )
+            _, status, usage = os.wait4(child.pid, 0)
+            elapsed = time.perf_counter() - start
+            if status:
+                raise RuntimeError(f'replay.py exited with status {status}')
+            print(f"{size:>10}{os.path.getsize(path) / 1e6:>10.1f}MB{elapsed:>9.1f}s"
+                  f"{size / elapsed:>10.0f}{usage.ru_maxrss / 1024:>10.1f}MB")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
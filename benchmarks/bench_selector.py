@@ -0,0 +1,61 @@
+"""Weighted server selection microbenchmark.
+
+Compares the old per-request scan (filter every server, then random.choice)
+with a prebuilt AliasTable pick, and checks that picks are proportional to
+health score.
+
+Run from the repository root:
+    python -m benchmarks.bench_selector --servers 10000
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from weighted_selector import AliasTable
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return 1e6 * (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, default=10000)
+    parser.add_argument('--picks', type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    server_ids = [f'server{i}' for i in range(args.servers)]
+    health = {server_id: rng.uniform(20, 100) for server_id in server_ids}
+    overloaded = {server_id: health[server_id] < 30 for server_id in server_ids}
+
+    def scan_and_choose():
+        healthy = [server_id for server_id in server_ids if not overloaded[server_id]]
+        return random.choice(healthy)
+
+    start = time.perf_counter()
+    routable = [server_id for server_id in server_ids if not overloaded[server_id]]
+    table = AliasTable(routable, [health[server_id] for server_id in routable])
+    build_ms = 1000 * (time.perf_counter() - start)
+
+    scan_calls = max(1, min(args.picks, 2_000_000 // args.servers))
+    print(f"⚖️  {args.servers} servers ({len(routable)} routable)")
+    print(f"alias build      {build_ms:10.2f} ms (once per metrics update)")
+    print(f"scan + choice    {per_call_us(scan_and_choose, scan_calls):10.3f} µs/pick")
+    print(f"alias pick       {per_call_us(table.pick, args.picks):10.3f} µs/pick")
+
+    counts = Counter(table.pick() for _ in range(args.picks))
+    total_weight = sum(health[server_id] for server_id in routable)
+    # Compare the observed share of the 10 heaviest servers with their expected share
+    heaviest = sorted(routable, key=health.get, reverse=True)[:10]
+    expected = sum(health[s] for s in heaviest) / total_weight
+    observed = sum(counts[s] for s in heaviest) / args.picks
+    print(f"top-10 share     expected={expected:.4%} observed={observed:.4%}")
+
+
+if __name__ == '__main__':
+    main()
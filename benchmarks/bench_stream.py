@@ -0,0 +1,94 @@
+"""Dashboard stream fan-out cost as the number of subscribers grows.
+
+Each subscriber is a thread consuming DashboardBroadcaster.subscribe(), the
+same generator the /stream endpoint hands to Flask. For each subscriber
+count a series of snapshots is published and the publisher's time per event
+and the process CPU per event are printed next to what the same subscribers
+would cost by polling (one dashboard payload built and encoded per client).
+Building and encoding the payload happens once per event whatever the
+subscriber count; what remains is waking the subscriber threads.
+
+Run from the repository root:
+    python -m benchmarks.bench_stream --subscribers 1 10 100 1000 --events 50
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from benchmarks import fixtures
+from dashboard_stream import DashboardBroadcaster, encode_event
+from fleet_metrics import DEFAULT_HEALTH_WEIGHTS
+
+
+def make_snapshot(version, server_ids, step):
+    # cpu shifts every step, so each event carries a changed row for every server
+    cpu = (np.arange(len(server_ids)) + step) % 100 / 100
+    return fixtures.make_snapshot(
+        server_ids, version, 100.0 + step, {'cpu_usage': cpu}, last_update=time.time(),
+        weights=DEFAULT_HEALTH_WEIGHTS, thresholds={}
+    )
+
+
+def run(subscribers, events, server_ids, interval):
+    broadcaster = DashboardBroadcaster(heartbeat=1.0)
+    broadcaster.publish(make_snapshot(0, server_ids, 0))
+    received = [0] * subscribers
+    stop = threading.Event()
+
+    def consume(index):
+        for chunk in broadcaster.subscribe():
+            if stop.is_set():
+                return
+            if not chunk.startswith(b':'):
+                received[index] += 1
+
+    threads = [threading.Thread(target=consume, args=(i,), daemon=True) for i in range(subscribers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+
+    snapshots = [make_snapshot(v, server_ids, v) for v in range(1, events + 1)]
+    publish_time = 0.0
+    cpu_start = time.process_time()
+    for snapshot in snapshots:
+        start = time.perf_counter()
+        broadcaster.publish(snapshot)
+        publish_time += time.perf_counter() - start
+        time.sleep(interval)
+    cpu = time.process_time() - cpu_start
+
+    stop.set()
+    delivered = sum(received) - subscribers  # minus the initial full payload
+    return publish_time / events, cpu / events, delivered / (subscribers * events)
+
+
+def payload_cost(snapshot, repeats=50):
+    """CPU seconds to build and encode one dashboard payload, as a /dashboard_data poll does"""
+    start = time.process_time()
+    for _ in range(repeats):
+        encode_event('full', snapshot.version, snapshot.to_dashboard_data())
+    return (time.process_time() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscribers', type=int, nargs='*', default=[1, 10, 100, 1000])
+    parser.add_argument('--events', type=int, default=50)
+    parser.add_argument('--servers', type=int, default=50)
+    parser.add_argument('--interval', type=float, default=0.02)
+    args = parser.parse_args()
+
+    server_ids = [f'server{i}' for i in range(args.servers)]
+    print(f"📡 {args.events} events, {args.servers} servers")
+    per_poll = payload_cost(make_snapshot(1, server_ids, 1))
+    print(f"{'subscribers':>12}{'publish/event':>16}{'cpu/event':>12}{'polling cpu':>14}{'delivered':>12}")
+    for subscribers in args.subscribers:
+        publish, cpu, delivered = run(subscribers, args.events, server_ids, args.interval)
+        print(f"{subscribers:>12}{publish * 1e6:>14.0f}µs{cpu * 1e3:>10.2f}ms"
+              f"{per_poll * subscribers * 1e3:>12.2f}ms{delivered:>12.0%}")
+
+
+if __name__ == '__main__':
+    main()
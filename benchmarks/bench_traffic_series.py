@@ -0,0 +1,84 @@
+"""Per-tenant traffic series at scale: record cost, tick time, queries and LRU churn.
+
+Fills a TrafficSeriesStore with `--series` (tenant, route) series, then
+times `record` on the request path, a full tick across every live series,
+top-N and per-tenant queries, and ticks where `--churn` new series arrive
+into a store that is already at `max_series` so the least recently active
+ones are evicted. Reports the memory held by the store's arrays.
+
+Run from the repository root:
+    python -m benchmarks.bench_traffic_series --series 100000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from traffic_series import TrafficSeriesStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--series', type=int, default=100000)
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=200000, help='requests recorded per tick')
+    parser.add_argument('--churn', type=int, default=10000, help='new series per tick once full')
+    parser.add_argument('--window', type=int, default=32)
+    args = parser.parse_args()
+
+    keys = [(f'tenant{i % args.tenants}', f'/api/route{i // args.tenants}') for i in range(args.series)]
+    store = TrafficSeriesStore({'max_series': args.series, 'window': args.window, 'idle_ttl': 1e9})
+    rng = np.random.default_rng(4)
+
+    # Every series sees traffic once, then a Zipf-skewed share of it per tick
+    for key in keys:
+        store.record(key)
+    start = time.perf_counter()
+    store.tick(0.0)
+    first = time.perf_counter() - start
+
+    record_time = tick_time = 0.0
+    for tick in range(1, args.ticks + 1):
+        picks = (rng.zipf(1.3, args.requests) - 1) % len(keys)
+        batch = [keys[index] for index in picks.tolist()]
+        start = time.perf_counter()
+        for key in batch:
+            store.record(key)
+        record_time += time.perf_counter() - start
+        start = time.perf_counter()
+        store.tick(tick * 5.0)
+        tick_time += time.perf_counter() - start
+
+    start = time.perf_counter()
+    top = store.query(limit=100)
+    top_time = time.perf_counter() - start
+    start = time.perf_counter()
+    tenant = store.query(tenant='tenant7', limit=None)
+    tenant_time = time.perf_counter() - start
+    start = time.perf_counter()
+    store.series(keys[0])
+    series_time = time.perf_counter() - start
+
+    churn_time = 0.0
+    for tick in range(args.ticks + 1, args.ticks + 6):
+        for i in range(args.churn):
+            store.record(('new', f'/burst{tick}/{i}'))
+        start = time.perf_counter()
+        store.tick(tick * 5.0)
+        churn_time += time.perf_counter() - start
+
+    stats = store.stats()
+    print(f"📚 {args.series} series across {args.tenants} tenants, window {args.window}")
+    print(f"   record: {record_time / (args.ticks * args.requests) * 1e9:.0f} ns per request")
+    print(f"   tick: {tick_time / args.ticks * 1000:.1f} ms for {args.series} series "
+          f"(first tick with allocation {first * 1000:.0f} ms)")
+    print(f"   query top 100: {top_time * 1000:.2f} ms (busiest {top[0]['key']} at {top[0]['rate']:.0f} req/s), "
+          f"tenant filter: {tenant_time * 1000:.2f} ms for {len(tenant)} series, one series: {series_time * 1e6:.0f} µs")
+    print(f"   churn: {churn_time / 5 * 1000:.1f} ms per tick with {args.churn} new series, "
+          f"{stats['evicted']} evicted, {stats['series']} live")
+    print(f"   memory: {stats['bytes'] / 1e6:.1f} MB in arrays ({stats['bytes'] / args.series:.0f} bytes per series)")
+
+
+if __name__ == '__main__':
+    main()
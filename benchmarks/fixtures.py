@@ -0,0 +1,43 @@
+"""Synthetic fleets and snapshots shared by the benchmarks.
+
+Fleets are scored on cpu alone against a 0.8 overload threshold unless a
+benchmark passes its own weights and thresholds. Every metric defaults to
+0.2 and request_rate to 1000 req/s, which keeps every server low risk
+under the default forecast, so the whole fleet stays routable.
+"""
+import numpy as np
+
+from fleet_metrics import METRIC_COLUMNS, FleetMetrics
+from snapshot import BalancerSnapshot
+
+WEIGHTS = {'cpu_usage': 1.0}
+THRESHOLDS = {'cpu_usage': 0.8}
+
+
+def random_columns(count, seed=1):
+    """Metric columns spread over realistic ranges (cpu 10-90%, response time 0.1-2s, ...)"""
+    rng = np.random.default_rng(seed)
+    return {
+        'cpu_usage': rng.uniform(0.1, 0.9, count),
+        'memory_usage': rng.uniform(0.3, 0.9, count),
+        'response_time': rng.uniform(0.1, 2.0, count),
+        'error_rate': rng.uniform(0.0, 0.1, count),
+        'request_rate': rng.uniform(50, 1000, count)
+    }
+
+
+def make_fleet(server_ids, columns=None, last_update=0.0, weights=WEIGHTS, thresholds=THRESHOLDS):
+    """FleetMetrics for `server_ids`; `columns` overrides whole metrics with an array or one value"""
+    count = len(server_ids)
+    table = {name: np.full(count, 0.2) for name in METRIC_COLUMNS}
+    table['request_rate'] = np.full(count, 1000.0)
+    for name, values in (columns or {}).items():
+        table[name] = np.broadcast_to(np.asarray(values, dtype=np.float64), (count,)).copy()
+    return FleetMetrics(server_ids, table, np.full(count, float(last_update)), weights, thresholds)
+
+
+def make_snapshot(server_ids, version=1, traffic=100.0, columns=None, draining=frozenset(), ejected=frozenset(),
+                  **fleet_options):
+    """Snapshot of make_fleet(server_ids, columns, **fleet_options) with `traffic` current and predicted"""
+    fleet = make_fleet(server_ids, columns, **fleet_options)
+    return BalancerSnapshot.from_fleet(version, traffic, traffic, False, fleet, draining, ejected)
@@ -0,0 +1,130 @@
+"""Load test for the production serving stack (serve.py), reported per core.
+
+Starts `serve.py` with each requested worker count (or targets an already
+running server with --port and a single --workers value), drives it with
+keep-alive HTTP/1.1 clients spread over several client processes, and
+prints throughput, latency and req/s per core used by the server, where
+cores used is min(workers, CPU count). Requests cycle through /route,
+/predict and /metrics.
+
+Run from the repository root:
+    python -m benchmarks.load_serve --workers 1 2 4 --connections 64 --duration 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_proxy import percentile
+
+PATHS = ('/route?path=/', '/route?path=/api/items', '/predict', '/metrics')
+
+
+async def client_loop(port, deadline, latencies, offset):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    requests = [f'GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n'.encode() for path in PATHS]
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(requests[i % len(requests)])
+            head = await reader.readuntil(b'\r\n\r\n')
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    await reader.readexactly(int(line.split(b':', 1)[1]))
+            latencies.append(time.perf_counter() - start)
+            i += 1
+    finally:
+        writer.close()
+
+
+def client_process(port, connections, duration, results):
+    async def run():
+        latencies = []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(client_loop(port, deadline, latencies, i) for i in range(connections)))
+        return latencies
+
+    results.put(asyncio.run(run()))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server did not start listening on port {port}')
+
+
+def load(port, connections, client_processes, duration):
+    results = multiprocessing.Queue()
+    per_process = max(1, connections // client_processes)
+    clients = [
+        multiprocessing.Process(target=client_process, args=(port, per_process, duration, results))
+        for _ in range(client_processes)
+    ]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    latencies = []
+    for _ in clients:
+        latencies.extend(results.get())
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        client.join()
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4])
+    parser.add_argument('--port', type=int, help='load an already running server instead')
+    parser.add_argument('--connections', type=int, default=64)
+    parser.add_argument('--client-processes', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    cores = os.cpu_count()
+    print(f"📈 {args.connections} keep-alive connections from {args.client_processes} processes, "
+          f"{args.duration:.0f}s per run, {cores} CPUs")
+    print(f"{'workers':>8}{'req/s':>10}{'req/s/core':>12}{'p50':>10}{'p99':>10}")
+    for workers in args.workers:
+        server = None
+        port = args.port
+        if port is None:
+            port = free_port()
+            server = subprocess.Popen(
+                [sys.executable, 'serve.py', '--workers', str(workers), '--port', str(port),
+                 '--host', '127.0.0.1', '--no-background-tasks'],
+                stdout=subprocess.DEVNULL
+            )
+        try:
+            wait_for_port(port)
+            time.sleep(1.0)  # let every worker finish starting
+            latencies, elapsed = load(port, args.connections, args.client_processes, args.duration)
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+        latencies.sort()
+        throughput = len(latencies) / elapsed
+        print(f"{workers:>8}{throughput:>10.0f}{throughput / min(workers, cores):>12.0f}"
+              f"{percentile(latencies, 0.50) * 1000:>8.2f}ms{percentile(latencies, 0.99) * 1000:>8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Compare routing strategies' tail latency on one synthetic request trace.
+
+Servers are modelled as FIFO queues with a fixed number of worker slots and
+heterogeneous speeds. Every strategy sees exactly the same arrivals and
+service demands, and routes with live in-flight counters.
+
+Run from the repository root:
+    python -m benchmarks.sim_strategies --servers 16 --requests 200000 --load 0.85
+"""
+import argparse
+import heapq
+import random
+import time
+from collections import deque
+
+from benchmarks import fixtures
+from routing_strategies import STRATEGIES, InFlightCounters
+
+
+def make_trace(requests, arrival_rate, mean_service, seed):
+    rng = random.Random(seed)
+    now = 0.0
+    trace = []
+    for _ in range(requests):
+        now += rng.expovariate(arrival_rate)
+        trace.append((now, rng.expovariate(1.0 / mean_service)))
+    return trace
+
+
+def make_snapshot(speeds):
+    # Score on CPU alone, with CPU headroom proportional to speed, so each
+    # server's health score matches its relative capacity
+    fastest = max(speeds.values())
+    cpu = [1 - speed / fastest for speed in speeds.values()]
+    return fixtures.make_snapshot(list(speeds), traffic=0.0, columns={'cpu_usage': cpu}, thresholds={})
+
+
+def simulate(strategy, snapshot, speeds, workers, trace):
+    in_flight = InFlightCounters(speeds)
+    busy = dict.fromkeys(speeds, 0)
+    queues = {server_id: deque() for server_id in speeds}
+    completions = []  # heap of (finish_time, server_id, arrival_time)
+    latencies = []
+
+    def begin(server_id, now, arrival, demand):
+        busy[server_id] += 1
+        heapq.heappush(completions, (now + demand / speeds[server_id], server_id, arrival))
+
+    def complete_until(now):
+        while completions and completions[0][0] <= now:
+            finish, server_id, arrival = heapq.heappop(completions)
+            latencies.append(finish - arrival)
+            in_flight.finish(server_id)
+            busy[server_id] -= 1
+            if queues[server_id]:
+                queued_arrival, demand = queues[server_id].popleft()
+                begin(server_id, finish, queued_arrival, demand)
+
+    for arrival, demand in trace:
+        complete_until(arrival)
+        server_id = strategy.choose(snapshot, in_flight)
+        in_flight.start(server_id)
+        if busy[server_id] < workers:
+            begin(server_id, arrival, arrival, demand)
+        else:
+            queues[server_id].append((arrival, demand))
+    complete_until(float('inf'))
+    return sorted(latencies)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4, help='concurrent slots per server')
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--load', type=float, default=0.85, help='offered load / total capacity')
+    parser.add_argument('--mean-service', type=float, default=0.05, help='seconds at speed 1.0')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # A quarter of the fleet runs at half speed
+    speeds = {
+        f'server{i + 1}': 0.5 if rng.random() < 0.25 else 1.0 for i in range(args.servers)
+    }
+    capacity = sum(speeds.values()) * args.workers / args.mean_service
+    trace = make_trace(args.requests, args.load * capacity, args.mean_service, args.seed)
+    snapshot = make_snapshot(speeds)
+
+    print(f"🧪 {args.servers} servers x {args.workers} workers, load {args.load:.0%}, "
+          f"{args.requests} requests")
+    print(f"{'strategy':<30}{'p50 ms':>10}{'p99 ms':>10}{'p99.9 ms':>10}{'sim s':>8}")
+    for name, cls in STRATEGIES.items():
+        start = time.perf_counter()
+        latencies = simulate(cls(), snapshot, speeds, args.workers, trace)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<30}{percentile(latencies, 0.5) * 1000:>10.1f}"
+              f"{percentile(latencies, 0.99) * 1000:>10.1f}"
+              f"{percentile(latencies, 0.999) * 1000:>10.1f}{elapsed:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
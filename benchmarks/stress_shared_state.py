@@ -0,0 +1,120 @@
+"""Cross-process consistency and read throughput of the shared memory state.
+
+One writer process publishes whole-fleet snapshots and traffic samples as
+fast as it can while reader processes route from SharedStateReader. Every
+fleet a writer publishes carries its version in every request_rate cell and
+in current_traffic, so a reader that observes a mix of two publishes (a
+torn read) is detected. Prints routing decisions per second per reader and
+in total; exits non-zero on any torn read.
+
+Run from the repository root:
+    python -m benchmarks.stress_shared_state --readers 4 --servers 256 --seconds 5
+"""
+import argparse
+import multiprocessing
+import sys
+from multiprocessing import resource_tracker
+import time
+
+import numpy as np
+
+from benchmarks import fixtures
+from fleet_metrics import DEFAULT_HEALTH_WEIGHTS
+from ring_buffer import TrafficRingBuffer
+from shared_state import SharedStateReader, SharedStateWriter
+from snapshot import BalancerSnapshot
+
+THRESHOLDS = {'cpu_usage': 0.8}
+
+
+def make_fleet(server_ids, version):
+    cpu = np.where((version + np.arange(len(server_ids))) % 7 == 0, 0.9, 0.3)
+    return fixtures.make_fleet(
+        server_ids, {'cpu_usage': cpu, 'request_rate': version}, time.time(), DEFAULT_HEALTH_WEIGHTS, THRESHOLDS
+    )
+
+
+def run_writer(name, server_ids, history_capacity, seconds, published):
+    writer = SharedStateWriter(len(server_ids), history_capacity, name=name)
+    history = TrafficRingBuffer(history_capacity)
+    deadline = time.perf_counter() + seconds
+    version = 0
+    published.put('ready')
+    while time.perf_counter() < deadline:
+        version += 1
+        history.append(time.time(), float(version))
+        fleet = make_fleet(server_ids, version)
+        writer.publish(BalancerSnapshot.from_fleet(version, float(version), float(version), False, fleet), history)
+    published.put(version)
+    time.sleep(1.0)  # readers detach before the segment goes away
+    writer.close()
+
+
+def run_reader(name, server_ids, seconds, results):
+    reader = SharedStateReader(name, {}, server_ids, DEFAULT_HEALTH_WEIGHTS, THRESHOLDS)
+    torn = 0
+    decisions = 0
+    versions = set()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            reader.choose_server('/')
+        decisions += 100
+        snapshot = reader.snapshot
+        if snapshot.version not in versions:
+            versions.add(snapshot.version)
+            rates = snapshot.fleet.columns['request_rate']
+            if snapshot.current_traffic != snapshot.version or not np.all(rates == snapshot.version):
+                torn += 1
+            _, values = reader.traffic_history()
+            if len(values) and values[-1] > snapshot.version + 2 * len(server_ids):
+                torn += 1  # history far ahead of the fleet it was published with
+    results.put((decisions, len(versions), torn))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--servers', type=int, default=256)
+    parser.add_argument('--history', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Children share this process's resource tracker, as uvicorn workers share
+    # serve.py's, so the segment is only unlinked by the writer
+    resource_tracker.ensure_running()
+    name = f'plb_stress_{time.time_ns()}'
+    server_ids = [f'server{i}' for i in range(args.servers)]
+    published = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    writer = multiprocessing.Process(
+        target=run_writer, args=(name, server_ids, args.history, args.seconds + 1, published)
+    )
+    writer.start()
+    published.get()
+    readers = [
+        multiprocessing.Process(target=run_reader, args=(name, server_ids, args.seconds, results))
+        for _ in range(args.readers)
+    ]
+    for reader in readers:
+        reader.start()
+    outcomes = [results.get() for _ in readers]
+    for reader in readers:
+        reader.join()
+    versions = published.get()
+    writer.join()
+
+    total = sum(decisions for decisions, _, _ in outcomes)
+    torn = sum(t for _, _, t in outcomes)
+    print(f"🧠 {args.servers} servers, {versions} versions published, {args.readers} reader processes")
+    for i, (decisions, seen, t) in enumerate(outcomes):
+        print(f"   reader {i}: {decisions / args.seconds:>10.0f} decisions/s, {seen} versions seen, {t} torn")
+    print(f"   total:    {total / args.seconds:>10.0f} decisions/s")
+    if torn:
+        print(f"❌ {torn} torn reads")
+        sys.exit(1)
+    print("✅ No torn reads")
+
+
+if __name__ == '__main__':
+    main()
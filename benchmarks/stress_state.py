@@ -0,0 +1,128 @@
+"""Multi-threaded stress run for the balancer's shared state.
+
+Writer threads hammer traffic samples and whole-fleet metric updates while
+reader threads route, build dashboard payloads and read raw metrics. Every
+read checks invariants that would break on torn or half-published state.
+Exits non-zero if any invariant is violated.
+
+Run from the repository root:
+    python -m benchmarks.stress_state --seconds 10 --readers 8
+"""
+import argparse
+import math
+import sys
+import threading
+import time
+
+from predictive_balancer import PredictiveLoadBalancer
+
+
+def fleet_update(server_ids, generation):
+    # Every server in one update carries the same generation in request_rate,
+    # so a reader seeing two different values has observed a torn fleet.
+    overloaded = generation % 3 == 0
+    return {
+        server_id: {
+            'cpu_usage': 0.9 if overloaded else 0.3,
+            'memory_usage': 0.5,
+            'response_time': 0.2,
+            'error_rate': 0.01,
+            'request_rate': float(generation)
+        }
+        for server_id in server_ids
+    }
+
+
+def check_snapshot(snapshot, server_ids, last_version, errors):
+    if snapshot.version < last_version:
+        errors.append(f'snapshot version went backwards: {last_version} -> {snapshot.version}')
+    if set(snapshot.servers) != server_ids:
+        errors.append('snapshot server set changed')
+    rates = {state.request_rate for state in snapshot.servers.values()}
+    if len(rates) > 1:
+        errors.append(f'torn fleet in snapshot: request_rate values {sorted(rates)}')
+    if snapshot.healthy_count != sum(1 for s in snapshot.servers.values() if not s.overloaded):
+        errors.append('healthy_count disagrees with overload flags')
+    for server_id in snapshot.routable_servers:
+        state = snapshot.servers[server_id]
+        if state.overloaded or state.risk_level == 'high':
+            errors.append(f'{server_id} routable while overloaded/high risk')
+    if not math.isfinite(snapshot.predicted_traffic):
+        errors.append(f'non-finite prediction {snapshot.predicted_traffic}')
+    return snapshot.version
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--readers', type=int, default=8)
+    args = parser.parse_args()
+
+    # Switch threads far more often than usual to shake out interleavings
+    sys.setswitchinterval(1e-6)
+
+    balancer = PredictiveLoadBalancer(start_background_tasks=False)
+    server_ids = set(balancer.config['servers'])
+    balancer.health_monitor.bulk_update_server_metrics(fleet_update(server_ids, 1))
+    balancer.publish_snapshot()
+
+    stop = threading.Event()
+    errors = []
+    counts = {}
+
+    def traffic_writer():
+        n = 0
+        while not stop.is_set():
+            balancer.record_traffic(100 + n % 500)
+            n += 1
+        counts['traffic writes'] = n
+
+    def metrics_writer():
+        generation = 1
+        while not stop.is_set():
+            generation += 1
+            balancer.health_monitor.bulk_update_server_metrics(fleet_update(server_ids, generation))
+            balancer.publish_snapshot()
+        counts['fleet writes'] = generation
+
+    def reader(index):
+        n = 0
+        last_version = 0
+        while not stop.is_set():
+            last_version = check_snapshot(balancer.snapshot, server_ids, last_version, errors)
+
+            server_id = balancer.get_best_server()
+            if server_id not in server_ids:
+                errors.append(f'routed to unknown server {server_id!r}')
+
+            dashboard = balancer.get_dashboard_data()
+            if dashboard['total_servers'] != len(server_ids):
+                errors.append('dashboard total_servers mismatch')
+
+            rates = {m['request_rate'] for m in balancer.health_monitor.server_metrics.values()}
+            if len(rates) > 1:
+                errors.append(f'torn fleet in server_metrics: {sorted(rates)}')
+            n += 1
+        counts[f'reader {index}'] = n
+
+    threads = [threading.Thread(target=traffic_writer), threading.Thread(target=metrics_writer)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    reads = sum(v for k, v in counts.items() if k.startswith('reader'))
+    print(f"🧵 {args.readers} readers: {reads / args.seconds:.0f} reads/s, "
+          f"{counts['traffic writes'] / args.seconds:.0f} traffic writes/s, "
+          f"{counts['fleet writes'] / args.seconds:.0f} fleet writes/s")
+    if errors:
+        print(f"❌ {len(errors)} invariant violations, first: {errors[0]}")
+        sys.exit(1)
+    print("✅ No invariant violations")
+
+
+if __name__ == '__main__':
+    main()
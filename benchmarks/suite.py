@@ -0,0 +1,252 @@
+"""Benchmark suite for the routing, prediction and dashboard paths, with regression checks.
+
+Runs offline against in-process objects (no config.json, network or history
+files: the health monitors get SUITE_CONFIG) and times, for each fleet size
+or history length:
+
+    get_best_server         Router decision over a published snapshot, per strategy
+    predict_next_traffic    forecast from a predictor holding N samples
+    detect_spike            spike check against the same predictor
+    forecast                multi-horizon quantile forecast, computed and cached
+    calculate_health_score  one server's metrics dict
+    get_dashboard_data      dashboard payload of a freshly published snapshot
+
+Each case reports ops/s, p50 and p99 latency and the peak memory allocated
+by one call (tracemalloc). Fast calls are timed in batches, so the
+percentiles are of per-call means over batches of at least `--min-batch-us`.
+Results can be saved as JSON and compared with an earlier run; the exit
+status is 1 when any case lost more than `--threshold` of its throughput,
+or, with `--p99-threshold`, when its p99 grew by more than that fraction
+(tail latency is noisier, so it gets its own, usually looser, limit).
+
+Run from the repository root, or as a script from anywhere:
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --compare bench.json --threshold 0.15
+    python path/to/benchmarks/suite.py --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Run as a script, the suite's directory is on the path instead of the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fixtures import random_columns
+from routing_strategies import STRATEGIES, ConsistentHashStrategy, Router
+from server_health import ServerHealthMonitor
+from simple_predictor import SimpleTrafficPredictor
+from snapshot import BalancerSnapshot
+
+# Health scoring settings of the shipped config.json, fixed so results do not depend on local edits
+SUITE_CONFIG = {
+    'health_weights': {'cpu_usage': 1.0, 'memory_usage': 1.0, 'response_time': 1.0, 'error_rate': 1.0},
+    'overload_thresholds': {'cpu_usage': 0.8, 'memory_usage': 0.85, 'response_time': 2.0, 'error_rate': 0.1}
+}
+
+
+def random_metrics(rng):
+    return {
+        'cpu_usage': rng.uniform(0.1, 0.9),
+        'memory_usage': rng.uniform(0.3, 0.9),
+        'response_time': rng.uniform(0.1, 2.0),
+        'error_rate': rng.uniform(0.0, 0.1),
+        'request_rate': rng.uniform(50, 1000)
+    }
+
+
+def make_monitor(servers, seed=1):
+    """ServerHealthMonitor scoring `servers` servers with random metrics under SUITE_CONFIG"""
+    server_ids = [f'server{i}' for i in range(servers)]
+    monitor = ServerHealthMonitor(SUITE_CONFIG)
+    monitor.bulk_update_server_metrics({server_id: {} for server_id in server_ids})
+    monitor.bulk_update_metric_columns(server_ids, random_columns(servers, seed))
+    return monitor
+
+
+def make_predictor(samples, seed=1):
+    rng = random.Random(seed)
+    predictor = SimpleTrafficPredictor(max_history=samples)
+    for i in range(samples):
+        predictor.add_traffic_data(200 + 50 * np.sin(i / 20) + rng.gauss(0, 10), 1000.0 + 5 * i)
+    return predictor
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else 0.0
+
+
+def measure(fn, duration, min_batch, setup=None):
+    """Time `fn` for about `duration` seconds; returns the case's result dict.
+
+    With `setup`, each call gets a fresh argument built outside the timed region.
+    """
+    if setup is None:
+        # Size batches so timer overhead stays small next to the calls
+        batch, start = 1, time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        while elapsed < min_batch and batch < 1 << 20:
+            batch *= 2
+            start = time.perf_counter()
+            for _ in range(batch):
+                fn()
+            elapsed = time.perf_counter() - start
+    else:
+        batch = 1
+
+    samples, total, calls = [], 0.0, 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline or len(samples) < 5:
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        if setup:
+            fn(argument)
+        else:
+            for _ in range(batch):
+                fn()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / batch)
+        total += elapsed
+        calls += batch
+
+    argument = setup() if setup else None
+    tracemalloc.start()
+    try:
+        fn(argument) if setup else fn()
+        allocated = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'ops_per_sec': calls / total,
+        'p50_us': percentile(samples, 50) * 1e6,
+        'p99_us': percentile(samples, 99) * 1e6,
+        'calls': calls,
+        'batch': batch,
+        'peak_alloc_bytes': allocated
+    }
+
+
+def cases(servers, history):
+    """(name, fn, setup) for every benchmarked call"""
+    for size in servers:
+        monitor = make_monitor(size)
+        predictor = make_predictor(100)
+        snapshot = BalancerSnapshot.build(1, 200.0, predictor, monitor)
+        router = Router({}, monitor.fleet.server_ids)
+        for strategy in STRATEGIES:
+            key = 'session-42' if strategy == ConsistentHashStrategy.name else None
+            yield (f'get_best_server[{strategy}] servers={size}',
+                   lambda router=router, snapshot=snapshot, strategy=strategy, key=key:
+                       router.choose(snapshot, '/', strategy, key), None)
+        yield (f'health_monitor.get_best_server servers={size}', monitor.get_best_server, None)
+
+        versions = iter(range(2, 1 << 62))
+        yield (f'get_dashboard_data servers={size}',
+               lambda snapshot: snapshot.to_dashboard_data(),
+               lambda monitor=monitor, predictor=predictor, versions=versions:
+                   BalancerSnapshot.build(next(versions), 200.0, predictor, monitor))
+
+    for samples in history:
+        predictor = make_predictor(samples)
+        yield f'predict_next_traffic history={samples}', predictor.predict_next_traffic, None
+        yield f'detect_spike history={samples}', lambda predictor=predictor: predictor.detect_spike(260.0), None
+        yield f'forecast[cached] history={samples}', predictor.forecast, None
+
+        def uncached(predictor=predictor):
+            predictor._forecast_cache = (None, ())  # as if a new sample had arrived
+            return predictor
+        yield f'forecast[fresh] history={samples}', lambda predictor: predictor.forecast(), uncached
+
+    monitor = ServerHealthMonitor(SUITE_CONFIG)
+    metrics = random_metrics(random.Random(2))
+    yield 'calculate_health_score', lambda: monitor.calculate_health_score(metrics), None
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10, cwd=ROOT
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor()
+    }
+
+
+def compare(results, baseline, threshold, p99_threshold=None):
+    """Cases that got slower than `baseline` beyond the thresholds; returns [(name, reason)]"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['ops_per_sec'] < before['ops_per_sec'] * (1 - threshold):
+            regressions.append((name, f"ops/s {before['ops_per_sec']:,.0f} -> {result['ops_per_sec']:,.0f}"))
+        elif p99_threshold is not None and result['p99_us'] > before['p99_us'] * (1 + p99_threshold):
+            regressions.append((name, f"p99 {before['p99_us']:.2f} -> {result['p99_us']:.2f} µs"))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, nargs='*', default=[4, 100, 1000, 10000])
+    parser.add_argument('--history', type=int, nargs='*', default=[10, 100, 1000])
+    parser.add_argument('--duration', type=float, default=0.3, help='seconds per case')
+    parser.add_argument('--min-batch-us', type=float, default=50.0)
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed ops/s loss as a fraction')
+    parser.add_argument('--p99-threshold', type=float, help='allowed p99 growth as a fraction (default: not checked)')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    print(f"{'case':<58}{'ops/s':>14}{'p50 µs':>11}{'p99 µs':>11}{'alloc KiB':>11}{'vs base':>9}")
+    for name, fn, setup in cases(args.servers, args.history):
+        if args.filter not in name:
+            continue
+        result = results[name] = measure(fn, args.duration, args.min_batch_us / 1e6, setup)
+        change = ''
+        if name in baseline:
+            change = f"{result['ops_per_sec'] / baseline[name]['ops_per_sec'] - 1:+.0%}"
+        print(f"{name:<58}{result['ops_per_sec']:>14,.0f}{result['p50_us']:>11.2f}{result['p99_us']:>11.2f}"
+              f"{result['peak_alloc_bytes'] / 1024:>11.1f}{change:>9}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, baseline, args.threshold, args.p99_threshold)
+        for name, reason in regressions:
+            print(f"❌ {name}: {reason}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"✅ No regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+DEFAULT_CIRCUIT_BREAKER = {
+    'consecutive_failures': 5,
+    'window': 20,
+    'min_requests': 10,
+    'error_rate_threshold': 0.5,
+    'latency_factor': 3.0,
+    'min_latency': 0.05,
+    'base_ejection_time': 5.0,
+    'max_ejection_time': 300.0,
+    'max_ejection_percent': 0.5,
+    'half_open_requests': 1,
+    'sweep_interval': 1.0
+}
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker:
+    """Breaker state for one backend, driven by the outcomes of requests sent to it"""
+
+    def __init__(self, window):
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window)  # (ok, latency seconds)
+        self.failures = 0  # consecutive
+        self.ejections = 0  # back-off exponent for the next ejection
+        self.until = 0.0  # end of the current ejection
+        self.changed_at = 0.0
+        self.probes = 0  # trial requests left while half-open
+        self.probed_at = 0.0
+        self.reason = ''
+        self.epoch = 0  # bumped on every state change; outcomes of requests from an older epoch are stale
+
+    def error_rate(self):
+        return sum(not ok for ok, _ in self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def latency(self):
+        return sum(latency for _, latency in self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def to_dict(self, now):
+        return {
+            'state': self.state,
+            'reason': self.reason,
+            'ejections': self.ejections,
+            'reopens_in': max(0.0, self.until - now) if self.state == OPEN else 0.0,
+            'consecutive_failures': self.failures,
+            'error_rate': self.error_rate(),
+            'latency': self.latency(),
+            'requests': len(self.outcomes)
+        }
+
+
+class BreakerBoard:
+    """Per-server circuit breakers plus passive outlier ejection.
+
+    Outcomes of proxied requests are fed to `record`. A server trips open
+    after `consecutive_failures` failures in a row, or at a `sweep` when
+    over its last `window` requests its error rate reaches
+    `error_rate_threshold` or its mean latency exceeds `latency_factor`
+    times the fleet median. An open server gets no traffic for
+    `base_ejection_time * 2**n` seconds (capped at `max_ejection_time`),
+    where n counts its recent ejections, so a flapping server stays out
+    longer each time; after staying healthy for `max_ejection_time` it is
+    back to the base time. When the time is up it turns half-open and
+    `take_probe` hands out `half_open_requests` trial requests: success
+    closes the breaker, failure opens it again. At most
+    `max_ejection_percent` of the fleet is ejected at once (at least one
+    server); `fleet_size` returns the fleet's size, and without it only
+    the servers that have reported an outcome are counted.
+
+    `ejected` and `half_open` are frozensets rebound on change, so routing
+    reads them without the lock; each of `listeners` is called (no
+    arguments) after `ejected` changes. Callers take `epoch(server_id)`
+    when they route a request and pass it back to `record`; an outcome
+    from before the breaker last changed state (say, a slow response that
+    was sent while closed and lands once half-open) is ignored instead of
+    being taken for the probe's.
+    """
+
+    def __init__(self, config=None, fleet_size=None):
+        self.config = {**DEFAULT_CIRCUIT_BREAKER, **(config or {})}
+        self.fleet_size = fleet_size
+        self.breakers = {}
+        self.lock = threading.Lock()
+        self.ejected = frozenset()  # open or half-open: not routable
+        self.half_open = frozenset()
+        self.listeners = []
+
+    def _breaker(self, server_id):
+        breaker = self.breakers.get(server_id)
+        if breaker is None:
+            breaker = self.breakers[server_id] = CircuitBreaker(self.config['window'])
+        return breaker
+
+    def _can_eject(self):
+        size = self.fleet_size() if self.fleet_size is not None else len(self.breakers)
+        limit = int(self.config['max_ejection_percent'] * size)
+        return len(self.ejected) < max(1, limit)
+
+    def epoch(self, server_id):
+        """Tag for a request being routed to `server_id` now; read without the lock"""
+        breaker = self.breakers.get(server_id)
+        return breaker.epoch if breaker is not None else 0
+
+    def _open(self, server_id, breaker, now, reason):
+        backoff = self.config['base_ejection_time'] * 2 ** breaker.ejections
+        breaker.state = OPEN
+        breaker.epoch += 1
+        breaker.until = now + min(backoff, self.config['max_ejection_time'])
+        breaker.ejections += 1
+        breaker.changed_at = now
+        breaker.reason = reason
+        breaker.outcomes.clear()
+        breaker.failures = 0
+        self.ejected = self.ejected | {server_id}
+        self.half_open = self.half_open - {server_id}
+
+    def _close(self, server_id, breaker, now):
+        breaker.state = CLOSED
+        breaker.epoch += 1
+        breaker.changed_at = now
+        breaker.reason = ''
+        breaker.outcomes.clear()
+        breaker.failures = 0
+        self.ejected = self.ejected - {server_id}
+        self.half_open = self.half_open - {server_id}
+
+    def _notify(self, before):
+        if self.ejected != before:
+            for listener in self.listeners:
+                listener()
+
+    def record(self, server_id, ok, latency, now=None, epoch=None):
+        """Feed the outcome of one request (`ok` False for 5xx, refused or reset).
+
+        `epoch` is what `epoch(server_id)` returned when the request was
+        routed; None skips the staleness check.
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            before = self.ejected
+            breaker = self._breaker(server_id)
+            # Outcomes of requests routed before the last state change are ignored,
+            # as are any arriving while the breaker is open
+            if epoch is None or epoch == breaker.epoch:
+                if breaker.state == HALF_OPEN:
+                    if ok:
+                        self._close(server_id, breaker, now)
+                    else:
+                        self._open(server_id, breaker, now, 'failed half-open probe')
+                elif breaker.state == CLOSED:
+                    breaker.outcomes.append((ok, latency))
+                    breaker.failures = 0 if ok else breaker.failures + 1
+                    if breaker.failures >= self.config['consecutive_failures'] and self._can_eject():
+                        self._open(server_id, breaker, now, f'{breaker.failures} consecutive failures')
+        self._notify(before)
+
+    def sweep(self, now=None):
+        """Re-admit servers whose ejection is over and eject outliers; returns the newly ejected"""
+        now = time.monotonic() if now is None else now
+        config = self.config
+        with self.lock:
+            before = self.ejected
+            for server_id, breaker in self.breakers.items():
+                if breaker.state == OPEN and now >= breaker.until:
+                    breaker.state = HALF_OPEN
+                    breaker.epoch += 1
+                    breaker.changed_at = now
+                    breaker.probes = config['half_open_requests']
+                    self.half_open = self.half_open | {server_id}
+                elif (breaker.state == HALF_OPEN and not breaker.probes
+                      and now - breaker.probed_at >= config['base_ejection_time']):
+                    # The probe's outcome never came back; allow another one
+                    breaker.probes = config['half_open_requests']
+                elif (breaker.state == CLOSED and breaker.ejections
+                      and now - breaker.changed_at >= config['max_ejection_time']):
+                    breaker.ejections = 0
+
+            candidates = [
+                (server_id, breaker) for server_id, breaker in self.breakers.items()
+                if breaker.state == CLOSED and len(breaker.outcomes) >= config['min_requests']
+            ]
+            if candidates:
+                median = float(np.median([breaker.latency() for _, breaker in candidates]))
+                slow = max(config['min_latency'], config['latency_factor'] * median)
+                outliers = []
+                for server_id, breaker in candidates:
+                    error_rate, latency = breaker.error_rate(), breaker.latency()
+                    if error_rate >= config['error_rate_threshold']:
+                        outliers.append((error_rate, server_id, breaker, f'error rate {error_rate:.0%}'))
+                    elif latency > slow:
+                        outliers.append((latency / slow, server_id, breaker, f'latency {latency * 1000:.0f} ms'))
+                # Worst first, so the ejection cap keeps the sickest servers out
+                for _, server_id, breaker, reason in sorted(outliers, key=lambda item: item[0], reverse=True):
+                    if not self._can_eject():
+                        break
+                    self._open(server_id, breaker, now, reason)
+            ejected = self.ejected - before
+        self._notify(before)
+        return ejected
+
+    def take_probe(self):
+        """A half-open server due a trial request, or None; called on the routing path"""
+        if not self.half_open:
+            return None
+        with self.lock:
+            for server_id in self.half_open:
+                breaker = self.breakers[server_id]
+                if breaker.probes:
+                    breaker.probes -= 1
+                    breaker.probed_at = time.monotonic()
+                    return server_id
+        return None
+
+    def forget(self, server_ids):
+        """Removal listener: drop the breakers of servers that left the fleet"""
+        with self.lock:
+            before = self.ejected
+            for server_id in server_ids:
+                self.breakers.pop(server_id, None)
+            self.ejected = self.ejected - frozenset(server_ids)
+            self.half_open = self.half_open - frozenset(server_ids)
+        self._notify(before)
+
+    def status(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            return {server_id: breaker.to_dict(now) for server_id, breaker in self.breakers.items()}
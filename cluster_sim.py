@@ -0,0 +1,297 @@
+"""Discrete-event cluster simulator for capacity planning and routing comparisons.
+
+Time is virtual: a simulated day takes seconds. Each server is a FIFO queue
+with `--workers` slots, a relative speed and a service-time distribution.
+Arrivals follow a Poisson process whose rate follows a daily cycle with
+random spikes. Every `--tick` virtual seconds the simulator does what the
+balancer's background loops do in production: it feeds the observed rate to
+the configured SimpleTrafficPredictor, pushes per-server cpu (utilisation),
+response time, error rate (requests slower than `--timeout`) and request
+rate into a ServerHealthMonitor, and routes the next tick from a freshly
+built BalancerSnapshot using the real routing strategies and the overload
+thresholds from the config it is given (config.json from the command line).
+
+Routing decisions that do not depend on in-flight counts (the predictive
+strategy) and single-slot queues are computed with vectorized NumPy scans,
+so those runs simulate millions of requests per second of wall time; the
+in-flight-aware strategies route one request at a time.
+
+    python cluster_sim.py --servers 8 16 32 --duration 86400 --rate 2000
+"""
+import argparse
+import heapq
+import io
+import json
+import math
+import time
+from contextlib import redirect_stdout
+
+import numpy as np
+
+from routing_strategies import STRATEGIES, ConsistentHashStrategy, PredictiveStrategy
+from server_health import ServerHealthMonitor
+from simple_predictor import SimpleTrafficPredictor
+from snapshot import BalancerSnapshot
+
+# Latency histogram: log-spaced bins from 10µs to ~3 hours
+LATENCY_BINS = np.logspace(-5, 4, 901)
+
+
+class TrafficProfile:
+    """Arrival rate over virtual time: a daily sine cycle plus occasional spikes"""
+
+    def __init__(self, base_rate, amplitude=0.5, period=86400.0, spike_chance=0.01, spike_factor=3.0):
+        self.base_rate = base_rate
+        self.amplitude = amplitude
+        self.period = period
+        self.spike_chance = spike_chance
+        self.spike_factor = spike_factor
+
+    def rate(self, now, rng):
+        rate = self.base_rate * (1 + self.amplitude * math.sin(2 * math.pi * now / self.period))
+        if rng.random() < self.spike_chance:
+            rate *= self.spike_factor
+        return max(0.0, rate)
+
+
+class ServiceModel:
+    """Service demand in seconds at speed 1.0"""
+
+    def __init__(self, mean, distribution='exponential', sigma=0.5):
+        if distribution not in ('exponential', 'lognormal', 'deterministic'):
+            raise ValueError(f"Unknown service distribution '{distribution}'")
+        self.mean = mean
+        self.distribution = distribution
+        self.sigma = sigma
+
+    def sample(self, rng, size):
+        if self.distribution == 'exponential':
+            return rng.exponential(self.mean, size)
+        if self.distribution == 'lognormal':
+            # Parameterised so the mean stays `mean`
+            return rng.lognormal(math.log(self.mean) - self.sigma ** 2 / 2, self.sigma, size)
+        return np.full(size, self.mean)
+
+
+class SimulatedInFlight:
+    """In-flight counts from known departure times, in the InFlightCounters read interface"""
+
+    def __init__(self, index):
+        self.index = index
+        self.departures = [[] for _ in index]  # per-server heaps
+        self.now = 0.0
+
+    def add(self, slot, finish):
+        heapq.heappush(self.departures[slot], finish)
+
+    def get(self, server_id):
+        departures = self.departures[self.index[server_id]]
+        while departures and departures[0] <= self.now:
+            heapq.heappop(departures)
+        return len(departures)
+
+
+class SimulationResult:
+    def __init__(self, server_ids):
+        self.server_ids = server_ids
+        self.requests = 0
+        self.histogram = np.zeros(len(LATENCY_BINS) - 1, dtype=np.int64)
+        self.routed = np.zeros(len(server_ids), dtype=np.int64)
+        self.ticks = 0
+        self.overload_events = 0
+        self.peak_utilization = 0.0
+        self.wall_seconds = 0.0
+        self.virtual_seconds = 0.0
+
+    def percentile(self, fraction):
+        """Latency at `fraction` from the histogram (upper bin edge)"""
+        if not self.requests:
+            return 0.0
+        cumulative = np.cumsum(self.histogram)
+        index = min(len(self.histogram) - 1, int(np.searchsorted(cumulative, fraction * self.requests)))
+        return float(LATENCY_BINS[index + 1])
+
+
+class ClusterSimulator:
+    """One fleet under one routing strategy, advanced tick by tick on a virtual clock"""
+
+    def __init__(self, server_ids, speeds, workers, strategy, profile, service, config,
+                 tick=5.0, timeout=2.0, seed=1):
+        self.server_ids = list(server_ids)
+        self.index = {server_id: i for i, server_id in enumerate(self.server_ids)}
+        self.speeds = np.asarray(speeds, dtype=np.float64)
+        self.workers = workers
+        self.strategy = strategy
+        self.profile = profile
+        self.service = service
+        self.tick = tick
+        self.timeout = timeout
+        # Arrivals and demands come from their own stream so every strategy sees the same trace
+        self.trace_rng = np.random.default_rng(seed)
+        self.routing_rng = np.random.default_rng(seed + 1)
+        self.predictor = SimpleTrafficPredictor(config.get('max_history', 100), config.get('forecasting'))
+        self.health_monitor = ServerHealthMonitor(config)
+        self.health_monitor.bulk_update_server_metrics({server_id: {} for server_id in self.server_ids})
+        self.version = 0
+        self.snapshot = self.build_snapshot(0.0)
+        # Per server: time each worker slot frees up
+        self.slots = [[0.0] * workers for _ in self.server_ids]
+        self.in_flight = SimulatedInFlight(self.index)
+        self.result = SimulationResult(self.server_ids)
+
+    def build_snapshot(self, current_traffic, sample=None):
+        self.version += 1
+        return BalancerSnapshot.build(
+            self.version, current_traffic, self.predictor, self.health_monitor, sample=sample
+        )
+
+    def route_vectorized(self, count):
+        """Predictive strategy: health-weighted pick among routable servers, for a whole tick at once"""
+        snapshot = self.snapshot
+        if not snapshot.routable_servers:
+            return np.full(count, self.index[snapshot.fallback_server], dtype=np.intp)
+        candidates = np.array([self.index[server_id] for server_id in snapshot.routable_servers])
+        weights = snapshot.fleet.health[[snapshot.fleet.slots[s] for s in snapshot.routable_servers]]
+        weights = np.maximum(weights, 0.0)
+        total = weights.sum()
+        return self.routing_rng.choice(candidates, size=count, p=weights / total if total > 0 else None)
+
+    def queue_vectorized(self, assigned, arrivals, demands):
+        """FIFO departure times per server; single-slot queues use a max-plus scan (Lindley)"""
+        finishes = np.empty(len(arrivals))
+        for slot in np.unique(assigned):
+            mask = assigned == slot
+            arrived = arrivals[mask]
+            service = demands[mask] / self.speeds[slot]
+            if self.workers == 1:
+                total = np.cumsum(service)
+                start_bound = np.maximum.accumulate(arrived - (total - service))
+                finish = total + np.maximum(start_bound, self.slots[slot][0])
+                self.slots[slot][0] = float(finish[-1])
+            else:
+                finish = np.empty(len(arrived))
+                heap = self.slots[slot]
+                for i, (a, s) in enumerate(zip(arrived.tolist(), service.tolist())):
+                    finish[i] = max(a, heap[0]) + s
+                    heapq.heapreplace(heap, finish[i])
+            finishes[mask] = finish
+        return finishes
+
+    def route_sequential(self, arrivals, demands):
+        """In-flight-aware strategies: route and enqueue one request at a time"""
+        assigned = np.empty(len(arrivals), dtype=np.intp)
+        finishes = np.empty(len(arrivals))
+        snapshot, strategy, in_flight = self.snapshot, self.strategy, self.in_flight
+        index, slots, speeds = self.index, self.slots, self.speeds.tolist()
+        for i, (arrival, demand) in enumerate(zip(arrivals.tolist(), demands.tolist())):
+            in_flight.now = arrival
+            slot = index[strategy.choose(snapshot, in_flight)]
+            heap = slots[slot]
+            finish = max(arrival, heap[0]) + demand / speeds[slot]
+            heapq.heapreplace(heap, finish)
+            in_flight.add(slot, finish)
+            assigned[i] = slot
+            finishes[i] = finish
+        return assigned, finishes
+
+    def step(self, now):
+        """Simulate arrivals in [now, now + tick), then update metrics and the snapshot"""
+        rate = self.profile.rate(now, self.trace_rng)
+        count = self.trace_rng.poisson(rate * self.tick)
+        arrivals = now + np.sort(self.trace_rng.uniform(0.0, self.tick, count))
+        demands = self.service.sample(self.trace_rng, count)
+
+        if isinstance(self.strategy, PredictiveStrategy):
+            assigned = self.route_vectorized(count)
+            finishes = self.queue_vectorized(assigned, arrivals, demands)
+        else:
+            assigned, finishes = self.route_sequential(arrivals, demands)
+
+        sojourn = finishes - arrivals
+        servers = len(self.server_ids)
+        routed = np.bincount(assigned, minlength=servers)
+        busy = np.bincount(assigned, weights=demands / self.speeds[assigned], minlength=servers)
+        latency = np.bincount(assigned, weights=sojourn, minlength=servers)
+        slow = np.bincount(assigned, weights=sojourn > self.timeout, minlength=servers)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            response_time = np.where(routed > 0, latency / routed, np.nan)  # NaN keeps the last value
+            error_rate = np.where(routed > 0, slow / routed, np.nan)
+        utilization = np.minimum(1.0, busy / (self.tick * self.workers))
+
+        self.health_monitor.bulk_update_metric_columns(self.server_ids, {
+            'cpu_usage': utilization,
+            'response_time': response_time,
+            'error_rate': error_rate,
+            'request_rate': routed / self.tick
+        })
+        self.predictor.add_traffic_data(count / self.tick, now + self.tick)
+        self.snapshot = self.build_snapshot(count / self.tick, self.predictor.traffic_history.appended)
+
+        result = self.result
+        result.requests += count
+        result.routed += routed
+        # Out-of-range latencies land in the first or last bin rather than being dropped
+        result.histogram += np.histogram(np.clip(sojourn, LATENCY_BINS[0], LATENCY_BINS[-1]), LATENCY_BINS)[0]
+        result.ticks += 1
+        result.overload_events += int(np.count_nonzero(self.snapshot.fleet.overloaded))
+        result.peak_utilization = max(result.peak_utilization, float(utilization.max(initial=0.0)))
+
+    def run(self, duration):
+        start = time.perf_counter()
+        now = 0.0
+        while now < duration:
+            self.step(now)
+            now += self.tick
+        self.result.virtual_seconds = now
+        self.result.wall_seconds = time.perf_counter() - start
+        return self.result
+
+
+def main():
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', type=int, nargs='*', default=[8, 16, 32], help='fleet sizes to compare')
+    # Simulated requests carry no routing key, so consistent hashing would just repeat the predictive run
+    keyless = [name for name in STRATEGIES if name != ConsistentHashStrategy.name]
+    parser.add_argument('--strategies', nargs='*', default=keyless, choices=list(STRATEGIES))
+    parser.add_argument('--workers', type=int, default=1, help='concurrent slots per server')
+    parser.add_argument('--slow-fraction', type=float, default=0.25, help='share of servers at half speed')
+    parser.add_argument('--service-time', type=float, default=0.002, help='mean seconds per request at speed 1')
+    parser.add_argument('--service-dist', default='exponential',
+                        choices=['exponential', 'lognormal', 'deterministic'])
+    parser.add_argument('--rate', type=float, default=2000.0, help='mean arrival rate in req/s')
+    parser.add_argument('--amplitude', type=float, default=0.5, help='daily swing as a fraction of --rate')
+    parser.add_argument('--duration', type=float, default=3600.0, help='virtual seconds to simulate')
+    parser.add_argument('--tick', type=float, default=5.0, help='virtual seconds between metric updates')
+    parser.add_argument('--timeout', type=float, default=2.0, help='responses slower than this count as errors')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    service = ServiceModel(args.service_time, args.service_dist)
+    print(f"🧪 {args.rate:.0f} req/s mean (±{args.amplitude:.0%} daily), {args.duration:.0f}s virtual, "
+          f"{args.service_dist} service {args.service_time * 1000:.1f}ms, {args.workers} slot(s)/server")
+    print(f"{'servers':>8} {'strategy':<28}{'requests':>11}{'sim req/s':>11}{'p50 ms':>11}{'p99 ms':>11}"
+          f"{'p99.9 ms':>11}{'overloads':>11}{'peak util':>11}")
+    for servers in args.servers:
+        rng = np.random.default_rng(args.seed)
+        speeds = np.where(rng.random(servers) < args.slow_fraction, 0.5, 1.0)
+        server_ids = [f'server{i + 1}' for i in range(servers)]
+        for name in args.strategies:
+            profile = TrafficProfile(args.rate, args.amplitude)
+            with redirect_stdout(io.StringIO()):  # predictor / monitor start-up banners
+                simulator = ClusterSimulator(
+                    server_ids, speeds, args.workers, STRATEGIES[name](), profile, service, config,
+                    tick=args.tick, timeout=args.timeout, seed=args.seed
+                )
+            result = simulator.run(args.duration)
+            print(f"{servers:>8} {name:<28}{result.requests:>11}"
+                  f"{result.requests / result.wall_seconds:>11.0f}"
+                  f"{result.percentile(0.5) * 1000:>11.1f}{result.percentile(0.99) * 1000:>11.1f}"
+                  f"{result.percentile(0.999) * 1000:>11.1f}{result.overload_events:>11}"
+                  f"{result.peak_utilization:>11.0%}")
+
+
+if __name__ == '__main__':
+    main()
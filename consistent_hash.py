@@ -0,0 +1,116 @@
+import hashlib
+import threading
+
+import numpy as np
+
+# Request header carrying the routing key when it is not passed as ?key=
+DEFAULT_KEY_HEADER = 'X-Route-Key'
+
+
+def key_hash(key):
+    """Stable 64-bit hash of a string key (the same in every process and run)"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes, kept as two sorted NumPy arrays.
+
+    Each server owns `vnodes` points on a 64-bit ring; a key belongs to the
+    first point clockwise of its hash. Lookups are a binary search plus a
+    short walk past servers the caller rejects, so unhealthy or overloaded
+    servers are skipped without touching the ring. Adding or removing
+    servers only hashes the servers that changed and splices their points
+    in or out; the arrays are swapped in whole, so lookups never see a
+    half-updated ring.
+    """
+
+    def __init__(self, vnodes=160):
+        self.vnodes = vnodes
+        self.lock = threading.Lock()
+        self.servers = frozenset()
+        # (sorted points, owner index per point, server id per index); indices of
+        # removed servers are left unused until compaction
+        self._ring = (np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int32), ())
+
+    def __len__(self):
+        return len(self.servers)
+
+    def _points(self, server_ids, first_index):
+        points = np.fromiter(
+            (key_hash(f'{server_id}#{i}') for server_id in server_ids for i in range(self.vnodes)),
+            dtype=np.uint64, count=len(server_ids) * self.vnodes
+        )
+        owners = np.repeat(np.arange(first_index, first_index + len(server_ids), dtype=np.int32), self.vnodes)
+        order = np.argsort(points, kind='stable')
+        return points[order], owners[order]
+
+    def add(self, server_ids):
+        """Insert the points of servers not already on the ring"""
+        with self.lock:
+            new = [server_id for server_id in dict.fromkeys(server_ids) if server_id not in self.servers]
+            if not new:
+                return
+            ring_points, ring_owners, names = self._ring
+            points, owners = self._points(new, len(names))
+            at = np.searchsorted(ring_points, points)
+            self._ring = (np.insert(ring_points, at, points), np.insert(ring_owners, at, owners), names + tuple(new))
+            self.servers = self.servers | frozenset(new)
+
+    def remove(self, server_ids):
+        """Drop every point owned by `server_ids`; other keys keep their owner"""
+        with self.lock:
+            gone = self.servers & frozenset(server_ids)
+            if not gone:
+                return
+            ring_points, ring_owners, names = self._ring
+            dropped = np.zeros(len(names), dtype=bool)
+            dropped[[index for index, server_id in enumerate(names) if server_id in gone]] = True
+            keep = ~dropped[ring_owners]
+            ring_points, ring_owners = ring_points[keep], ring_owners[keep]
+            self.servers = self.servers - gone
+            if len(names) > 2 * len(self.servers) + 64:
+                # Compact the id table once it is mostly removed servers
+                live = np.flatnonzero(np.fromiter(
+                    (server_id in self.servers for server_id in names), dtype=bool, count=len(names)
+                ))
+                remap = np.full(len(names), -1, dtype=np.int32)
+                remap[live] = np.arange(len(live), dtype=np.int32)
+                ring_owners = remap[ring_owners]
+                names = tuple(names[index] for index in live.tolist())
+            self._ring = (ring_points, ring_owners, names)
+
+    def sync(self, server_ids):
+        """Make the ring hold exactly `server_ids`, touching only the difference"""
+        wanted = frozenset(server_ids)
+        self.remove(self.servers - wanted)
+        self.add([server_id for server_id in server_ids if server_id not in self.servers])
+
+    def synced(self, server_ids):
+        """New ring holding exactly `server_ids`, derived from this one, which is left unchanged"""
+        ring = HashRing(self.vnodes)
+        # The arrays are never modified in place, so the copy can share them
+        with self.lock:
+            ring.servers, ring._ring = self.servers, self._ring
+        ring.sync(server_ids)
+        return ring
+
+    def lookup(self, key, accept=None):
+        """Owner of `key`, or the next server clockwise for which `accept(server_id)` is true"""
+        points, owners, names = self._ring
+        size = len(points)
+        if not size:
+            return None
+        start = int(np.searchsorted(points, np.uint64(key_hash(key))))
+        if accept is None:
+            return names[owners[start % size]]
+        seen = set()
+        for i in range(size):
+            owner = names[owners[(start + i) % size]]
+            if owner in seen:
+                continue
+            if accept(owner):
+                return owner
+            seen.add(owner)
+            if len(seen) == len(self.servers):
+                break
+        return None
@@ -0,0 +1,80 @@
+import json
+import threading
+
+
+def dashboard_delta(previous, current):
+    """Fields of `current` that differ from `previous`, with per-server field granularity"""
+    delta = {
+        key: value for key, value in current.items()
+        if key != 'servers' and previous.get(key) != value
+    }
+    servers = {}
+    previous_servers = previous.get('servers', {})
+    for server_id, fields in current['servers'].items():
+        before = previous_servers.get(server_id, {})
+        changed = {name: value for name, value in fields.items() if before.get(name) != value}
+        if changed:
+            servers[server_id] = changed
+    if servers:
+        delta['servers'] = servers
+    removed = [server_id for server_id in previous_servers if server_id not in current['servers']]
+    if removed:
+        delta['removed_servers'] = removed
+    return delta
+
+
+def encode_event(event, version, data):
+    return f"event: {event}\nid: {version}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class DashboardBroadcaster:
+    """Fans dashboard updates out to any number of Server-Sent Events subscribers.
+
+    The payload (and its delta against the previous one) is built and encoded
+    once per published snapshot; subscribers only wait on a condition and
+    write the already-encoded bytes, so adding dashboards adds no
+    recomputation. A subscriber that falls more than one version behind gets
+    a full payload instead of a delta.
+    """
+
+    def __init__(self, heartbeat=15.0):
+        self.heartbeat = heartbeat
+        self._condition = threading.Condition()
+        self._latest = None  # (version, full event bytes, delta event bytes)
+        self._data = None
+
+    def publish(self, snapshot):
+        """Snapshot listener: build and encode the payload once for all subscribers"""
+        data = snapshot.to_dashboard_data()
+        full = encode_event('full', snapshot.version, data)
+        delta = None
+        if self._data is not None:
+            delta = encode_event('delta', snapshot.version, dashboard_delta(self._data, data))
+        with self._condition:
+            self._data = data
+            self._latest = (snapshot.version, full, delta)
+            self._condition.notify_all()
+
+    def subscribe(self, last_version=None):
+        """Generator of SSE byte chunks for one client"""
+        sent = None
+        with self._condition:
+            latest = self._latest
+        if latest and latest[0] != last_version:
+            sent = latest[0]
+            yield latest[1]
+        elif latest:
+            sent = latest[0]
+
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._latest is not None and self._latest[0] != sent, self.heartbeat
+                )
+                latest = self._latest
+            if latest is None or latest[0] == sent:
+                yield b': ping\n\n'  # keeps proxies from closing an idle stream
+                continue
+            version, full, delta = latest
+            yield delta if delta is not None and sent == version - 1 else full
+            sent = version
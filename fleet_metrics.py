@@ -0,0 +1,166 @@
+from datetime import datetime
+from functools import cached_property
+from types import MappingProxyType
+
+import numpy as np
+
+METRIC_COLUMNS = ('cpu_usage', 'memory_usage', 'response_time', 'error_rate', 'request_rate')
+
+# Metric value at which each component of the health score reaches zero
+# (cpu 100% -> 0, response time 10s -> 0, error rate 10% -> 0)
+HEALTH_SCALES = {
+    'cpu_usage': 100.0,
+    'memory_usage': 100.0,
+    'response_time': 10.0,
+    'error_rate': 1000.0
+}
+
+DEFAULT_HEALTH_WEIGHTS = {name: 1.0 for name in HEALTH_SCALES}
+
+RISK_LEVELS = ('low', 'medium', 'high')
+
+
+def health_scores(columns, weights):
+    """Weighted mean of per-metric scores (0-100) for whole columns at once"""
+    total = np.zeros(len(columns['cpu_usage']))
+    weight_sum = 0.0
+    for name, scale in HEALTH_SCALES.items():
+        weight = weights.get(name, 0.0)
+        if weight:
+            total += weight * np.maximum(0.0, 100.0 - columns[name] * scale)
+            weight_sum += weight
+    return total / weight_sum if weight_sum else total
+
+
+def overload_mask(columns, thresholds):
+    """True for every server above any configured overload threshold"""
+    mask = np.zeros(len(columns['cpu_usage']), dtype=bool)
+    for name, limit in thresholds.items():
+        if name in columns:
+            mask |= columns[name] > limit
+    return mask
+
+
+class FleetMetrics:
+    """Columnar metrics table: one NumPy array per metric, indexed by server slot.
+
+    Instances are immutable once published. `with_updates` returns a new
+    table with the changed rows, recomputing health scores and overload
+    flags for the whole fleet in a single vectorized pass.
+    """
+
+    def __init__(self, server_ids, columns, last_update, weights, thresholds):
+        self.server_ids = tuple(server_ids)
+        self.ids = np.array(self.server_ids, dtype=object)
+        self.slots = {server_id: slot for slot, server_id in enumerate(self.server_ids)}
+        self.columns = columns
+        self.last_update = last_update
+        self.weights = weights
+        self.thresholds = thresholds
+        self.health = health_scores(columns, weights)
+        self.overloaded = overload_mask(columns, thresholds)
+        for array in (*columns.values(), last_update, self.health, self.overloaded):
+            array.flags.writeable = False
+
+    @classmethod
+    def empty(cls, weights=None, thresholds=None):
+        columns = {name: np.zeros(0) for name in METRIC_COLUMNS}
+        return cls((), columns, np.zeros(0), weights or DEFAULT_HEALTH_WEIGHTS, thresholds or {})
+
+    def __len__(self):
+        return len(self.server_ids)
+
+    def __contains__(self, server_id):
+        return server_id in self.slots
+
+    def with_updates(self, updates, timestamp, add_new=True):
+        """New table with `updates` ({server_id: metrics dict}) merged in.
+
+        Only the metrics present in each dict are overwritten, so partial
+        updates (e.g. latency from a health probe) keep the other columns.
+        Unknown server ids are appended with zeroed metrics, or ignored
+        when `add_new` is False.
+        """
+        if not add_new:
+            updates = {server_id: metrics for server_id, metrics in updates.items() if server_id in self.slots}
+        new_ids = [server_id for server_id in updates if server_id not in self.slots]
+        size = len(self) + len(new_ids)
+        server_ids = self.server_ids + tuple(new_ids)
+        slots = self.slots
+        if new_ids:
+            slots = {**slots, **{server_id: len(self) + i for i, server_id in enumerate(new_ids)}}
+
+        rows = np.fromiter((slots[server_id] for server_id in updates), dtype=np.intp, count=len(updates))
+        columns = {}
+        for name in METRIC_COLUMNS:
+            column = np.zeros(size)
+            column[:len(self)] = self.columns[name]
+            present = np.fromiter((name in metrics for metrics in updates.values()), dtype=bool, count=len(updates))
+            if present.all():
+                column[rows] = np.fromiter(
+                    (metrics[name] for metrics in updates.values()), dtype=np.float64, count=len(updates)
+                )
+            elif present.any():
+                column[rows[present]] = [metrics[name] for metrics in updates.values() if name in metrics]
+            columns[name] = column
+        last_update = np.zeros(size)
+        last_update[:len(self)] = self.last_update
+        last_update[rows] = timestamp
+        return FleetMetrics(server_ids, columns, last_update, self.weights, self.thresholds)
+
+    def with_columns(self, server_ids, columns, timestamp):
+        """New table with per-metric arrays applied row by row to `server_ids`.
+
+        `columns` maps metric names to float arrays aligned with `server_ids`;
+        NaN entries leave the existing value in place. Ids not in the table
+        are skipped.
+        """
+        rows = np.fromiter((self.slots.get(server_id, -1) for server_id in server_ids), dtype=np.intp,
+                           count=len(server_ids))
+        known = rows >= 0
+        new_columns = {}
+        for name in METRIC_COLUMNS:
+            column = self.columns[name].copy()
+            values = columns.get(name)
+            if values is not None:
+                present = known & ~np.isnan(values)
+                column[rows[present]] = values[present]
+            new_columns[name] = column
+        last_update = self.last_update.copy()
+        last_update[rows[known]] = timestamp
+        return FleetMetrics(self.server_ids, new_columns, last_update, self.weights, self.thresholds)
+
+    def without(self, server_ids):
+        """New table with the rows of `server_ids` removed; the other rows keep their order"""
+        drop = [self.slots[server_id] for server_id in server_ids if server_id in self.slots]
+        if not drop:
+            return self
+        keep = np.ones(len(self), dtype=bool)
+        keep[drop] = False
+        return FleetMetrics(
+            self.ids[keep].tolist(), {name: self.columns[name][keep] for name in METRIC_COLUMNS},
+            self.last_update[keep], self.weights, self.thresholds
+        )
+
+    def risk_codes(self, predicted_traffic):
+        """Index into RISK_LEVELS for every server given a traffic forecast"""
+        increase = predicted_traffic / np.maximum(1.0, self.columns['request_rate'])
+        return (increase > 1.5).astype(np.int8) + (increase > 2.0)
+
+    def best_server(self):
+        """Server id with the highest health score, or None if the fleet is empty"""
+        if not len(self):
+            return None
+        return self.server_ids[int(np.argmax(self.health))]
+
+    def row(self, server_id):
+        slot = self.slots[server_id]
+        metrics = {name: float(self.columns[name][slot]) for name in METRIC_COLUMNS}
+        metrics['last_update'] = datetime.fromtimestamp(self.last_update[slot])
+        metrics['health_score'] = float(self.health[slot])
+        return metrics
+
+    @cached_property
+    def as_dicts(self):
+        """Per-server dicts in the historical server_metrics shape, built on first use"""
+        return MappingProxyType({server_id: self.row(server_id) for server_id in self.server_ids})
@@ -0,0 +1,346 @@
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from sklearn.linear_model import SGDRegressor
+
+SECONDS_PER_HOUR = 3600
+HOURS_PER_DAY = 24
+HOURS_PER_WEEK = 24 * 7
+
+DEFAULT_HORIZONS = (30, 300, 900, 3600)  # seconds
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+# Most recent samples whose changes give the prediction intervals
+SPREAD_WINDOW = 10000
+HORIZON_UNITS = {'s': 1, 'm': 60, 'h': SECONDS_PER_HOUR, 'd': HOURS_PER_DAY * SECONDS_PER_HOUR}
+MAX_HORIZON = 366 * HOURS_PER_DAY * SECONDS_PER_HOUR
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday
+
+
+def local_calendar(timestamps):
+    """Local (hour, weekday, minute) arrays for Unix timestamps, as datetime.fromtimestamp gives them.
+
+    One UTC offset is applied to the whole array when the first and last
+    timestamps share it; a daylight-saving change in between falls back to
+    converting each timestamp.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    offsets = {time.localtime(math.floor(t)).tm_gmtoff for t in (timestamps.min(), timestamps.max())}
+    if len(offsets) == 1:
+        # datetime rounds to the microsecond before splitting into fields
+        days, seconds = np.divmod(np.floor(np.round(timestamps, 6) + offsets.pop()).astype(np.int64), 86400)
+        hour, seconds = np.divmod(seconds, SECONDS_PER_HOUR)
+        return hour, (days + EPOCH_WEEKDAY) % 7, seconds // 60
+    fields = np.array([
+        (when.hour, when.weekday(), when.minute) for when in map(datetime.fromtimestamp, timestamps.tolist())
+    ], dtype=np.int64).reshape(-1, 3)
+    return fields[:, 0], fields[:, 1], fields[:, 2]
+
+
+class Forecaster:
+    """Base class for online traffic models.
+
+    Every model is updated one sample at a time and must do O(1) work per
+    update and per prediction, regardless of how much history it has seen.
+    `predict_many` forecasts several horizons in one vectorized pass.
+    """
+
+    name = None
+    warmup = 1
+
+    def __init__(self):
+        self.samples = 0
+        self.last_value = None
+        self.last_timestamp = None
+        self.interval = None  # EWMA of the sampling interval, in seconds
+
+    @property
+    def ready(self):
+        return self.samples >= self.warmup
+
+    def update(self, timestamp, value):
+        """Feed one observation into the model"""
+        if self.last_timestamp is not None:
+            dt = max(0.0, timestamp - self.last_timestamp)
+            self.interval = dt if self.interval is None else 0.9 * self.interval + 0.1 * dt
+        self._update(timestamp, value)
+        self.samples += 1
+        self.last_value = value
+        self.last_timestamp = timestamp
+
+    def predict(self, steps=1):
+        """Forecast the value `steps` samples ahead"""
+        raise NotImplementedError
+
+    def predict_many(self, steps):
+        """predict() for an array of step counts; a float array"""
+        return np.array([self.predict(step) for step in np.asarray(steps).tolist()], dtype=np.float64)
+
+    def _update(self, timestamp, value):
+        raise NotImplementedError
+
+    def _future_timestamp(self, steps):
+        return self.last_timestamp + steps * (self.interval or 0.0)
+
+    def _future_timestamps(self, steps):
+        return self.last_timestamp + np.asarray(steps, dtype=np.float64) * (self.interval or 0.0)
+
+
+class TimeOfDayForecaster(Forecaster):
+    """The original hour-bucket heuristic, kept as a baseline for backtests"""
+
+    name = 'time_of_day'
+    warmup = 10
+
+    def __init__(self, window=10):
+        super().__init__()
+        self.window = np.zeros(window)
+
+    def _update(self, timestamp, value):
+        self.window[self.samples % len(self.window)] = value
+
+    def predict(self, steps=1):
+        when = datetime.fromtimestamp(self._future_timestamp(steps))
+        avg_recent = self.window[:min(self.samples, len(self.window))].mean()
+
+        if 9 <= when.hour <= 17:  # Business hours
+            prediction = avg_recent * 1.3
+        elif 18 <= when.hour <= 22:  # Evening peak
+            prediction = avg_recent * 1.5
+        else:  # Night time
+            prediction = avg_recent * 0.7
+
+        if when.weekday() >= 5:  # Weekend
+            prediction = prediction * 0.8
+        return prediction
+
+    def predict_many(self, steps):
+        hour, weekday, _ = local_calendar(self._future_timestamps(steps))
+        avg_recent = self.window[:min(self.samples, len(self.window))].mean()
+        factor = np.where((hour >= 9) & (hour <= 17), 1.3, np.where((hour >= 18) & (hour <= 22), 1.5, 0.7))
+        prediction = avg_recent * factor
+        return np.where(weekday >= 5, prediction * 0.8, prediction)
+
+
+class EWMAForecaster(Forecaster):
+    """Exponentially weighted moving average"""
+
+    name = 'ewma'
+
+    def __init__(self, alpha=0.3):
+        super().__init__()
+        self.alpha = alpha
+        self.level = None
+
+    def _update(self, timestamp, value):
+        if self.level is None:
+            self.level = value
+        else:
+            self.level += self.alpha * (value - self.level)
+
+    def predict(self, steps=1):
+        return self.level
+
+    def predict_many(self, steps):
+        return np.full(len(steps), self.level, dtype=np.float64)
+
+
+class HoltWintersForecaster(Forecaster):
+    """Additive Holt-Winters with daily and weekly seasonality.
+
+    Seasonal terms are indexed by wall-clock hour of day and hour of week
+    rather than by sample position, so irregular sampling intervals do not
+    shift the seasons.
+    """
+
+    name = 'holt_winters'
+    warmup = 10
+
+    def __init__(self, alpha=0.2, beta=0.01, gamma=0.1, delta=0.05):
+        super().__init__()
+        self.alpha = alpha  # level
+        self.beta = beta  # trend
+        self.gamma = gamma  # daily season
+        self.delta = delta  # weekly season
+        self.level = None
+        self.trend = 0.0
+        self.daily = np.zeros(HOURS_PER_DAY)
+        self.weekly = np.zeros(HOURS_PER_WEEK)
+
+    @staticmethod
+    def _slots(timestamp):
+        when = datetime.fromtimestamp(timestamp)
+        return when.hour, when.weekday() * HOURS_PER_DAY + when.hour
+
+    def _update(self, timestamp, value):
+        day_slot, week_slot = self._slots(timestamp)
+        if self.level is None:
+            self.level = value
+            return
+
+        daily = self.daily[day_slot]
+        weekly = self.weekly[week_slot]
+        level = self.alpha * (value - daily - weekly) + (1 - self.alpha) * (self.level + self.trend)
+        self.trend = self.beta * (level - self.level) + (1 - self.beta) * self.trend
+        self.level = level
+        self.daily[day_slot] = self.gamma * (value - level - weekly) + (1 - self.gamma) * daily
+        self.weekly[week_slot] = (
+            self.delta * (value - level - self.daily[day_slot]) + (1 - self.delta) * weekly
+        )
+
+    def predict(self, steps=1):
+        day_slot, week_slot = self._slots(self._future_timestamp(steps))
+        return self.level + steps * self.trend + self.daily[day_slot] + self.weekly[week_slot]
+
+    def predict_many(self, steps):
+        hour, weekday, _ = local_calendar(self._future_timestamps(steps))
+        steps = np.asarray(steps, dtype=np.float64)
+        return self.level + steps * self.trend + self.daily[hour] + self.weekly[weekday * HOURS_PER_DAY + hour]
+
+
+class SGDForecaster(Forecaster):
+    """Online linear regression on recent lags plus calendar features.
+
+    Each update is a single `SGDRegressor.partial_fit` call on a fixed-size
+    feature vector. Targets and lags are standardised with running EWMA
+    statistics so the learning rate does not depend on traffic scale.
+    """
+
+    name = 'sgd'
+
+    def __init__(self, lags=12, learning_rate=0.01, alpha=0.0001, scale_decay=0.01):
+        super().__init__()
+        self.lags = np.zeros(lags)
+        self.warmup = lags + 1
+        self.scale_decay = scale_decay
+        self.mean = 0.0
+        self.var = 1.0
+        self.model = SGDRegressor(
+            learning_rate='constant', eta0=learning_rate, alpha=alpha, penalty='l2'
+        )
+        self.fitted = False
+
+    def _scale(self, value):
+        return (value - self.mean) / math.sqrt(self.var + 1e-9)
+
+    def _features(self, timestamp):
+        return self._feature_rows([timestamp])
+
+    def _feature_rows(self, timestamps):
+        """One feature row per timestamp: the latest lags plus calendar features"""
+        hour, weekday, minute = local_calendar(timestamps)
+        day_angle = 2 * math.pi * (hour * SECONDS_PER_HOUR + minute * 60) / 86400
+        week_angle = 2 * math.pi * (weekday + hour / HOURS_PER_DAY) / 7
+        lags = self._scale(np.roll(self.lags, -(self.samples % len(self.lags)))[::-1])
+        return np.column_stack((
+            np.broadcast_to(lags, (len(hour), len(lags))),
+            np.sin(day_angle), np.cos(day_angle), np.sin(week_angle), np.cos(week_angle)
+        ))
+
+    def _update(self, timestamp, value):
+        if self.samples >= len(self.lags):
+            self.model.partial_fit(self._features(timestamp), [self._scale(value)])
+            self.fitted = True
+
+        if self.samples == 0:
+            self.mean = value
+        diff = value - self.mean
+        self.mean += self.scale_decay * diff
+        self.var = (1 - self.scale_decay) * (self.var + self.scale_decay * diff * diff)
+        self.lags[self.samples % len(self.lags)] = value
+
+    def predict(self, steps=1):
+        if not self.fitted:
+            return self.last_value
+        # Multi-step forecasts reuse the latest lags (direct, not recursive)
+        scaled = self.model.predict(self._features(self._future_timestamp(steps)))[0]
+        return scaled * math.sqrt(self.var + 1e-9) + self.mean
+
+    def predict_many(self, steps):
+        if not self.fitted:
+            return np.full(len(steps), self.last_value, dtype=np.float64)
+        scaled = self.model.predict(self._feature_rows(self._future_timestamps(steps)))
+        return scaled * math.sqrt(self.var + 1e-9) + self.mean
+
+
+FORECASTERS = {
+    cls.name: cls
+    for cls in (TimeOfDayForecaster, EWMAForecaster, HoltWintersForecaster, SGDForecaster)
+}
+
+
+def create_forecaster(config=None):
+    """Build a forecaster from the `forecasting` section of config.json"""
+    config = config or {}
+    model = config.get('model', 'ewma')
+    if model not in FORECASTERS:
+        raise ValueError(f"Unknown forecasting model '{model}', expected one of {sorted(FORECASTERS)}")
+    return FORECASTERS[model](**config.get(model, {}))
+
+
+def parse_horizon(text):
+    """Seconds from '30', '30s', '5m', '1h' or '1d'; ValueError unless finite and 0 < seconds <= MAX_HORIZON"""
+    text = str(text).strip().lower()
+    unit = HORIZON_UNITS.get(text[-1:])
+    seconds = float(text[:-1] if unit else text) * (unit or 1)
+    if not math.isfinite(seconds) or not 0 < seconds <= MAX_HORIZON:
+        raise ValueError(f"Horizon must be more than 0 and at most {MAX_HORIZON:g} seconds, got '{text}'")
+    return seconds
+
+
+@dataclass(frozen=True)
+class HorizonForecast:
+    """Point forecast and prediction interval quantiles for one horizon"""
+    horizon_seconds: float
+    steps: int
+    predicted_traffic: float
+    quantiles: dict  # quantile -> traffic
+
+    def to_dict(self):
+        return {
+            'horizon_seconds': self.horizon_seconds,
+            'steps': self.steps,
+            'predicted_traffic': self.predicted_traffic,
+            'quantiles': {f'{q:g}': value for q, value in self.quantiles.items()}
+        }
+
+
+def horizon_spreads(values, steps, quantiles, min_pairs=10, window=SPREAD_WINDOW):
+    """Empirical quantiles of `steps`-ahead changes in `values`, centred on their median.
+
+    Returns an array of shape (len(steps), len(quantiles)) to add to the
+    point forecast of each horizon. Only the last `window` values are
+    used, and each distinct horizon's changes are built and reduced in
+    turn, so memory stays at one window however many horizons are asked.
+    Horizons longer than the history allows use the longest usable one,
+    widened by (steps / usable) ** k, where k is fitted from how the spread
+    grows between a quarter of that horizon and all of it: about 0.5 for a
+    random walk, 0 for traffic that reverts to its level. Zeros when the
+    history is too short to say anything.
+    """
+    values = np.asarray(values, dtype=np.float64)[-window:]
+    steps = np.asarray(steps, dtype=np.int64)
+    spreads = np.zeros((len(steps), len(quantiles)))
+    longest = len(values) - min_pairs
+    if longest < 1 or not len(steps):
+        return spreads
+
+    usable = np.clip(steps, 1, longest)
+    anchor = max(1, longest // 4)
+    unique = np.unique(np.append(usable, [anchor, longest]))
+    levels = np.empty((len(unique), len(quantiles) + 1))
+    deviations = {}
+    for row, step in enumerate(unique.tolist()):
+        changes = values[step:] - values[:-step]
+        levels[row] = np.quantile(changes, np.append(np.asarray(quantiles, dtype=np.float64), 0.5))
+        if step in (anchor, longest):
+            deviations[step] = float(changes.std())
+    centred = levels[:, :-1] - levels[:, -1:]
+
+    exponent = 0.5
+    low, high = deviations[anchor], deviations[longest]
+    if longest > anchor and low > 0 and high > 0:
+        exponent = float(np.clip(math.log(high / low) / math.log(longest / anchor), 0.0, 0.5))
+    return centred[np.searchsorted(unique, usable)] * ((steps / usable) ** exponent)[:, None]
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+class ProbeWindow:
+    """Rolling record of the last N probe outcomes for one server"""
+
+    def __init__(self, size):
+        self.outcomes = deque(maxlen=size)  # (ok, latency_seconds)
+
+    def add(self, ok, latency):
+        self.outcomes.append((ok, latency))
+
+    def error_rate(self):
+        return sum(1 for ok, _ in self.outcomes if not ok) / len(self.outcomes)
+
+    def response_time(self):
+        return sum(latency for _, latency in self.outcomes) / len(self.outcomes)
+
+
+class HealthChecker:
+    """Actively probes every backend from one asyncio loop.
+
+    Each round starts a probe per server, spread over `jitter * interval`
+    seconds so a large fleet is not hit all at once, with at most
+    `concurrency` probes in flight. Failed probes, whatever they fail with,
+    count as errors and as a full `timeout` of latency. Measured response time and error rate are
+    pushed into the ServerHealthMonitor as one bulk update per round, which
+    leaves cpu/memory/request_rate untouched.
+    """
+
+    def __init__(self, health_monitor, targets, mode='http', path='/health', interval=10.0,
+                 timeout=2.0, jitter=0.5, concurrency=256, window=10, on_round=None,
+                 instrumentation=None):
+        if mode not in ('http', 'tcp'):
+            raise ValueError(f"Unknown health check mode '{mode}', expected 'http' or 'tcp'")
+        self.health_monitor = health_monitor
+        self.window = window
+        self.targets = {}
+        self.windows = {}
+        self.set_targets(targets)
+        self.mode = mode
+        self.path = path
+        self.interval = interval
+        self.timeout = timeout
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.on_round = on_round
+        # metrics_export.Instrumentation timing each round as the 'health_check' task
+        self.instrumentation = instrumentation
+        self.rounds = 0
+
+    def set_targets(self, targets):
+        """Replace the probed servers ({server_id: 'host:port'}); windows of kept servers survive.
+
+        Both maps are swapped in whole (windows first), so a round in
+        progress keeps probing the set it started with.
+        """
+        parsed = {}
+        for server_id, address in targets.items():
+            host, port = address.rsplit(':', 1)
+            parsed[server_id] = (host, int(port))
+        self.windows = {
+            server_id: self.windows.get(server_id) or ProbeWindow(self.window) for server_id in parsed
+        }
+        self.targets = parsed
+
+    async def probe_tcp(self, host, port):
+        """Healthy if a TCP connection can be opened"""
+        _, writer = await asyncio.open_connection(host, port)
+        writer.close()
+        return True
+
+    async def probe_http(self, host, port):
+        """Healthy if GET `path` answers with a 2xx or 3xx status"""
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(
+                f'GET {self.path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode()
+            )
+            status_line = await reader.readline()
+            parts = status_line.split(b' ', 2)
+            return len(parts) >= 2 and parts[1][:1] in (b'2', b'3')
+        finally:
+            writer.close()
+
+    async def probe(self, server_id, address, window, semaphore, delay):
+        """Run one probe for `server_id` and record its outcome"""
+        await asyncio.sleep(delay)
+        host, port = address
+        check = self.probe_http if self.mode == 'http' else self.probe_tcp
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await asyncio.wait_for(check(host, port), self.timeout)
+                latency = time.perf_counter() - start
+            except (OSError, asyncio.TimeoutError):
+                ok, latency = False, self.timeout
+            except Exception:
+                # A probe that breaks in any other way still marks only its own server unhealthy
+                logger.exception("Health probe of %s failed", server_id)
+                ok, latency = False, self.timeout
+        window.add(ok, latency)
+
+    async def run_round(self):
+        """Probe every target once and publish the results; returns the applied updates"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        spread = self.jitter * self.interval
+        targets, windows = self.targets, self.windows
+        await asyncio.gather(*(
+            self.probe(server_id, address, windows[server_id], semaphore, random.uniform(0, spread))
+            for server_id, address in targets.items() if server_id in windows
+        ))
+
+        updates = {
+            server_id: {'response_time': window.response_time(), 'error_rate': window.error_rate()}
+            for server_id, window in windows.items() if window.outcomes
+        }
+        # Servers removed while the round ran are not added back
+        self.health_monitor.bulk_update_server_metrics(updates, add_new=False)
+        self.rounds += 1
+        if self.on_round:
+            self.on_round()
+        return updates
+
+    async def run_forever(self):
+        while True:
+            started = time.monotonic()
+            try:
+                if self.instrumentation is None:
+                    await self.run_round()
+                else:
+                    with self.instrumentation.tick('health_check'):
+                        await self.run_round()
+            except Exception:
+                logger.exception("Health check round failed")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start_in_thread(self):
+        """Run the checker's event loop on a single daemon thread"""
+        thread = threading.Thread(target=lambda: asyncio.run(self.run_forever()), daemon=True)
+        thread.start()
+        return thread
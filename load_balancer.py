@@ -1,10 +1,16 @@
-from flask import Flask, request, jsonify, render_template_string
-import threading
-import time
-import random
-import json
-from datetime import datetime
+from flask import Flask, Response, request, jsonify, render_template_string
+from functools import wraps
+import hmac
 import math
+import os
+import random
+
+from consistent_hash import DEFAULT_KEY_HEADER
+from dashboard_stream import DashboardBroadcaster
+from forecasting import parse_horizon
+from metrics_export import OPENMETRICS_TYPE, PROMETHEUS_TYPE, wants_openmetrics
+from metrics_ingest import IngestError, ingest
+from predictive_balancer import PredictiveLoadBalancer
 
 # ========== IMPROVED UI HTML TEMPLATE ==========
 HTML_TEMPLATE = """
@@ -226,34 +232,65 @@ HTML_TEMPLATE = """
             document.getElementById('gaugeValue').textContent = Math.round(value) + '%';
         }
 
+        // Latest full dashboard state; stream deltas are merged into it
+        let dashboardState = null;
+
+        function renderDashboard(data) {
+            // Update stats
+            document.getElementById('currentTraffic').textContent = Math.round(data.current_traffic);
+            document.getElementById('predictedTraffic').textContent = Math.round(data.predicted_traffic);
+            document.getElementById('healthyServers').textContent = data.healthy_servers;
+            document.getElementById('totalServers').textContent = data.total_servers;
+            document.getElementById('spikeStatus').textContent = data.traffic_spike ? 'Yes' : 'No';
+            document.getElementById('spikeStatus').className = data.traffic_spike ? 
+                'text-3xl font-bold text-red-600 pulse' : 'text-3xl font-bold text-green-600';
+
+            // Update gauge (0-100 scale)
+            const loadPercentage = Math.min(100, (data.current_traffic / 500) * 100);
+            loadGauge(loadPercentage);
+
+            // Update server health bars
+            updateServerHealthBars(data.servers);
+
+            // Update server cards
+            updateServerCards(data.servers);
+        }
+
+        function applyDelta(delta) {
+            const { servers, removed_servers, ...fields } = delta;
+            Object.assign(dashboardState, fields);
+            Object.entries(servers || {}).forEach(([serverId, changed]) => {
+                dashboardState.servers[serverId] = { ...(dashboardState.servers[serverId] || {}), ...changed };
+            });
+            (removed_servers || []).forEach(serverId => delete dashboardState.servers[serverId]);
+        }
+
         function updateDashboard() {
             fetch('/dashboard_data')
                 .then(response => response.json())
                 .then(data => {
-                    // Update stats
-                    document.getElementById('currentTraffic').textContent = Math.round(data.current_traffic);
-                    document.getElementById('predictedTraffic').textContent = Math.round(data.predicted_traffic);
-                    document.getElementById('healthyServers').textContent = data.healthy_servers;
-                    document.getElementById('totalServers').textContent = data.total_servers;
-                    document.getElementById('spikeStatus').textContent = data.traffic_spike ? 'Yes' : 'No';
-                    document.getElementById('spikeStatus').className = data.traffic_spike ? 
-                        'text-3xl font-bold text-red-600 pulse' : 'text-3xl font-bold text-green-600';
-
-                    // Update gauge (0-100 scale)
-                    const loadPercentage = Math.min(100, (data.current_traffic / 500) * 100);
-                    loadGauge(loadPercentage);
-
-                    // Update server health bars
-                    updateServerHealthBars(data.servers);
-
-                    // Update server cards
-                    updateServerCards(data.servers);
+                    dashboardState = data;
+                    renderDashboard(data);
                 })
                 .catch(error => {
                     console.error('Error fetching dashboard data:', error);
                 });
         }
 
+        function subscribeDashboard() {
+            // Server-Sent Events push a full payload, then only the fields that change
+            const source = new EventSource('/stream');
+            source.addEventListener('full', event => {
+                dashboardState = JSON.parse(event.data);
+                renderDashboard(dashboardState);
+            });
+            source.addEventListener('delta', event => {
+                if (!dashboardState) return;
+                applyDelta(JSON.parse(event.data));
+                renderDashboard(dashboardState);
+            });
+        }
+
         function updateServerHealthBars(servers) {
             const container = document.getElementById('serverHealthBars');
             container.innerHTML = '';
@@ -351,6 +388,14 @@ HTML_TEMPLATE = """
             fetch('/route')
                 .then(response => response.json())
                 .then(data => {
+                    // Nothing is actually sent to the server, so complete the route right away
+                    if (data.token) {
+                        fetch('/route/complete', {
+                            method: 'POST',
+                            headers: { 'Content-Type': 'application/json' },
+                            body: JSON.stringify({ token: data.token })
+                        });
+                    }
                     alert(`Request routed to: ${data.server}\n${data.message}`);
                 });
         }
@@ -377,276 +422,27 @@ HTML_TEMPLATE = """
         // Initialize dashboard
         document.addEventListener('DOMContentLoaded', function() {
             updateTime();
-            updateDashboard();
             setInterval(updateTime, 1000);
-            setInterval(updateDashboard, 2000); // Update every 2 seconds
+            if (window.EventSource) {
+                subscribeDashboard();
+            } else {
+                updateDashboard();
+                setInterval(updateDashboard, 2000); // Fall back to polling every 2 seconds
+            }
         });
     </script>
 </body>
 </html>
 """
 
-# ========== KEEP ALL THE EXISTING CLASSES THE SAME ==========
-class SimpleTrafficPredictor:
-    def __init__(self):
-        print("🚀 Simple Traffic Predictor Started!")
-        self.traffic_history = []
-        self.max_history = 100
-        
-    def add_traffic_data(self, current_traffic):
-        timestamp = datetime.now()
-        self.traffic_history.append({
-            'timestamp': timestamp,
-            'traffic': current_traffic,
-            'hour': timestamp.hour,
-            'day_of_week': timestamp.weekday()
-        })
-        
-        if len(self.traffic_history) > self.max_history:
-            self.traffic_history.pop(0)
-    
-    def predict_next_traffic(self):
-        if len(self.traffic_history) < 10:
-            return random.uniform(50, 150)
-            
-        current_hour = datetime.now().hour
-        current_day = datetime.now().weekday()
-        
-        recent_traffic = [item['traffic'] for item in self.traffic_history[-10:]]
-        avg_recent = sum(recent_traffic) / len(recent_traffic)
-        
-        if current_hour >= 9 and current_hour <= 17:
-            prediction = avg_recent * 1.3
-        elif current_hour >= 18 and current_hour <= 22:
-            prediction = avg_recent * 1.5
-        else:
-            prediction = avg_recent * 0.7
-            
-        if current_day >= 5:
-            prediction = prediction * 0.8
-            
-        return max(10, prediction)
-    
-    def detect_spike(self, current_traffic):
-        if len(self.traffic_history) < 5:
-            return False
-            
-        recent_avg = sum([item['traffic'] for item in self.traffic_history[-5:]]) / 5
-        return current_traffic > recent_avg * 1.5
-
-class ServerHealthMonitor:
-    def __init__(self):
-        with open('config.json', 'r') as f:
-            self.config = json.load(f)
-        self.server_metrics = {}
-        print("🏥 Server Health Monitor Started!")
-        
-    def update_server_metrics(self, server_id, metrics):
-        self.server_metrics[server_id] = {
-            **metrics,
-            'last_update': datetime.now(),
-            'health_score': self.calculate_health_score(metrics)
-        }
-    
-    def calculate_health_score(self, metrics):
-        scores = []
-        
-        cpu_score = max(0, 100 - (metrics.get('cpu_usage', 0) * 100))
-        scores.append(cpu_score)
-        
-        memory_score = max(0, 100 - (metrics.get('memory_usage', 0) * 100))
-        scores.append(memory_score)
-        
-        response_time = metrics.get('response_time', 0)
-        response_score = max(0, 100 - (response_time * 10))
-        scores.append(response_score)
-        
-        error_rate = metrics.get('error_rate', 0)
-        error_score = max(0, 100 - (error_rate * 1000))
-        scores.append(error_score)
-        
-        avg_score = sum(scores) / len(scores)
-        return avg_score
-    
-    def get_best_server(self):
-        if not self.server_metrics:
-            return None
-            
-        best_server = max(self.server_metrics.items(), key=lambda x: x[1]['health_score'])
-        return best_server[0]
-    
-    def is_server_overloaded(self, server_id):
-        if server_id not in self.server_metrics:
-            return True
-            
-        metrics = self.server_metrics[server_id]
-        
-        thresholds = self.config['overload_thresholds']
-        if (metrics.get('cpu_usage', 0) > thresholds['cpu_usage'] or
-            metrics.get('memory_usage', 0) > thresholds['memory_usage'] or
-            metrics.get('response_time', 0) > thresholds['response_time'] or
-            metrics.get('error_rate', 0) > thresholds['error_rate']):
-            return True
-            
-        return False
-    
-    def predict_overload_risk(self, server_id, predicted_traffic):
-        if server_id not in self.server_metrics:
-            return "unknown"
-            
-        current_metrics = self.server_metrics[server_id]
-        current_traffic = current_metrics.get('request_rate', 1)
-        
-        traffic_increase = predicted_traffic / max(1, current_traffic)
-        
-        if traffic_increase > 2.0:
-            return "high"
-        elif traffic_increase > 1.5:
-            return "medium"
-        else:
-            return "low"
-
-class PredictiveLoadBalancer:
-    def __init__(self):
-        print("🔀 Starting Predictive Load Balancer...")
-        
-        with open('config.json', 'r') as f:
-            self.config = json.load(f)
-        
-        self.predictor = SimpleTrafficPredictor()
-        self.health_monitor = ServerHealthMonitor()
-        self.current_traffic = 100
-        
-        self.initialize_servers()
-        self.setup_background_tasks()
-        
-        print("✅ Load Balancer Ready!")
-    
-    def initialize_servers(self):
-        for server_id in self.config['servers']:
-            self.health_monitor.update_server_metrics(server_id, {
-                'cpu_usage': random.uniform(0.1, 0.4),
-                'memory_usage': random.uniform(0.3, 0.6),
-                'response_time': random.uniform(0.1, 0.5),
-                'error_rate': random.uniform(0.0, 0.02),
-                'request_rate': random.uniform(80, 120)
-            })
-    
-    def setup_background_tasks(self):
-        def traffic_simulator():
-            while True:
-                base_traffic = 100
-                hour = time.localtime().tm_hour
-                
-                if 9 <= hour <= 17:
-                    self.current_traffic = random.randint(150, 300)
-                elif 18 <= hour <= 22:
-                    self.current_traffic = random.randint(200, 400)
-                else:
-                    self.current_traffic = random.randint(50, 150)
-                
-                if random.random() < 0.1:
-                    self.current_traffic = random.randint(500, 800)
-                    print("🚨 TRAFFIC SPIKE DETECTED!")
-                
-                self.predictor.add_traffic_data(self.current_traffic)
-                time.sleep(5)
-        
-        def metrics_updater():
-            while True:
-                for server_id in self.config['servers']:
-                    traffic_per_server = self.current_traffic / len(self.config['servers'])
-                    
-                    cpu_usage = min(0.95, (traffic_per_server / 100) * 0.3 + random.uniform(0.1, 0.3))
-                    memory_usage = min(0.95, 0.4 + random.uniform(0.1, 0.3))
-                    response_time = max(0.1, (traffic_per_server / 100) * 0.2 + random.uniform(0.1, 0.4))
-                    error_rate = max(0.0, (traffic_per_server / 500) * 0.1 + random.uniform(0.0, 0.05))
-                    
-                    self.health_monitor.update_server_metrics(server_id, {
-                        'cpu_usage': cpu_usage,
-                        'memory_usage': memory_usage,
-                        'response_time': response_time,
-                        'error_rate': error_rate,
-                        'request_rate': traffic_per_server
-                    })
-                
-                time.sleep(10)
-        
-        def predictor_display():
-            while True:
-                prediction = self.predictor.predict_next_traffic()
-                spike_detected = self.predictor.detect_spike(self.current_traffic)
-                
-                print(f"\n📊 Current Traffic: {self.current_traffic:.0f} req/s")
-                print(f"🔮 Predicted Traffic: {prediction:.0f} req/s")
-                print(f"🚨 Spike Detected: {spike_detected}")
-                
-                for server_id in self.config['servers']:
-                    health = self.health_monitor.server_metrics[server_id]['health_score']
-                    overloaded = self.health_monitor.is_server_overloaded(server_id)
-                    risk = self.health_monitor.predict_overload_risk(server_id, prediction)
-                    status = "❌ OVERLOADED" if overloaded else "✅ HEALTHY"
-                    print(f"   {server_id}: Health={health:.1f}% Risk={risk.upper()} {status}")
-                
-                time.sleep(30)
-        
-        threading.Thread(target=traffic_simulator, daemon=True).start()
-        threading.Thread(target=metrics_updater, daemon=True).start() 
-        threading.Thread(target=predictor_display, daemon=True).start()
-    
-    def get_best_server(self):
-        predicted_traffic = self.predictor.predict_next_traffic()
-        
-        healthy_servers = []
-        for server_id in self.config['servers']:
-            if not self.health_monitor.is_server_overloaded(server_id):
-                risk = self.health_monitor.predict_overload_risk(server_id, predicted_traffic)
-                if risk != "high":
-                    healthy_servers.append(server_id)
-        
-        if not healthy_servers:
-            return self.health_monitor.get_best_server()
-        
-        return random.choice(healthy_servers)
-
-    def get_dashboard_data(self):
-        """Get all data needed for the dashboard"""
-        predicted_traffic = self.predictor.predict_next_traffic()
-        spike_detected = self.predictor.detect_spike(self.current_traffic)
-        
-        # Count healthy servers
-        healthy_count = 0
-        for server_id in self.config['servers']:
-            if not self.health_monitor.is_server_overloaded(server_id):
-                healthy_count += 1
-        
-        # Prepare server data for UI
-        servers_data = {}
-        for server_id in self.config['servers']:
-            server_metrics = self.health_monitor.server_metrics.get(server_id, {})
-            risk_level = self.health_monitor.predict_overload_risk(server_id, predicted_traffic)
-            
-            servers_data[server_id] = {
-                'cpu_usage': server_metrics.get('cpu_usage', 0),
-                'memory_usage': server_metrics.get('memory_usage', 0),
-                'response_time': server_metrics.get('response_time', 0),
-                'error_rate': server_metrics.get('error_rate', 0),
-                'health_score': server_metrics.get('health_score', 0),
-                'risk_level': risk_level
-            }
-        
-        return {
-            'current_traffic': self.current_traffic,
-            'predicted_traffic': predicted_traffic,
-            'traffic_spike': spike_detected,
-            'healthy_servers': healthy_count,
-            'total_servers': len(self.config['servers']),
-            'servers': servers_data
-        }
-
 # Create Flask app
 app = Flask(__name__)
 load_balancer = PredictiveLoadBalancer()
+dashboard_broadcaster = DashboardBroadcaster()
+KEY_HEADER = load_balancer.config.get('routing', {}).get('consistent_hash', {}).get('key_header', DEFAULT_KEY_HEADER)
+TENANT_HEADER = None if load_balancer.traffic_series is None else load_balancer.traffic_series.config['tenant_header']
+dashboard_broadcaster.publish(load_balancer.snapshot)
+load_balancer.snapshot_listeners.append(dashboard_broadcaster.publish)
 
 @app.route('/')
 def home():
@@ -659,42 +455,301 @@ def dashboard_data():
     data = load_balancer.get_dashboard_data()
     return jsonify(data)
 
+@app.route('/stream')
+def dashboard_stream():
+    """Server-Sent Events: a full payload, then per-field deltas on every state change"""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    return Response(
+        dashboard_broadcaster.subscribe(last_event_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/route', methods=['GET'])
 def route_request():
-    best_server = load_balancer.get_best_server()
+    """Pick a server for a request path; the strategy is per endpoint unless overridden.
+
+    A routing key (?key= or the configured header) makes the pick sticky.
+    The request is counted against its tenant's traffic series.
+    """
+    snapshot = load_balancer.snapshot
+    key = request.args.get('key') or request.headers.get(KEY_HEADER)
+    if TENANT_HEADER:
+        load_balancer.record_request(
+            request.args.get('path', '/'), request.args.get('tenant') or request.headers.get(TENANT_HEADER)
+        )
+    try:
+        best_server, strategy = load_balancer.choose_server(
+            request.args.get('path', '/'), request.args.get('strategy'), key
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     if not best_server:
         return jsonify({'error': 'No healthy servers available'}), 503
     
+    # Counted as in flight until the client hands the token back to /route/complete,
+    # or until the token expires
+    token = load_balancer.route_leases.issue(best_server, tag=load_balancer.breaker_epoch(best_server))
     return jsonify({
         'server': best_server,
-        'strategy': 'predictive_load_balancing',
-        'current_traffic': load_balancer.current_traffic,
+        'strategy': strategy,
+        'token': token,
+        'token_ttl': load_balancer.route_leases.ttl,
+        'current_traffic': snapshot.current_traffic,
         'message': f'Request routed to {best_server}'
     })
 
+@app.route('/route/complete', methods=['POST'])
+def route_complete():
+    """Report that a request routed via /route has finished, by the `token` /route returned.
+
+    An optional `status` (HTTP status code) or `ok` flag feeds the server's
+    circuit breaker, with `latency` in seconds (default: time since /route).
+    Unknown, already completed and expired tokens are rejected.
+    """
+    body = request.get_json(silent=True)
+    if body is None:
+        body = {}
+    elif not isinstance(body, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    token = request.args.get('token') or body.get('token')
+    if not isinstance(token, str) or not token:
+        return jsonify({'error': 'Missing token'}), 400
+    status = request.args.get('status', body.get('status'))
+    latency = request.args.get('latency', body.get('latency'))
+    try:
+        status = None if status is None else int(status)
+        latency = None if latency is None else float(latency)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Expected an integer status and a latency in seconds'}), 400
+    if latency is not None and not (math.isfinite(latency) and latency >= 0):
+        return jsonify({'error': 'Latency must be a finite, non-negative number of seconds'}), 400
+    
+    completed = load_balancer.route_leases.complete(token)
+    if completed is None:
+        return jsonify({'error': 'Unknown or expired route token'}), 409
+    server_id, elapsed, epoch = completed
+    ok = body.get('ok', status < 500 if status is not None else None)
+    if ok is not None:
+        load_balancer.record_outcome(server_id, bool(ok), elapsed if latency is None else latency, epoch)
+    return jsonify({'server': server_id, 'in_flight': load_balancer.in_flight.get(server_id)})
+
 @app.route('/metrics', methods=['GET'])
 def get_metrics():
-    return jsonify(load_balancer.health_monitor.server_metrics)
+    """Server metrics as JSON, or the OpenMetrics / Prometheus exposition when the Accept header asks for it"""
+    accept = request.headers.get('Accept', '')
+    if not wants_openmetrics(accept):
+        return jsonify(dict(load_balancer.health_monitor.server_metrics))
+    # Streamed chunk by chunk, so a large fleet never builds the whole page in memory
+    openmetrics = 'application/openmetrics-text' in accept.lower()
+    return Response(
+        load_balancer.render_metrics(openmetrics),
+        content_type=OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE
+    )
+
+@app.route('/ingest', methods=['POST'])
+def ingest_metrics():
+    """Bulk metrics push from backends: JSON lines or the binary batch format"""
+    try:
+        summary = ingest(
+            load_balancer.health_monitor, request.get_data(), request.mimetype,
+            load_balancer.pool.members
+        )
+    except IngestError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if summary['servers_updated']:
+        load_balancer.publish_snapshot()
+    return jsonify(summary)
 
 @app.route('/predict', methods=['GET'])
 def get_prediction():
-    prediction = load_balancer.predictor.predict_next_traffic()
-    spike = load_balancer.predictor.detect_spike(load_balancer.current_traffic)
+    snapshot = load_balancer.snapshot
+    
+    return jsonify({
+        'current_traffic': snapshot.current_traffic,
+        'predicted_traffic': snapshot.predicted_traffic,
+        'traffic_spike_detected': snapshot.traffic_spike
+    })
+
+@app.route('/forecast', methods=['GET'])
+def get_forecast():
+    """Forecasts for several horizons with quantile intervals.
+
+    ?horizons=30s,5m,15m,1h and ?quantiles=0.05,0.5,0.95 override the
+    configured defaults.
+    """
+    try:
+        horizons = [parse_horizon(h) for h in request.args.get('horizons', '').split(',') if h.strip()]
+        quantiles = [float(q) for q in request.args.get('quantiles', '').split(',') if q.strip()]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if any(not 0 <= q <= 1 for q in quantiles):
+        return jsonify({'error': 'Quantiles must be between 0 and 1'}), 400
     
+    snapshot = load_balancer.snapshot
+    return jsonify({
+        'current_traffic': snapshot.current_traffic,
+        'traffic_spike_detected': snapshot.traffic_spike,
+        'forecasts': [forecast.to_dict() for forecast in load_balancer.forecast(horizons, quantiles)]
+    })
+
+# Admin endpoints take `Authorization: Bearer <token>` when a token is configured
+# (PLB_ADMIN_TOKEN or membership.admin_token); without one they only answer local clients
+ADMIN_TOKEN = os.environ.get('PLB_ADMIN_TOKEN') or load_balancer.membership_config.get('admin_token')
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+def admin_only(view):
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        if ADMIN_TOKEN:
+            supplied = request.headers.get('Authorization', '').encode()
+            if not hmac.compare_digest(supplied, f'Bearer {ADMIN_TOKEN}'.encode()):
+                return jsonify({'error': 'Admin token required'}), 401
+        elif request.remote_addr not in LOOPBACK_ADDRESSES:
+            return jsonify({'error': 'Admin endpoints only accept local clients unless an admin token is set'}), 403
+        return view(*args, **kwargs)
+    return guarded
+
+def membership_response(change):
     return jsonify({
-        'current_traffic': load_balancer.current_traffic,
-        'predicted_traffic': prediction,
-        'traffic_spike_detected': spike
+        'added': list(change.added),
+        'draining': list(change.drained),
+        'readdressed': list(change.readdressed),
+        'active_servers': len(load_balancer.pool.active)
+    })
+
+@app.route('/admin/servers', methods=['GET'])
+@admin_only
+def list_servers():
+    """Current membership with each server's address, state and in-flight count"""
+    return jsonify({
+        server_id: {
+            'address': member.address,
+            'state': 'draining' if member.draining else 'active',
+            'in_flight': load_balancer.in_flight.get(server_id)
+        }
+        for server_id, member in load_balancer.pool.members.items()
     })
 
+@app.route('/admin/servers', methods=['POST', 'PUT'])
+@admin_only
+def update_servers():
+    """POST adds servers, PUT replaces the whole set: {"servers": {"id": "host:port", ...}}"""
+    body = request.get_json(silent=True)
+    servers = body.get('servers') if isinstance(body, dict) else None
+    if isinstance(servers, list) and all(isinstance(server_id, str) for server_id in servers):
+        servers = dict.fromkeys(servers)
+    if not isinstance(servers, dict):
+        return jsonify({'error': 'Expected {"servers": {"id": "host:port"}} or a list of ids'}), 400
+    
+    try:
+        if request.method == 'PUT':
+            return membership_response(load_balancer.sync_servers(servers))
+        return membership_response(load_balancer.add_servers(servers))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/admin/servers/<server_id>', methods=['DELETE'])
+@admin_only
+def drain_server(server_id):
+    """Start draining a server; it is removed once its in-flight requests finish"""
+    if server_id not in load_balancer.pool.members:
+        return jsonify({'error': f'Unknown server {server_id}'}), 404
+    return membership_response(load_balancer.drain_servers([server_id]))
+
+@app.route('/anomalies', methods=['GET'])
+def get_anomalies():
+    """Most recent anomaly events (traffic and per server metric), oldest first"""
+    if load_balancer.anomaly_monitor is None:
+        return jsonify({'error': 'Anomaly detection is disabled'}), 404
+    
+    limit = request.args.get('limit', type=int)
+    return jsonify([event.to_dict() for event in load_balancer.anomaly_monitor.recent(limit)])
+
+def series_response(summary):
+    tenant, route = summary.pop('key')
+    return {'tenant': tenant, 'route': route, **summary}
+
+@app.route('/traffic/series', methods=['GET'])
+def get_traffic_series():
+    """Top (tenant, route) traffic series.
+
+    Filters: ?tenant=, ?spiking=true. ?sort=rate|forecast|score (highest
+    first), ?limit= (default 100) and ?steps= (forecast ticks ahead).
+    """
+    if load_balancer.traffic_series is None:
+        return jsonify({'error': 'Traffic series are disabled'}), 404
+    
+    try:
+        summaries = load_balancer.traffic_series.query(
+            tenant=request.args.get('tenant'),
+            spiking=request.args.get('spiking', '').lower() in ('1', 'true', 'yes'),
+            sort=request.args.get('sort', 'rate'),
+            limit=request.args.get('limit', type=int, default=100),
+            steps=request.args.get('steps', type=int, default=1)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'stats': load_balancer.traffic_series.stats(),
+        'series': [series_response(summary) for summary in summaries]
+    })
+
+@app.route('/traffic/series/<tenant>/', defaults={'route': ''}, methods=['GET'])
+@app.route('/traffic/series/<tenant>/<path:route>', methods=['GET'])
+def get_traffic_series_detail(tenant, route):
+    """One series with its recent rate history, oldest first"""
+    if load_balancer.traffic_series is None:
+        return jsonify({'error': 'Traffic series are disabled'}), 404
+    
+    series = load_balancer.traffic_series.series((tenant, '/' + route), request.args.get('steps', type=int, default=1))
+    if series is None:
+        return jsonify({'error': f"No traffic series for tenant '{tenant}' route '/{route}'"}), 404
+    return jsonify(series_response(series))
+
+@app.route('/circuit-breakers', methods=['GET'])
+def get_circuit_breakers():
+    """Breaker state per server that has reported outcomes, and the currently ejected servers"""
+    if load_balancer.breakers is None:
+        return jsonify({'error': 'Circuit breakers are disabled'}), 404
+    
+    return jsonify({
+        'ejected': sorted(load_balancer.breakers.ejected),
+        'servers': load_balancer.breakers.status()
+    })
+
+def autoscale_response():
+    latest = load_balancer.autoscaler.latest
+    return jsonify({
+        'plan': latest.to_dict() if latest else None,
+        'recent': [plan.to_dict() for plan in load_balancer.autoscaler.recent_actions()]
+    })
+
+@app.route('/autoscale', methods=['GET'])
+def get_autoscale_plan():
+    """Latest autoscaling plan (null before the first evaluation) and recent history"""
+    if load_balancer.autoscaler is None:
+        return jsonify({'error': 'Autoscaling is disabled'}), 404
+    return autoscale_response()
+
+@app.route('/autoscale', methods=['POST'])
+@admin_only
+def evaluate_autoscale_plan():
+    """Plan now; a non-hold plan runs the configured executor and starts its cooldown"""
+    if load_balancer.autoscaler is None:
+        return jsonify({'error': 'Autoscaling is disabled'}), 404
+    load_balancer.plan_capacity()
+    return autoscale_response()
+
 @app.route('/simulate_spike', methods=['POST'])
 def simulate_spike():
     """Simulate a traffic spike for testing"""
-    load_balancer.current_traffic = random.randint(600, 900)
+    snapshot = load_balancer.record_traffic(random.randint(600, 900), add_to_history=False)
     return jsonify({
         'message': 'Traffic spike simulated',
-        'new_traffic': load_balancer.current_traffic
+        'new_traffic': snapshot.current_traffic
     })
 
 if __name__ == '__main__':
@@ -0,0 +1,240 @@
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+OPENMETRICS_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 1µs .. ~8.4s in powers of two: routing decisions land in the low buckets,
+# background ticks in the high ones
+LATENCY_BUCKETS = tuple(1e-6 * 2 ** i for i in range(24))
+
+# Per-server gauges: (metric name, help, FleetMetrics column or attribute)
+FLEET_GAUGES = (
+    ('plb_server_cpu_usage', 'CPU usage as a fraction', 'cpu_usage'),
+    ('plb_server_memory_usage', 'Memory usage as a fraction', 'memory_usage'),
+    ('plb_server_response_time_seconds', 'Mean response time', 'response_time'),
+    ('plb_server_error_rate', 'Fraction of requests that failed', 'error_rate'),
+    ('plb_server_request_rate', 'Requests per second', 'request_rate'),
+    ('plb_server_health_score', 'Health score (0-100)', 'health'),
+    ('plb_server_overloaded', '1 if above an overload threshold', 'overloaded'),
+    ('plb_server_last_update_timestamp_seconds', 'When metrics were last reported', 'last_update'),
+)
+
+
+def wants_openmetrics(accept):
+    """True if an Accept header asks for OpenMetrics or the Prometheus text format"""
+    accept = (accept or '').lower()
+    return 'application/openmetrics-text' in accept or 'text/plain' in accept
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """Fixed-bucket histogram for hot-path latencies.
+
+    Buckets are allocated once; `observe` is a binary search over the
+    bounds and two increments under an uncontended lock, with no
+    allocation, so it can sit on every routing decision.
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def read(self):
+        """(cumulative bucket counts, sum) from one consistent read"""
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        return list(itertools.accumulate(counts)), total
+
+
+class CounterFamily:
+    """Monotonic counters keyed by a tuple of label values, lock-free like InFlightCounters"""
+
+    def __init__(self):
+        self._counters = {}
+        self._values = {}
+
+    def inc(self, key):
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters.setdefault(key, itertools.count(1))
+        self._values[key] = next(counter)
+
+    def items(self):
+        return list(self._values.items())
+
+    def forget(self, predicate):
+        """Drop counters whose key matches (e.g. servers that left the fleet)"""
+        for key in [key for key in list(self._counters) if predicate(key)]:
+            self._counters.pop(key, None)
+            self._values.pop(key, None)
+
+
+class Instrumentation:
+    """The balancer's own metrics: latency histograms and route counters"""
+
+    def __init__(self):
+        self.route_latency = {}  # strategy -> Histogram
+        self.prediction_latency = Histogram()
+        self.snapshot_latency = Histogram()
+        self.tick_latency = {}  # background task -> Histogram
+        self.routes = CounterFamily()  # (server, strategy)
+        self._lock = threading.Lock()
+
+    def _histogram(self, table, name):
+        histogram = table.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(name, Histogram())
+        return histogram
+
+    def route_histogram(self, strategy):
+        return self._histogram(self.route_latency, strategy)
+
+    def tick(self, task):
+        """Context manager timing one iteration of a background task"""
+        return self._histogram(self.tick_latency, task).time()
+
+    def forget_servers(self, server_ids):
+        """Removal listener: drop route counters of servers that left the fleet"""
+        gone = set(server_ids)
+        self.routes.forget(lambda key: key[0] in gone)
+
+
+class OpenMetricsExporter:
+    """Renders the balancer's metrics in the OpenMetrics (or Prometheus) text format.
+
+    `render` is a generator of byte chunks: the per-server families are
+    emitted `chunk_size` servers at a time, so a streaming response starts
+    immediately and other request threads get the GIL between chunks even
+    for a very large fleet. Fleet chunks are cached per snapshot version,
+    so concurrent scrapers of one snapshot only render it once.
+    """
+
+    def __init__(self, instrumentation=None, chunk_size=1000):
+        self.instrumentation = instrumentation
+        self.chunk_size = chunk_size
+        self._labels = ((), [])  # (server_ids, rendered label sets)
+        self._fleet_cache = (None, ())  # (snapshot version, chunks)
+
+    def _server_labels(self, server_ids):
+        if server_ids is not self._labels[0]:
+            self._labels = (server_ids, [f'{{server="{escape_label(server_id)}"}}' for server_id in server_ids])
+        return self._labels[1]
+
+    def header(self, name, kind, help_text, openmetrics):
+        family = name[:-len('_total')] if kind == 'counter' and openmetrics else name
+        return f'# TYPE {family} {kind}\n# HELP {family} {help_text}\n'
+
+    def render_histogram(self, name, help_text, histograms, label, openmetrics):
+        parts = [self.header(name, 'histogram', help_text, openmetrics)]
+        for key, histogram in sorted(histograms.items()):
+            base = f'{label}="{escape_label(key)}",' if label else ''
+            cumulative, total = histogram.read()
+            for bound, count in zip(histogram.bounds, cumulative):
+                parts.append(f'{name}_bucket{{{base}le="{bound:.9g}"}} {count}\n')
+            parts.append(f'{name}_bucket{{{base}le="+Inf"}} {cumulative[-1]}\n')
+            labels = f'{{{base[:-1]}}}' if base else ''
+            parts.append(f'{name}_count{labels} {cumulative[-1]}\n{name}_sum{labels} {total!r}\n')
+        return ''.join(parts).encode()
+
+    def fleet_chunks(self, snapshot, openmetrics):
+        version, chunks = self._fleet_cache
+        if version == (snapshot.version, openmetrics):
+            yield from chunks
+            return
+
+        fleet = snapshot.fleet
+        labels = self._server_labels(fleet.server_ids)
+        rendered = []
+        for name, help_text, source in FLEET_GAUGES:
+            values = fleet.columns[source] if source in fleet.columns else getattr(fleet, source)
+            values = values.astype(float).tolist()
+            rendered.append(self.header(name, 'gauge', help_text, openmetrics).encode())
+            yield rendered[-1]
+            for start in range(0, len(labels), self.chunk_size):
+                rendered.append(''.join(
+                    f'{name}{label} {value!r}\n'
+                    for label, value in zip(labels[start:start + self.chunk_size], values[start:start + self.chunk_size])
+                ).encode())
+                yield rendered[-1]
+        self._fleet_cache = ((snapshot.version, openmetrics), rendered)
+
+    def in_flight_chunks(self, snapshot, in_flight, openmetrics):
+        # In-flight counts change with every request, so they are never cached
+        fleet = snapshot.fleet
+        labels = self._server_labels(fleet.server_ids)
+        yield self.header('plb_server_in_flight', 'gauge', 'Requests routed and not yet completed', openmetrics).encode()
+        counts = [in_flight.get(server_id) for server_id in fleet.server_ids]
+        for start in range(0, len(labels), self.chunk_size):
+            yield ''.join(
+                f'plb_server_in_flight{label} {count}\n'
+                for label, count in zip(labels[start:start + self.chunk_size], counts[start:start + self.chunk_size])
+            ).encode()
+
+    def render(self, snapshot, in_flight, openmetrics=True):
+        """Byte chunks of one exposition; `openmetrics` False gives Prometheus text format 0.0.4"""
+        yield (
+            self.header('plb_traffic_requests_per_second', 'gauge', 'Current traffic', openmetrics)
+            + f'plb_traffic_requests_per_second {float(snapshot.current_traffic)!r}\n'
+            + self.header('plb_predicted_traffic_requests_per_second', 'gauge', 'Next forecast', openmetrics)
+            + f'plb_predicted_traffic_requests_per_second {float(snapshot.predicted_traffic)!r}\n'
+            + self.header('plb_traffic_spike', 'gauge', '1 while a traffic spike is detected', openmetrics)
+            + f'plb_traffic_spike {int(snapshot.traffic_spike)}\n'
+            + self.header('plb_snapshot_version', 'gauge', 'Version of the published snapshot', openmetrics)
+            + f'plb_snapshot_version {snapshot.version}\n'
+            + self.header('plb_servers_routable', 'gauge', 'Servers eligible for new requests', openmetrics)
+            + f'plb_servers_routable {len(snapshot.routable_servers)}\n'
+        ).encode()
+        yield from self.fleet_chunks(snapshot, openmetrics)
+        yield from self.in_flight_chunks(snapshot, in_flight, openmetrics)
+
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            yield self.render_histogram(
+                'plb_route_decision_seconds', 'Time to pick a server', instrumentation.route_latency,
+                'strategy', openmetrics
+            )
+            yield self.render_histogram(
+                'plb_prediction_seconds', 'Time to compute the traffic forecast',
+                {'': instrumentation.prediction_latency}, None, openmetrics
+            )
+            yield self.render_histogram(
+                'plb_snapshot_publish_seconds', 'Time to build and publish a snapshot',
+                {'': instrumentation.snapshot_latency}, None, openmetrics
+            )
+            yield self.render_histogram(
+                'plb_background_tick_seconds', 'Duration of one background task iteration',
+                instrumentation.tick_latency, 'task', openmetrics
+            )
+            routes = sorted(instrumentation.routes.items())
+            yield self.header('plb_routes_total', 'counter', 'Routing decisions', openmetrics).encode()
+            for start in range(0, len(routes), self.chunk_size):
+                yield ''.join(
+                    f'plb_routes_total{{server="{escape_label(server_id)}",strategy="{strategy}"}} {count}\n'
+                    for (server_id, strategy), count in routes[start:start + self.chunk_size]
+                ).encode()
+        if openmetrics:
+            yield b'# EOF\n'
@@ -0,0 +1,160 @@
+import json
+import math
+import struct
+
+import numpy as np
+
+from fleet_metrics import METRIC_COLUMNS
+
+JSON_LINES_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-lines')
+BINARY_TYPE = 'application/x-plb-metrics'
+
+# Binary batch layout (little endian):
+#   header   magic b'PLBM', u8 version, u8 reserved, u16 id count, u32 sample count
+#   id table id count x (u8 length, utf-8 server id)
+#   samples  sample count x (u16 id index, u8 field mask, u8 reserved, 5 x f32 metrics)
+# Bit i of the field mask marks METRIC_COLUMNS[i] as present in the sample.
+MAGIC = b'PLBM'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHI')
+SAMPLE_DTYPE = np.dtype([
+    ('server', '<u2'),
+    ('mask', 'u1'),
+    ('reserved', 'u1'),
+    ('values', '<f4', (len(METRIC_COLUMNS),))
+])
+
+
+class IngestError(ValueError):
+    """Raised for a malformed metrics batch"""
+
+
+def encode_binary(samples):
+    """Encode [(server_id, metrics dict), ...] as a binary batch"""
+    id_index = {}
+    for server_id, _ in samples:
+        id_index.setdefault(server_id, len(id_index))
+
+    records = np.zeros(len(samples), dtype=SAMPLE_DTYPE)
+    for i, (server_id, metrics) in enumerate(samples):
+        records[i]['server'] = id_index[server_id]
+        for bit, name in enumerate(METRIC_COLUMNS):
+            if name in metrics:
+                records[i]['mask'] |= 1 << bit
+                records[i]['values'][bit] = metrics[name]
+
+    parts = [HEADER.pack(MAGIC, VERSION, 0, len(id_index), len(samples))]
+    for server_id in id_index:
+        encoded = server_id.encode()
+        parts.append(bytes([len(encoded)]) + encoded)
+    parts.append(records.tobytes())
+    return b''.join(parts)
+
+
+def decode_binary(data):
+    """Decode a binary batch into (server_ids, columns) with the last sample per server winning"""
+    if len(data) < HEADER.size:
+        raise IngestError('Truncated header')
+    magic, version, _, id_count, sample_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise IngestError('Not a metrics batch (bad magic or version)')
+
+    offset = HEADER.size
+    server_ids = []
+    for _ in range(id_count):
+        if offset >= len(data):
+            raise IngestError('Truncated id table')
+        length = data[offset]
+        try:
+            server_ids.append(bytes(data[offset + 1:offset + 1 + length]).decode())
+        except UnicodeDecodeError:
+            raise IngestError('Server id is not valid UTF-8')
+        offset += 1 + length
+
+    if len(data) - offset != sample_count * SAMPLE_DTYPE.itemsize:
+        raise IngestError('Sample section length does not match sample count')
+    records = np.frombuffer(data, dtype=SAMPLE_DTYPE, count=sample_count, offset=offset)
+    if sample_count and records['server'].max() >= id_count:
+        raise IngestError('Sample references an unknown id index')
+    finite = np.isfinite(records['values'])
+    if not finite.all():
+        # Fields outside a sample's mask are ignored, whatever they hold
+        rows, fields = np.nonzero(~finite)
+        if (records['mask'][rows] & (1 << fields)).any():
+            raise IngestError('Sample contains a NaN or infinite metric')
+
+    # Samples are applied in order, so only the last sample per (server, metric) matters
+    columns = {}
+    for bit, name in enumerate(METRIC_COLUMNS):
+        present = np.flatnonzero(records['mask'] & (1 << bit))
+        # First occurrence in the reversed order is the last sample for each server
+        servers = records['server'][present][::-1]
+        unique_servers, first = np.unique(servers, return_index=True)
+        column = np.full(id_count, np.nan)
+        column[unique_servers] = records['values'][present[::-1][first], bit]
+        columns[name] = column
+    return server_ids, columns, sample_count
+
+
+def decode_json_lines(data):
+    """Decode newline-delimited JSON samples into {server_id: merged metrics}"""
+    updates = {}
+    count = 0
+    for line_number, line in enumerate(data.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            sample = json.loads(line)
+            server_id = sample['server']
+            if not isinstance(server_id, str):
+                raise TypeError(server_id)
+            values = {name: float(sample[name]) for name in METRIC_COLUMNS if name in sample}
+            # NaN and infinities would poison every array computed from the fleet
+            if not all(math.isfinite(value) for value in values.values()):
+                raise ValueError(values)
+            updates.setdefault(server_id, {}).update(values)
+        except (ValueError, KeyError, TypeError):
+            raise IngestError(
+                f'Line {line_number}: expected a JSON object with a string "server" field '
+                f'and finite numeric metrics'
+            )
+        count += 1
+    return updates, count
+
+
+def ingest(health_monitor, data, content_type, known_servers):
+    """Apply one batch to the health monitor in a single update; returns a summary dict.
+
+    Only servers in `known_servers` (membership) are updated, and the update
+    itself skips any that left the fleet since, so a batch racing with a
+    removal cannot bring the server back. Both count as unknown.
+    """
+    known_servers = set(known_servers)
+    fleet = None
+    if content_type in JSON_LINES_TYPES:
+        updates, count = decode_json_lines(data)
+        accepted = [server_id for server_id in updates if server_id in known_servers]
+        if accepted:
+            fleet = health_monitor.bulk_update_server_metrics(
+                {server_id: updates[server_id] for server_id in accepted}, add_new=False
+            )
+        rejected = set(updates) - known_servers
+    elif content_type == BINARY_TYPE:
+        server_ids, columns, count = decode_binary(data)
+        keep = np.fromiter((server_id in known_servers for server_id in server_ids), dtype=bool,
+                           count=len(server_ids))
+        accepted = [server_id for server_id, ok in zip(server_ids, keep) if ok]
+        if accepted:
+            fleet = health_monitor.bulk_update_metric_columns(
+                accepted, {name: column[keep] for name, column in columns.items()}
+            )
+        rejected = {server_id for server_id, ok in zip(server_ids, keep) if not ok}
+    else:
+        raise IngestError(f"Unsupported content type '{content_type}'")
+
+    if fleet is not None:
+        gone = set(accepted).difference(fleet.slots)
+        if gone:
+            rejected.update(gone)
+            accepted = [server_id for server_id in accepted if server_id not in gone]
+    return {'samples': count, 'servers_updated': len(accepted), 'unknown_servers': sorted(rejected)}
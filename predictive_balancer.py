@@ -0,0 +1,523 @@
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from simple_predictor import SimpleTrafficPredictor
+from server_health import ServerHealthMonitor
+from snapshot import BalancerSnapshot
+from state_store import CopyOnWriteStore
+from health_checker import HealthChecker
+from routing_strategies import Router
+from timeseries_store import TimeSeriesStore
+from autoscaler import AutoscalePlanner
+from anomaly import AnomalyEvent, AnomalyMonitor, event_kind
+from server_pool import ServerListWatcher, ServerPool
+from metrics_export import Instrumentation, OpenMetricsExporter
+from circuit_breaker import BreakerBoard
+from forecasting import DEFAULT_HORIZONS, DEFAULT_QUANTILES
+from traffic_series import TrafficSeriesStore, route_of
+
+logger = logging.getLogger(__name__)
+
+def notify(listeners, *args):
+    """Call each listener; one that raises is logged and does not stop the others or the caller"""
+    for listener in listeners:
+        try:
+            listener(*args)
+        except Exception:
+            logger.exception("Listener %r failed", listener)
+
+class PredictiveLoadBalancer:
+    def __init__(self, start_background_tasks=True):
+        print("🔀 Starting Predictive Load Balancer...")
+        
+        with open('config.json', 'r') as f:
+            self.config = json.load(f)
+        
+        anomaly_config = self.config.get('anomaly_detection', {})
+        self.predictor = SimpleTrafficPredictor(
+            self.config.get('max_history', 100), self.config.get('forecasting'),
+            anomaly_config=anomaly_config
+        )
+        self.health_monitor = ServerHealthMonitor()
+        self.current_traffic = 100
+        # Sample number of current_traffic in the predictor's history (None if not recorded there)
+        self.current_sample = None
+        
+        self.history_store = None
+        history_config = self.config.get('history_store', {})
+        if history_config.get('enabled'):
+            self.history_store = TimeSeriesStore(
+                history_config.get('path', 'data/history'), history_config.get('retention')
+            )
+            self.warm_start(history_config.get('warm_start_samples', self.predictor.max_history))
+        # Hot-path latency histograms and route counters, exposed by `exporter`
+        self.instrumentation = Instrumentation()
+        self.exporter = OpenMetricsExporter(
+            self.instrumentation, self.config.get('metrics_export', {}).get('chunk_size', 1000)
+        )
+        
+        # Writers (background loops, admin endpoints) serialise on the store's lock;
+        # request handlers only ever read the published snapshot.
+        self._snapshots = CopyOnWriteStore()
+        # Called with each new snapshot, in version order, by the publishing thread
+        self.snapshot_listeners = []
+        if self.history_store:
+            self.snapshot_listeners.append(lambda snapshot: self.history_store.record_fleet(snapshot.fleet))
+        # Subscribe to anomaly_monitor.listeners for lists of AnomalyEvent
+        self.anomaly_monitor = None
+        # Console reports are limited to one line per report_interval seconds
+        self.anomaly_report_interval = anomaly_config.get('report_interval', 10.0)
+        self._anomaly_report = (float('-inf'), 0)  # (last report, events not shown since)
+        if anomaly_config.get('enabled'):
+            self.anomaly_monitor = AnomalyMonitor(anomaly_config)
+            self.anomaly_monitor.listeners.append(self.report_anomalies)
+            self.snapshot_listeners.append(self.anomaly_monitor.observe)
+        
+        # Membership changes at runtime (admin API, watched server list); the
+        # config only seeds it
+        self.pool = ServerPool(self.config['servers'], self.config.get('upstreams', {}))
+        self.membership_config = self.config.get('membership', {})
+        # Called with the ids of servers that finished draining and were removed
+        self.removal_listeners = []
+        if self.history_store:
+            self.removal_listeners.append(self.history_store.release_servers)
+        self.removal_listeners.append(self.instrumentation.forget_servers)
+        
+        # Per-server circuit breakers fed by observed request outcomes (record_outcome);
+        # ejected servers are left out of the routable set of the next snapshot
+        self.breakers = None
+        # Republishes requested by request_publish run here, off the caller's thread
+        self._republisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='republish')
+        self._republish_pending = threading.Event()
+        breaker_config = self.config.get('circuit_breaker', {})
+        if breaker_config.get('enabled'):
+            self.breakers = BreakerBoard(breaker_config, fleet_size=lambda: len(self.pool.active))
+            # Breakers change state inside record_outcome, which the proxy calls on its event loop;
+            # publishing there would block the loop on the snapshot lock
+            self.breakers.listeners.append(self.request_publish)
+            self.removal_listeners.append(self.breakers.forget)
+        
+        self.router = Router(
+            self.config.get('routing', {}), self.pool.active, self.instrumentation, self.breakers
+        )
+        
+        # Request rate, forecast and spikes per (tenant, route), fed by record_request
+        self.traffic_series = None
+        series_config = self.config.get('traffic_series', {})
+        if series_config.get('enabled'):
+            self.traffic_series = TrafficSeriesStore(series_config)
+        self.in_flight = self.router.in_flight
+        self.route_leases = self.router.leases
+        self.health_checker = None
+        
+        autoscaling_config = self.config.get('autoscaling', {})
+        self.autoscaler = AutoscalePlanner(autoscaling_config) if autoscaling_config.get('enabled') else None
+        
+        self.initialize_servers()
+        self.publish_snapshot()
+        if start_background_tasks:
+            self.setup_background_tasks()
+        
+        print("✅ Load Balancer Ready!")
+    
+    @property
+    def snapshot(self):
+        """The latest published BalancerSnapshot (lock-free read)"""
+        return self._snapshots.value
+    
+    def warm_start(self, samples):
+        """Replay the most recent stored traffic into the predictor (reads only the file tail)"""
+        timestamps, values = self.history_store.traffic_tail(samples)
+        for timestamp, traffic in zip(timestamps.tolist(), values.tolist()):
+            self.predictor.add_traffic_data(traffic, timestamp)
+        if len(values):
+            self.current_traffic = values[-1]
+            self.current_sample = self.predictor.traffic_history.appended
+            print(f"💾 Predictor warmed with {len(values)} stored traffic samples")
+    
+    def initialize_servers(self):
+        self.health_monitor.bulk_update_server_metrics({
+            server_id: {
+                'cpu_usage': random.uniform(0.1, 0.4),
+                'memory_usage': random.uniform(0.3, 0.6),
+                'response_time': random.uniform(0.1, 0.5),
+                'error_rate': random.uniform(0.0, 0.02),
+                'request_rate': random.uniform(80, 120)
+            }
+            for server_id in self.pool.active
+        })
+    
+    def publish_snapshot(self):
+        """Recompute prediction, spike, overload and risk state and publish it atomically"""
+        with self._snapshots.lock, self.instrumentation.snapshot_latency.time():
+            with self.instrumentation.prediction_latency.time():
+                predicted = self.predictor.predict_next_traffic()
+            snapshot = self._snapshots.update(lambda current: BalancerSnapshot.from_fleet(
+                current.version + 1 if current else 1, self.current_traffic, predicted,
+                self.predictor.detect_spike(self.current_traffic, self.current_sample), self.health_monitor.fleet, self.pool.draining,
+                self.breakers.ejected if self.breakers else frozenset()
+            ))
+            notify(self.snapshot_listeners, snapshot)
+        return snapshot
+    
+    def request_publish(self):
+        """Publish a new snapshot soon on a worker thread; never waits for the snapshot lock.
+
+        Requests made while one is still pending are folded into it.
+        """
+        if self._republish_pending.is_set():
+            return
+        self._republish_pending.set()
+        self._republisher.submit(self._republish)
+    
+    def _republish(self):
+        self._republish_pending.clear()
+        try:
+            self.publish_snapshot()
+        except Exception:
+            logger.exception("Republishing the snapshot failed")
+    
+    def record_traffic(self, traffic, add_to_history=True):
+        """Set the current traffic level, feed the predictor and publish a new snapshot"""
+        with self._snapshots.lock:
+            self.current_traffic = traffic
+            self.current_sample = None
+            if add_to_history:
+                timestamp = time.time()
+                self.predictor.add_traffic_data(traffic, timestamp)
+                self.current_sample = self.predictor.traffic_history.appended
+                if self.history_store:
+                    self.history_store.record_traffic(timestamp, traffic)
+                score, spike, shift = self.predictor.last_anomaly
+                if self.anomaly_monitor and (spike or shift):
+                    baseline = float(self.predictor.spike_detector.mean[0])
+                    self.anomaly_monitor.publish([AnomalyEvent(
+                        timestamp, 'traffic', 'traffic', event_kind(spike, shift), traffic, baseline, score
+                    )])
+            return self.publish_snapshot()
+    
+    def record_request(self, path, tenant=None):
+        """Count one request against its (tenant, route) traffic series"""
+        if self.traffic_series is not None:
+            config = self.traffic_series.config
+            self.traffic_series.record((tenant or config['default_tenant'], route_of(path, config['route_depth'])))
+    
+    def tick_traffic_series(self, now=None):
+        """Close the current interval of every (tenant, route) series and report spikes as anomalies"""
+        now = time.time() if now is None else now
+        spikes = self.traffic_series.tick(now)
+        if self.anomaly_monitor and spikes:
+            self.anomaly_monitor.publish([
+                AnomalyEvent(now, tenant, route, 'spike', rate, baseline, score)
+                for (tenant, route), rate, baseline, score in spikes
+            ])
+        return spikes
+    
+    def breaker_epoch(self, server_id):
+        """Tag to pass back to record_outcome, taken when a request is routed to `server_id`"""
+        return self.breakers.epoch(server_id) if self.breakers is not None else None
+    
+    def record_outcome(self, server_id, ok, latency, epoch=None):
+        """Report how a request sent to `server_id` went; feeds its circuit breaker"""
+        if self.breakers is not None:
+            self.breakers.record(server_id, ok, latency, epoch=epoch)
+    
+    def render_metrics(self, openmetrics=True):
+        """Byte chunks of the OpenMetrics (or Prometheus text) exposition of the latest snapshot"""
+        return self.exporter.render(self.snapshot, self.in_flight, openmetrics)
+    
+    def report_anomalies(self, events):
+        """Anomaly listener: every event at debug level, at most one console line per report_interval"""
+        for e in events:
+            logger.debug("Anomaly: %s %s %s value=%.4g baseline=%.4g z=%+.1f",
+                         e.series, e.metric, e.kind, e.value, e.baseline, e.score)
+        now = time.monotonic()
+        last, pending = self._anomaly_report
+        if now - last < self.anomaly_report_interval:
+            self._anomaly_report = (last, pending + len(events))
+            return
+        self._anomaly_report = (now, 0)
+        shown = ', '.join(f"{e.series} {e.metric} {e.kind} (z={e.score:+.1f})" for e in events[:3])
+        hidden = max(len(events) - 3, 0) + pending
+        more = f" and {hidden} more" if hidden else ""
+        print(f"🔔 Anomalies: {shown}{more}")
+    
+    def health_check_targets(self):
+        """{server_id: address} for every member with a known address, draining ones included"""
+        return {server_id: member.address for server_id, member in self.pool.members.items() if member.address}
+    
+    def add_servers(self, servers):
+        """Add servers ({server_id: address or None}) and start routing to them; returns the MembershipChange"""
+        with self._snapshots.lock:
+            checkpoint = self.pool.checkpoint()
+            change = self.pool.add(servers)
+            self._apply_membership(change, checkpoint)
+        return change
+    
+    def drain_servers(self, server_ids):
+        """Stop routing new requests to `server_ids`; they are removed once drained"""
+        with self._snapshots.lock:
+            checkpoint = self.pool.checkpoint()
+            change = self.pool.drain(server_ids)
+            self._apply_membership(change, checkpoint)
+        return change
+    
+    def sync_servers(self, servers):
+        """Make the active servers exactly `servers` ({server_id: address}); others start draining"""
+        with self._snapshots.lock:
+            checkpoint = self.pool.checkpoint()
+            change = self.pool.sync(servers)
+            self._apply_membership(change, checkpoint)
+        return change
+    
+    def _apply_membership(self, change, checkpoint):
+        """Apply a pool change to the fleet, counters and probes as a delta, then publish once.
+
+        All or nothing: if any step raises, the pool goes back to `checkpoint`
+        and the fleet, counters and probes to match it before re-raising.
+        """
+        if not change:
+            return
+        new_ids = [server_id for server_id in change.added if server_id not in self.health_monitor.fleet]
+        new_members = [server_id for server_id in change.added if server_id not in checkpoint[0]]
+        try:
+            if new_ids:
+                self.health_monitor.bulk_update_server_metrics({server_id: {} for server_id in new_ids})
+            for server_id in change.added:
+                self.in_flight.add_server(server_id)
+            if self.health_checker and (change.added or change.readdressed):
+                self.health_checker.set_targets(self.health_check_targets())
+            self.publish_snapshot()
+        except Exception:
+            self.pool.restore(checkpoint)
+            if new_ids:
+                self.health_monitor.remove_servers(new_ids)
+            for server_id in new_members:
+                self.in_flight.remove_server(server_id)
+            if self.health_checker:
+                self.health_checker.set_targets(self.health_check_targets())
+            raise
+        print(f"🧩 Membership: +{len(change.added)} added, {len(change.drained)} draining, "
+              f"{len(change.readdressed)} re-addressed ({len(self.pool.active)} active)")
+    
+    def reap_drained(self, now=None):
+        """Remove draining servers with nothing in flight (or past the drain timeout)"""
+        timeout = self.membership_config.get('drain_timeout', 30.0)
+        # Routes whose client never reported back stop counting against a draining server
+        self.route_leases.expire()
+        with self._snapshots.lock:
+            forgotten = self.pool.forget(self.pool.drained(self.in_flight, timeout, now))
+            if not forgotten:
+                return []
+            self.health_monitor.remove_servers(forgotten)
+            for server_id in forgotten:
+                self.in_flight.remove_server(server_id)
+            if self.health_checker:
+                self.health_checker.set_targets(self.health_check_targets())
+            self.publish_snapshot()
+        notify(self.removal_listeners, forgotten)
+        print(f"🧹 Removed {len(forgotten)} drained servers")
+        return forgotten
+    
+    def forecast_peak(self, horizon_seconds, quantile=None):
+        """Highest predicted traffic over the next `horizon_seconds`, optionally at an upper quantile"""
+        with self._snapshots.lock:
+            return self.predictor.forecast_peak(horizon_seconds, quantile=quantile)[0]
+    
+    def forecast(self, horizons=None, quantiles=None):
+        """Forecasts with quantile intervals per horizon (seconds); defaults from the forecasting config"""
+        forecasting_config = self.config.get('forecasting') or {}
+        horizons = horizons or forecasting_config.get('horizons', DEFAULT_HORIZONS)
+        quantiles = quantiles or forecasting_config.get('quantiles', DEFAULT_QUANTILES)
+        with self._snapshots.lock:
+            return self.predictor.forecast(horizons, quantiles)
+    
+    def plan_capacity(self):
+        """Run the autoscaling planner against the latest snapshot and the upper-quantile forecast"""
+        peak = self.forecast_peak(self.autoscaler.horizon_seconds, self.autoscaler.config['forecast_quantile'])
+        return self.autoscaler.evaluate(self.snapshot, peak)
+    
+    def setup_background_tasks(self):
+        def traffic_simulator():
+            while True:
+                base_traffic = 100
+                hour = time.localtime().tm_hour
+                
+                if 9 <= hour <= 17:
+                    traffic = random.randint(150, 300)
+                elif 18 <= hour <= 22:
+                    traffic = random.randint(200, 400)
+                else:
+                    traffic = random.randint(50, 150)
+                
+                if random.random() < 0.1:
+                    traffic = random.randint(500, 800)
+                    print("🚨 TRAFFIC SPIKE DETECTED!")
+                
+                with self.instrumentation.tick('traffic_simulator'):
+                    self.record_traffic(traffic)
+                time.sleep(5)
+        
+        def metrics_updater():
+            while True:
+                servers = self.pool.active
+                traffic_per_server = self.snapshot.current_traffic / max(1, len(servers))
+                updates = {}
+                for server_id in servers:
+                    
+                    cpu_usage = min(0.95, (traffic_per_server / 100) * 0.3 + random.uniform(0.1, 0.3))
+                    memory_usage = min(0.95, 0.4 + random.uniform(0.1, 0.3))
+                    response_time = max(0.1, (traffic_per_server / 100) * 0.2 + random.uniform(0.1, 0.4))
+                    error_rate = max(0.0, (traffic_per_server / 500) * 0.1 + random.uniform(0.0, 0.05))
+                    
+                    updates[server_id] = {
+                        'cpu_usage': cpu_usage,
+                        'memory_usage': memory_usage,
+                        'request_rate': traffic_per_server
+                    }
+                    # Measured latency and error rate from the health checker take precedence
+                    if self.health_checker is None:
+                        updates[server_id]['response_time'] = response_time
+                        updates[server_id]['error_rate'] = error_rate
+                
+                # All servers change together, so no reader sees a half-updated fleet;
+                # a server removed meanwhile is not added back
+                with self.instrumentation.tick('metrics_updater'):
+                    self.health_monitor.bulk_update_server_metrics(updates, add_new=False)
+                    self.publish_snapshot()
+                time.sleep(10)
+        
+        def predictor_display():
+            while True:
+                snapshot = self.snapshot
+                
+                print(f"\n📊 Current Traffic: {snapshot.current_traffic:.0f} req/s")
+                print(f"🔮 Predicted Traffic: {snapshot.predicted_traffic:.0f} req/s")
+                print(f"🚨 Spike Detected: {snapshot.traffic_spike}")
+                
+                for server_id, state in snapshot.servers.items():
+                    status = "❌ OVERLOADED" if state.overloaded else "✅ HEALTHY"
+                    print(f"   {server_id}: Health={state.health_score:.1f}% Risk={state.risk_level.upper()} {status}")
+                
+                time.sleep(30)
+        
+        def history_maintenance():
+            history_config = self.config.get('history_store', {})
+            flush_interval = history_config.get('flush_interval', 60)
+            compact_interval = history_config.get('compact_interval', 3600)
+            last_compaction = time.monotonic()
+            while True:
+                time.sleep(flush_interval)
+                try:
+                    with self.instrumentation.tick('history_flush'):
+                        self.history_store.flush()
+                except Exception:
+                    logger.exception("History flush failed")
+                if time.monotonic() - last_compaction >= compact_interval:
+                    # A failed compaction is retried at the next compact_interval, not every flush
+                    last_compaction = time.monotonic()
+                    try:
+                        with self.instrumentation.tick('history_compaction'):
+                            dropped = self.history_store.compact()
+                    except Exception:
+                        logger.exception("History compaction failed")
+                        continue
+                    print(f"🗜️ History compaction dropped {dropped} expired records")
+        
+        def autoscaler_loop():
+            interval = self.autoscaler.config['evaluate_interval']
+            while True:
+                time.sleep(interval)
+                try:
+                    with self.instrumentation.tick('autoscaler'):
+                        plan = self.plan_capacity()
+                except Exception:
+                    logger.exception("Autoscale evaluation failed")
+                    continue
+                if plan.action != 'hold':
+                    print(f"📐 Autoscale {plan.action}: {plan.current_servers} -> {plan.desired_servers} "
+                          f"servers for {plan.forecast_peak:.0f} req/s in {plan.horizon_seconds / 60:.0f} min")
+        
+        def breaker_sweeper():
+            while True:
+                time.sleep(self.breakers.config['sweep_interval'])
+                try:
+                    with self.instrumentation.tick('breaker_sweep'):
+                        ejected = self.breakers.sweep()
+                except Exception:
+                    logger.exception("Circuit breaker sweep failed")
+                    continue
+                if ejected:
+                    print(f"⚡ Ejected outliers: {', '.join(sorted(ejected))}")
+        
+        def traffic_series_ticker():
+            while True:
+                time.sleep(self.traffic_series.config['tick_interval'])
+                try:
+                    with self.instrumentation.tick('traffic_series'):
+                        self.tick_traffic_series()
+                except Exception:
+                    logger.exception("Traffic series tick failed")
+        
+        def drain_reaper():
+            while True:
+                time.sleep(self.membership_config.get('reap_interval', 1.0))
+                try:
+                    with self.instrumentation.tick('drain_reaper'):
+                        self.reap_drained()
+                except Exception:
+                    logger.exception("Reaping drained servers failed")
+        
+        check_config = self.config.get('health_check', {})
+        if check_config.get('enabled'):
+            self.health_checker = HealthChecker(
+                self.health_monitor,
+                self.health_check_targets(),
+                mode=check_config.get('mode', 'http'),
+                path=check_config.get('path', '/health'),
+                interval=check_config.get('interval', 10.0),
+                timeout=check_config.get('timeout', 2.0),
+                jitter=check_config.get('jitter', 0.5),
+                concurrency=check_config.get('concurrency', 256),
+                window=check_config.get('window', 10),
+                on_round=self.publish_snapshot,
+                instrumentation=self.instrumentation
+            )
+            self.health_checker.start_in_thread()
+        
+        threading.Thread(target=traffic_simulator, daemon=True).start()
+        threading.Thread(target=metrics_updater, daemon=True).start() 
+        threading.Thread(target=predictor_display, daemon=True).start()
+        threading.Thread(target=drain_reaper, daemon=True).start()
+        if self.membership_config.get('watch_file'):
+            ServerListWatcher(
+                self.membership_config['watch_file'], self.sync_servers,
+                self.membership_config.get('watch_interval', 2.0)
+            ).start_in_thread()
+        if self.history_store and self.history_store.writable:
+            threading.Thread(target=history_maintenance, daemon=True).start()
+        if self.autoscaler:
+            threading.Thread(target=autoscaler_loop, daemon=True).start()
+        if self.breakers:
+            threading.Thread(target=breaker_sweeper, daemon=True).start()
+        if self.traffic_series is not None:
+            threading.Thread(target=traffic_series_ticker, daemon=True).start()
+    
+    def strategy_for(self, path):
+        """Name of the strategy configured for a request path"""
+        return self.router.strategy_for(path)
+    
+    def choose_server(self, path='/', strategy=None, key=None):
+        """Pick a server for a request; returns (server_id, strategy_name)"""
+        return self.router.choose(self.snapshot, path, strategy, key)
+    
+    def get_best_server(self):
+        return self.choose_server()[0]
+
+    def get_dashboard_data(self):
+        """Get all data needed for the dashboard"""
+        return self.snapshot.to_dashboard_data()
@@ -0,0 +1,533 @@
+import asyncio
+import json
+import logging
+import time
+import weakref
+from collections import deque
+
+from consistent_hash import DEFAULT_KEY_HEADER
+from predictive_balancer import PredictiveLoadBalancer
+from server_pool import parse_address
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Hop-by-hop headers are consumed by the proxy and never forwarded.
+# Transfer-Encoding is kept because chunked bodies are relayed verbatim
+# (except to HTTP/1.0 clients, which get the body de-chunked).
+HOP_BY_HOP_HEADERS = {
+    b'connection', b'keep-alive', b'proxy-connection', b'proxy-authenticate',
+    b'proxy-authorization', b'te', b'trailer', b'upgrade', b'expect'
+}
+
+REASONS = {
+    400: b'Bad Request',
+    431: b'Request Header Fields Too Large',
+    502: b'Bad Gateway',
+    503: b'Service Unavailable',
+    504: b'Gateway Timeout'
+}
+
+
+def parse_head(data):
+    """Parse a request/response head into its start line and header list"""
+    lines = data[:-4].split(b'\r\n')
+    headers = []
+    for line in lines[1:]:
+        name, sep, value = line.partition(b':')
+        if not sep:
+            raise ValueError(f'Malformed header line: {line!r}')
+        headers.append((name.strip(), value.strip()))
+    return lines[0], headers
+
+
+def get_header(headers, name):
+    """Return the last value of a header (case-insensitive), or None"""
+    value = None
+    for header_name, header_value in headers:
+        if header_name.lower() == name:
+            value = header_value
+    return value
+
+
+def header_list(headers, name):
+    """All comma-separated items of a header across its repeated lines, lower-cased"""
+    items = []
+    for header_name, header_value in headers:
+        if header_name.lower() == name:
+            items.extend(item.strip().lower() for item in header_value.split(b','))
+    return items
+
+
+def connection_tokens(headers):
+    value = get_header(headers, b'connection') or b''
+    return {token.strip().lower() for token in value.split(b',')}
+
+
+def body_framing(headers):
+    """Work out how a message body is delimited: chunked, by length, or not at all.
+
+    Raises ValueError for framing a peer could read differently from us
+    (RFC 7230 3.3.3): a transfer coding other than a final chunked, or
+    Content-Length values that are repeated with different values or are
+    not plain non-negative integers.
+    """
+    codings = header_list(headers, b'transfer-encoding')
+    if codings:
+        if codings[-1] != b'chunked':
+            raise ValueError(f'Unsupported Transfer-Encoding: {codings!r}')
+        # Transfer-Encoding wins over any Content-Length, which filter_headers drops
+        return 'chunked', None
+    lengths = set(header_list(headers, b'content-length'))
+    if not lengths:
+        return None, None
+    if len(lengths) > 1:
+        raise ValueError(f'Conflicting Content-Length values: {sorted(lengths)!r}')
+    length = lengths.pop()
+    if not (length.isascii() and length.isdigit()):
+        raise ValueError(f'Invalid Content-Length: {length!r}')
+    return 'length', int(length)
+
+
+def filter_headers(headers, framing=None):
+    """Drop hop-by-hop headers, including any named in the Connection header.
+
+    Content-Length is dropped too for a `framing` of 'chunked', so the next
+    hop cannot frame the body by it instead.
+    """
+    dropped = HOP_BY_HOP_HEADERS | connection_tokens(headers)
+    if framing == 'chunked':
+        dropped = dropped | {b'content-length'}
+    return [(name, value) for name, value in headers if name.lower() not in dropped]
+
+
+def build_head(start_line, headers):
+    parts = [start_line]
+    parts.extend(name + b': ' + value for name, value in headers)
+    return b'\r\n'.join(parts) + b'\r\n\r\n'
+
+
+async def copy_length(reader, writer, remaining):
+    """Stream exactly `remaining` bytes without buffering the whole body"""
+    while remaining > 0:
+        chunk = await reader.read(min(remaining, CHUNK_SIZE))
+        if not chunk:
+            raise ConnectionError('Connection closed mid-body')
+        writer.write(chunk)
+        remaining -= len(chunk)
+        await writer.drain()
+
+
+async def copy_chunked(reader, writer):
+    """Relay a chunked body chunk by chunk, including any trailers"""
+    while True:
+        size_line = await reader.readuntil(b'\r\n')
+        writer.write(size_line)
+        size = int(size_line.split(b';', 1)[0].strip(), 16)
+        if size == 0:
+            while True:
+                line = await reader.readuntil(b'\r\n')
+                writer.write(line)
+                if line == b'\r\n':
+                    break
+            await writer.drain()
+            return
+        # Chunk data plus its trailing CRLF
+        await copy_length(reader, writer, size + 2)
+
+
+async def copy_dechunked(reader, writer):
+    """Relay only the data of a chunked body, for clients that do not understand chunked framing"""
+    while True:
+        size_line = await reader.readuntil(b'\r\n')
+        size = int(size_line.split(b';', 1)[0].strip(), 16)
+        if size == 0:
+            # Trailers have no HTTP/1.0 equivalent and are dropped
+            while await reader.readuntil(b'\r\n') != b'\r\n':
+                pass
+            await writer.drain()
+            return
+        await copy_length(reader, writer, size)
+        if await reader.readexactly(2) != b'\r\n':
+            raise ValueError('Chunk data not followed by CRLF')
+
+
+async def copy_until_eof(reader, writer):
+    while True:
+        chunk = await reader.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        writer.write(chunk)
+        await writer.drain()
+
+
+async def copy_body(reader, writer, framing, length):
+    if framing == 'chunked':
+        await copy_chunked(reader, writer)
+    elif framing == 'length':
+        await copy_length(reader, writer, length)
+    elif framing == 'eof':
+        await copy_until_eof(reader, writer)
+
+
+class UpstreamReader:
+    """An upstream connection's StreamReader, recording when a read started waiting.
+
+    ReverseProxy.sweep_reads aborts the connection of a read that has
+    waited too long, which fails it like a closed connection, and sets
+    `timed_out`. Only time waiting on the upstream counts, so a slow
+    client never times out its upstream. Unlike a timer per read, this
+    costs two attribute stores per read.
+    """
+
+    __slots__ = ('reader', 'writer', 'waiting_since', 'timed_out', '__weakref__')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.waiting_since = None
+        self.timed_out = False
+
+    async def _watch(self, read):
+        self.waiting_since = time.monotonic()
+        try:
+            return await read
+        finally:
+            self.waiting_since = None
+
+    def read(self, n=-1):
+        return self._watch(self.reader.read(n))
+
+    def readuntil(self, separator):
+        return self._watch(self.reader.readuntil(separator))
+
+    def readexactly(self, n):
+        return self._watch(self.reader.readexactly(n))
+
+
+class UpstreamPool:
+    """Keep-alive connection pool for a single upstream server"""
+
+    def __init__(self, host, port, max_idle=32, connect_timeout=2.0):
+        self.host = host
+        self.port = port
+        self.max_idle = max_idle
+        self.connect_timeout = connect_timeout
+        self._idle = deque()
+
+    async def acquire(self):
+        """Return (reader, writer, reused), preferring an idle pooled connection"""
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.connect_timeout
+        )
+        return reader, writer, False
+
+    def release(self, reader, writer, reusable):
+        if reusable and len(self._idle) < self.max_idle and not writer.is_closing():
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+
+    def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class ReverseProxy:
+    """HTTP/1.1 reverse proxy that routes each request with the predictive balancer.
+
+    An upstream that sends nothing for `read_timeout` seconds, before or
+    during its response, fails the request (504 if no response was
+    started yet). Timeouts are enforced by a sweep every quarter of
+    `read_timeout`, so one fires up to a quarter late.
+    """
+
+    def __init__(self, balancer, upstreams, max_idle_per_upstream=32,
+                 connect_timeout=2.0, idle_timeout=60.0, key_header=DEFAULT_KEY_HEADER, read_timeout=30.0):
+        self.balancer = balancer
+        # Requests carrying this header are routed sticky by its value
+        self.key_header = key_header.lower().encode('latin-1')
+        series = getattr(balancer, 'traffic_series', None)
+        self.tenant_header = series.config['tenant_header'].lower().encode('latin-1') if series is not None else None
+        self.idle_timeout = idle_timeout
+        self.read_timeout = read_timeout
+        # UpstreamReader of every exchange in progress, checked by sweep_reads
+        self.upstream_reads = weakref.WeakSet()
+        self._sweeper = None
+        self.max_idle_per_upstream = max_idle_per_upstream
+        self.connect_timeout = connect_timeout
+        self.pools = {}
+        self.addresses = {}
+        # Address the balancer last reported per server; only a change to it replaces a pool,
+        # so upstreams passed in explicitly are not overridden by the balancer's config
+        self.member_addresses = {}
+        for server_id, address in upstreams.items():
+            self.add_upstream(server_id, address)
+        balancer.removal_listeners.append(self.remove_upstreams)
+
+    def add_upstream(self, server_id, address):
+        host, port = parse_address(address)
+        self.addresses[server_id] = address
+        self.pools[server_id] = UpstreamPool(host, port, self.max_idle_per_upstream, self.connect_timeout)
+        return self.pools[server_id]
+
+    def remove_upstreams(self, server_ids):
+        """Removal listener: close the pools of servers that left the balancer"""
+        for server_id in server_ids:
+            self.addresses.pop(server_id, None)
+            self.member_addresses.pop(server_id, None)
+            pool = self.pools.pop(server_id, None)
+            if pool is not None:
+                pool.close()
+
+    def pool_for(self, server_id):
+        """Connection pool for a server, created on first use for servers added at runtime"""
+        pool = self.pools.get(server_id)
+        address = self.balancer.pool.address(server_id)
+        if address and (pool is None or address != self.member_addresses.setdefault(server_id, address)):
+            if pool is not None:
+                pool.close()
+            pool = self.add_upstream(server_id, address)
+            self.member_addresses[server_id] = address
+        return pool
+
+    async def start(self, host, port):
+        if self._sweeper is None:
+            self._sweeper = asyncio.ensure_future(self.sweep_reads())
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    async def sweep_reads(self):
+        """Abort upstream connections whose current read has waited longer than read_timeout"""
+        while True:
+            await asyncio.sleep(self.read_timeout / 4)
+            cutoff = time.monotonic() - self.read_timeout
+            for upstream in list(self.upstream_reads):
+                if upstream.waiting_since is not None and upstream.waiting_since < cutoff:
+                    upstream.timed_out = True
+                    upstream.writer.transport.abort()
+
+    async def serve_forever(self, host, port):
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        for pool in self.pools.values():
+            pool.close()
+
+    async def handle_client(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        client_ip = peer[0].encode() if peer else b'unknown'
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.idle_timeout)
+                except asyncio.LimitOverrunError:
+                    await self.send_error(writer, 431)
+                    return
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+
+                try:
+                    request_line, headers = parse_head(head)
+                    method, target, version = request_line.split(b' ', 2)
+                    request_framing, request_length = body_framing(headers)
+                except ValueError:
+                    await self.send_error(writer, 400)
+                    return
+
+                if version == b'HTTP/1.1':
+                    keep_alive = b'close' not in connection_tokens(headers)
+                else:
+                    keep_alive = b'keep-alive' in connection_tokens(headers)
+
+                if self.tenant_header:
+                    tenant = get_header(headers, self.tenant_header)
+                    self.balancer.record_request(
+                        target.decode('latin-1'), tenant.decode('latin-1') if tenant else None
+                    )
+                key = get_header(headers, self.key_header)
+                server_id, _ = self.balancer.choose_server(
+                    target.decode('latin-1'), key=key.decode('latin-1') if key else None
+                )
+                # Taken at routing time, so an outcome landing after the breaker changed state is ignored
+                epoch = self.balancer.breaker_epoch(server_id)
+                try:
+                    pool = self.pool_for(server_id)
+                except ValueError as e:
+                    logger.error("No usable upstream for %s: %s", server_id, e)
+                    await self.send_error(writer, 502)
+                    return
+                if pool is None:
+                    # The body (if any) is still unread, so the connection cannot be reused
+                    await self.send_error(writer, 503)
+                    return
+
+                expect = get_header(headers, b'expect')
+                if expect and expect.lower() == b'100-continue':
+                    writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+
+                upstream_headers = filter_headers(headers, request_framing)
+                upstream_headers.append((b'X-Forwarded-For', client_ip))
+                upstream_headers.append((b'Connection', b'keep-alive'))
+                upstream_head = build_head(method + b' ' + target + b' HTTP/1.1', upstream_headers)
+
+                self.balancer.in_flight.start(server_id)
+                try:
+                    forwarded = await self.forward(
+                        reader, writer, pool, server_id, method, upstream_head,
+                        request_framing, request_length, keep_alive, epoch, version == b'HTTP/1.1'
+                    )
+                finally:
+                    self.balancer.in_flight.finish(server_id)
+                if not forwarded or not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def forward(self, reader, writer, pool, server_id, method, upstream_head,
+                      request_framing, request_length, keep_alive, epoch=None, client_chunked=True):
+        """Forward one request to `pool` and stream the response back; False closes the client.
+
+        The outcome (5xx or a failed exchange counts as a failure) and the
+        time to the response head are reported to the balancer's circuit
+        breakers, tagged with the breaker `epoch` the request was routed in.
+        Without `client_chunked` (HTTP/1.0 clients), a chunked response is
+        de-chunked and delimited by closing the connection.
+        """
+        started = time.perf_counter()
+        for attempt in range(2):
+            try:
+                raw_reader, up_writer, reused = await pool.acquire()
+            except (OSError, asyncio.TimeoutError):
+                self.balancer.record_outcome(server_id, False, time.perf_counter() - started, epoch)
+                await self.send_error(writer, 502)
+                return False
+            up_reader = UpstreamReader(raw_reader, up_writer)
+            self.upstream_reads.add(up_reader)
+
+            try:
+                up_writer.write(upstream_head)
+                await copy_body(reader, up_writer, request_framing, request_length)
+                await up_writer.drain()
+
+                response_head = await up_reader.readuntil(b'\r\n\r\n')
+                # Interim 1xx responses are not relayed; the client already got its 100 Continue
+                while response_head[9:10] == b'1':
+                    response_head = await up_reader.readuntil(b'\r\n\r\n')
+                break
+            except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                up_writer.close()
+                if up_reader.timed_out:
+                    self.balancer.record_outcome(server_id, False, time.perf_counter() - started, epoch)
+                    await self.send_error(writer, 504)
+                    return False
+                # A pooled connection may have been closed by the upstream while idle;
+                # retry once on a fresh connection when there is no body to replay.
+                if reused and request_framing is None and attempt == 0:
+                    continue
+                self.balancer.record_outcome(server_id, False, time.perf_counter() - started, epoch)
+                await self.send_error(writer, 502)
+                return False
+
+        try:
+            status_line, response_headers = parse_head(response_head)
+            status = int(status_line.split(b' ', 2)[1])
+            if method == b'HEAD' or status in (204, 304):
+                response_framing, response_length = None, None
+            else:
+                response_framing, response_length = body_framing(response_headers)
+                if response_framing is None:
+                    response_framing = 'eof'
+        except (ValueError, IndexError):
+            up_writer.close()
+            self.balancer.record_outcome(server_id, False, time.perf_counter() - started, epoch)
+            await self.send_error(writer, 502)
+            return False
+        self.balancer.record_outcome(server_id, status < 500, time.perf_counter() - started, epoch)
+
+        upstream_reusable = (
+            status_line.startswith(b'HTTP/1.1')
+            and b'close' not in connection_tokens(response_headers)
+            and response_framing != 'eof'
+        )
+        dechunk = response_framing == 'chunked' and not client_chunked
+        # A body delimited by connection close can only be relayed the same way
+        client_keep_alive = keep_alive and response_framing != 'eof' and not dechunk
+
+        client_headers = filter_headers(response_headers, response_framing)
+        if dechunk:
+            client_headers = [(name, value) for name, value in client_headers if name.lower() != b'transfer-encoding']
+        client_headers.append((b'X-Served-By', server_id.encode()))
+        client_headers.append((b'Connection', b'keep-alive' if client_keep_alive else b'close'))
+
+        try:
+            writer.write(build_head(status_line, client_headers))
+            if dechunk:
+                await copy_dechunked(up_reader, writer)
+            else:
+                await copy_body(up_reader, writer, response_framing, response_length)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            up_writer.close()
+            return False
+
+        pool.release(raw_reader, up_writer, upstream_reusable)
+        return client_keep_alive
+
+    async def send_error(self, writer, status):
+        reason = REASONS.get(status, b'Error')
+        body = reason + b'\n'
+        writer.write(
+            b'HTTP/1.1 ' + str(status).encode() + b' ' + reason + b'\r\n'
+            b'Content-Type: text/plain\r\n'
+            b'Content-Length: ' + str(len(body)).encode() + b'\r\n'
+            b'Connection: close\r\n\r\n' + body
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+def main():
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    proxy_config = config.get('proxy', {})
+    host = proxy_config.get('host', '0.0.0.0')
+    port = proxy_config.get('port', 8080)
+
+    balancer = PredictiveLoadBalancer()
+    proxy = ReverseProxy(
+        balancer,
+        config['upstreams'],
+        max_idle_per_upstream=proxy_config.get('max_idle_per_upstream', 32),
+        connect_timeout=proxy_config.get('connect_timeout', 2.0),
+        idle_timeout=proxy_config.get('idle_timeout', 60.0),
+        read_timeout=proxy_config.get('read_timeout', 30.0),
+        key_header=config.get('routing', {}).get('consistent_hash', {}).get('key_header', DEFAULT_KEY_HEADER)
+    )
+
+    print(f"🔁 Reverse proxy listening on http://{host}:{port}")
+    print("🛑 Press Ctrl+C to stop the proxy")
+    try:
+        asyncio.run(proxy.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.close()
+
+
+if __name__ == '__main__':
+    main()
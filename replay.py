@@ -0,0 +1,265 @@
+"""Replay a recorded request log through the predictor and the routing strategies.
+
+The log is newline-delimited JSON (optionally gzip-compressed), one request
+per line, read lazily so memory stays constant whatever the file size:
+
+    {"timestamp": 1700000000.25, "path": "/api/items", "latency": 0.084, "status": 200}
+
+`timestamp` (also `ts` or `time`) is epoch seconds or ISO 8601 and is the
+only required field; `path` (or `url`), `latency` (or `response_time`,
+seconds) and `status` are used when present. Requests are bucketed into
+`--interval` second ticks: each tick feeds the observed rate to the
+predictor, scores the previous forecast against it and rebuilds the routing
+snapshot from the load each server received. Servers are modelled with a
+fixed `--capacity` in req/s, which drives cpu_usage and therefore the
+configured overload thresholds.
+
+A line stamped more than `--max-gap` seconds past the current tick (say,
+epoch milliseconds among epoch seconds) is skipped as an outlier, unless
+RESYNC_RECORDS lines in a row are: then the log really did jump, and the
+replay follows it without filling the gap tick by tick.
+
+    python replay.py access.jsonl.gz --speed 100
+"""
+import argparse
+import gzip
+import heapq
+import json
+import math
+import time
+from collections import Counter
+from datetime import datetime
+
+from routing_strategies import Router
+from server_health import ServerHealthMonitor
+from simple_predictor import SimpleTrafficPredictor
+from snapshot import BalancerSnapshot
+
+TIMESTAMP_FIELDS = ('timestamp', 'ts', 'time')
+# Consecutive lines past --max-gap that are taken as a real jump in the log
+RESYNC_RECORDS = 10
+
+
+def parse_timestamp(value):
+    """Epoch seconds from a number or an ISO 8601 string"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
+def iter_log(path, skipped):
+    """Yield (timestamp, path, latency, status) per request; bad lines are counted in `skipped`"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                raw_ts = next(record[name] for name in TIMESTAMP_FIELDS if name in record)
+                timestamp = parse_timestamp(raw_ts)
+                latency = record.get('latency', record.get('response_time'))
+                yield (
+                    timestamp,
+                    record.get('path') or record.get('url') or '/',
+                    float(latency) if latency is not None else None,
+                    record.get('status')
+                )
+            except (ValueError, TypeError, AttributeError, StopIteration):
+                skipped[0] += 1
+
+
+class ReplayStats:
+    """Running totals for one replay; nothing grows with the number of requests"""
+
+    def __init__(self):
+        self.requests = 0
+        self.routes = Counter()
+        self.strategies = Counter()
+        self.ticks = 0
+        self.outliers = 0  # lines skipped for a timestamp far past the current tick
+        self.overload_events = 0
+        self.overloads_by_server = Counter()
+        self.first_overloads = []  # (tick timestamp, server id), first few only
+        self.forecasts = 0
+        self.abs_error = 0.0
+        self.sq_error = 0.0
+        self.pct_error = 0.0
+
+    def add_forecast(self, predicted, actual):
+        error = predicted - actual
+        self.forecasts += 1
+        self.abs_error += abs(error)
+        self.sq_error += error * error
+        self.pct_error += abs(error) / max(actual, 1.0)
+
+    def report(self, elapsed, skipped):
+        print(f"\n📼 Replayed {self.requests} requests in {self.ticks} ticks "
+              f"({elapsed:.1f}s wall, {self.requests / max(elapsed, 1e-9):.0f} req/s)")
+        if skipped:
+            print(f"⚠️ Skipped {skipped} malformed lines")
+        if self.outliers:
+            print(f"⚠️ Skipped {self.outliers} lines with outlying timestamps")
+
+        print("\n🔀 Route distribution:")
+        for server_id, count in sorted(self.routes.items()):
+            print(f"   {server_id}: {count} ({count / max(self.requests, 1):.1%})")
+        for name, count in self.strategies.most_common():
+            print(f"   via {name}: {count}")
+
+        print(f"\n🚨 Overload events: {self.overload_events} server-ticks")
+        for server_id, count in self.overloads_by_server.most_common():
+            print(f"   {server_id}: {count}")
+        for timestamp, server_id in self.first_overloads:
+            print(f"   first: {datetime.fromtimestamp(timestamp):%Y-%m-%d %H:%M:%S} {server_id}")
+
+        if self.forecasts:
+            print(f"\n🔮 Forecast error over {self.forecasts} ticks: "
+                  f"MAE={self.abs_error / self.forecasts:.2f} req/s  "
+                  f"RMSE={math.sqrt(self.sq_error / self.forecasts):.2f} req/s  "
+                  f"MAPE={self.pct_error / self.forecasts:.1%}")
+
+
+class LogReplayer:
+    """Drives a predictor, a health monitor and the routing strategies from a request stream"""
+
+    def __init__(self, config, interval=5.0, capacity=100.0, max_gap=3600.0):
+        self.interval = interval
+        self.capacity = capacity
+        self.max_gap = max_gap
+        self.server_ids = config['servers']
+        self.predictor = SimpleTrafficPredictor(config.get('max_history', 100), config.get('forecasting'))
+        self.health_monitor = ServerHealthMonitor(config)
+        self.health_monitor.bulk_update_server_metrics({server_id: {} for server_id in self.server_ids})
+        self.router = Router(config.get('routing', {}), self.server_ids)
+        self.stats = ReplayStats()
+        self.version = 0
+        self.snapshot = self.build_snapshot(0.0)
+        self.pending = []  # heap of (finish timestamp, server id) for in-flight requests
+        self.reset_tick()
+
+    def reset_tick(self):
+        self.tick_requests = 0
+        self.tick_routes = Counter()
+        self.tick_latency = Counter()
+        self.tick_errors = Counter()
+
+    def build_snapshot(self, current_traffic, sample=None):
+        self.version += 1
+        return BalancerSnapshot.build(
+            self.version, current_traffic, self.predictor, self.health_monitor, sample=sample
+        )
+
+    def close_tick(self, tick_start):
+        """Feed the finished tick to the predictor and server metrics, then publish a new snapshot"""
+        rate = self.tick_requests / self.interval
+        if self.predictor.forecaster.ready:
+            self.stats.add_forecast(self.snapshot.predicted_traffic, rate)
+        self.predictor.add_traffic_data(rate, tick_start)
+
+        updates = {}
+        for server_id in self.server_ids:
+            routed = self.tick_routes[server_id]
+            metrics = {
+                'request_rate': routed / self.interval,
+                'cpu_usage': min(1.0, routed / self.interval / self.capacity)
+            }
+            if routed and server_id in self.tick_latency:
+                metrics['response_time'] = self.tick_latency[server_id] / routed
+                metrics['error_rate'] = self.tick_errors[server_id] / routed
+            updates[server_id] = metrics
+        self.health_monitor.bulk_update_server_metrics(updates)
+        self.snapshot = self.build_snapshot(rate, self.predictor.traffic_history.appended)
+
+        fleet = self.snapshot.fleet
+        for server_id in fleet.ids[fleet.overloaded]:
+            self.stats.overload_events += 1
+            self.stats.overloads_by_server[server_id] += 1
+            if len(self.stats.first_overloads) < 5:
+                self.stats.first_overloads.append((tick_start, server_id))
+        self.stats.ticks += 1
+        self.reset_tick()
+
+    def route(self, timestamp, path, latency, status):
+        while self.pending and self.pending[0][0] <= timestamp:
+            self.router.in_flight.finish(heapq.heappop(self.pending)[1])
+
+        server_id, strategy = self.router.choose(self.snapshot, path)
+        self.stats.requests += 1
+        self.stats.routes[server_id] += 1
+        self.stats.strategies[strategy] += 1
+        self.tick_requests += 1
+        self.tick_routes[server_id] += 1
+        if latency is not None:
+            self.router.in_flight.start(server_id)
+            heapq.heappush(self.pending, (timestamp + latency, server_id))
+            self.tick_latency[server_id] += latency
+            if isinstance(status, int) and status >= 500:
+                self.tick_errors[server_id] += 1
+
+    def run(self, records, speed=0.0, progress_every=0):
+        """Replay `records`; speed 1 is real time, 100 is 100x, 0 is as fast as possible"""
+        wall_start = time.perf_counter()
+        log_start = None
+        tick_start = None
+        last_timestamp = None
+        outliers = []  # consecutive lines past max_gap, kept until it is clear whether the log jumped
+        for timestamp, path, latency, status in records:
+            if log_start is None:
+                log_start = timestamp
+                tick_start = math.floor(timestamp / self.interval) * self.interval
+            if timestamp >= tick_start + self.interval + self.max_gap:
+                outliers.append(timestamp)
+                if len(outliers) < RESYNC_RECORDS:
+                    continue
+                # The log jumped: close the current tick and carry on from the new time
+                if self.tick_requests:
+                    self.close_tick(tick_start)
+                self.stats.outliers += len(outliers) - 1
+                # Playback pacing skips the gap too
+                log_start += timestamp - last_timestamp
+                tick_start = math.floor(timestamp / self.interval) * self.interval
+            elif outliers:
+                self.stats.outliers += len(outliers)
+            outliers = []
+            last_timestamp = timestamp
+            # Slightly out-of-order lines are counted in the current tick
+            while timestamp >= tick_start + self.interval:
+                self.close_tick(tick_start)
+                tick_start += self.interval
+                if progress_every and self.stats.ticks % progress_every == 0:
+                    print(f"⏩ {datetime.fromtimestamp(tick_start):%Y-%m-%d %H:%M:%S} "
+                          f"{self.stats.requests} requests, traffic {self.snapshot.current_traffic:.0f} req/s, "
+                          f"forecast {self.snapshot.predicted_traffic:.0f} req/s")
+            if speed:
+                delay = (timestamp - log_start) / speed - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            self.route(timestamp, path, latency, status)
+        self.stats.outliers += len(outliers)
+        if tick_start is not None and self.tick_requests:
+            self.close_tick(tick_start)
+        return time.perf_counter() - wall_start
+
+
+def main():
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('log', help='JSON lines request log (.gz supported)')
+    parser.add_argument('--speed', type=float, default=100.0,
+                        help='playback speed: 1 = real time, 100 = 100x, 0 = as fast as possible')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds of log time per tick')
+    parser.add_argument('--capacity', type=float, default=100.0, help='req/s one server handles at 100%% cpu')
+    parser.add_argument('--max-gap', type=float, default=3600.0,
+                        help='seconds past the current tick beyond which a line is an outlier')
+    parser.add_argument('--progress-every', type=int, default=0, help='print a line every N ticks')
+    args = parser.parse_args()
+
+    replayer = LogReplayer(config, args.interval, args.capacity, args.max_gap)
+    skipped = [0]
+    elapsed = replayer.run(iter_log(args.log, skipped), args.speed, args.progress_every)
+    replayer.stats.report(elapsed, skipped[0])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import numpy as np
+
+
+class TrafficRingBuffer:
+    """Fixed-capacity ring buffer of (timestamp, value) samples backed by NumPy arrays.
+
+    Appends are O(1) and never reallocate. A third column stores the running
+    total *before* each sample, so the sum or mean of any trailing window is
+    a single subtraction instead of a slice-and-sum.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self._total_before = np.zeros(capacity, dtype=np.float64)
+        self._total = 0.0
+        self._count = 0  # samples ever appended
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def appended(self):
+        """Samples ever appended, including those since overwritten"""
+        return self._count
+
+    def append(self, timestamp, value):
+        """Add a sample, overwriting the oldest one once the buffer is full"""
+        pos = self._count % self.capacity
+        self.timestamps[pos] = timestamp
+        self.values[pos] = value
+        self._total_before[pos] = self._total
+        self._total += value
+        self._count += 1
+
+    def clear(self):
+        self._total = 0.0
+        self._count = 0
+
+    def latest(self):
+        """Return the most recent (timestamp, value), or None if empty"""
+        if not self._count:
+            return None
+        pos = (self._count - 1) % self.capacity
+        return float(self.timestamps[pos]), float(self.values[pos])
+
+    def window_sum(self, size):
+        """Sum of the last `size` values in O(1)"""
+        size = min(size, len(self))
+        if size <= 0:
+            return 0.0
+        first = (self._count - size) % self.capacity
+        return self._total - float(self._total_before[first])
+
+    def window_mean(self, size):
+        """Mean of the last `size` values in O(1)"""
+        size = min(size, len(self))
+        if size <= 0:
+            return 0.0
+        return self.window_sum(size) / size
+
+    def _ordered(self, column, size):
+        size = min(size, len(self)) if size is not None else len(self)
+        end = self._count % self.capacity
+        start = end - size
+        if start >= 0:
+            return column[start:end]  # contiguous: a view, no copy
+        return np.concatenate((column[start:], column[:end]))
+
+    def last_values(self, size=None):
+        """Last `size` values (all if None) in chronological order"""
+        return self._ordered(self.values, size)
+
+    def last_timestamps(self, size=None):
+        """Last `size` timestamps (all if None) in chronological order"""
+        return self._ordered(self.timestamps, size)
@@ -0,0 +1,303 @@
+import itertools
+import math
+import random
+import secrets
+import threading
+import time
+
+from consistent_hash import HashRing
+
+
+class InFlightCounters:
+    """Per-server count of requests that have been routed but not yet completed.
+
+    Each server has a pair of `itertools.count` objects. `next()` on them is
+    atomic under the GIL, so routing threads never take a lock; the last
+    values handed out are cached for reads. A read racing with a concurrent
+    start/finish may be off by the number of in-progress updates, which only
+    makes a routing decision marginally stale and corrects itself on the next
+    update.
+    """
+
+    def __init__(self, server_ids=()):
+        self._started = {}
+        self._finished = {}
+        self._started_value = {}
+        self._finished_value = {}
+        # Fleet-wide totals, for strategies that compare a server with the mean
+        self._total_started = itertools.count(1)
+        self._total_finished = itertools.count(1)
+        self._total_started_value = 0
+        self._total_finished_value = 0
+        for server_id in server_ids:
+            self.add_server(server_id)
+
+    def add_server(self, server_id):
+        if server_id not in self._started:
+            self._finished[server_id] = itertools.count(1)
+            self._finished_value[server_id] = 0
+            self._started[server_id] = itertools.count(1)
+            self._started_value[server_id] = 0
+
+    def remove_server(self, server_id):
+        """Forget a server's counters; a late `finish` for it is ignored"""
+        for _ in range(self.get(server_id)):
+            self._total_finished_value = next(self._total_finished)
+        for counters in (self._started, self._finished, self._started_value, self._finished_value):
+            counters.pop(server_id, None)
+
+    def start(self, server_id):
+        """Record a request routed to `server_id`"""
+        counter = self._started.get(server_id)
+        if counter is None:
+            self.add_server(server_id)
+            counter = self._started[server_id]
+        self._started_value[server_id] = next(counter)
+        self._total_started_value = next(self._total_started)
+
+    def finish(self, server_id):
+        """Record that a request on `server_id` completed"""
+        counter = self._finished.get(server_id)
+        if counter is not None:
+            self._finished_value[server_id] = next(counter)
+            self._total_finished_value = next(self._total_finished)
+
+    def get(self, server_id):
+        return max(0, self._started_value.get(server_id, 0) - self._finished_value.get(server_id, 0))
+
+    def total(self):
+        """Requests in flight across all servers"""
+        return max(0, self._total_started_value - self._total_finished_value)
+
+    def as_dict(self):
+        return {server_id: self.get(server_id) for server_id in list(self._started)}
+
+
+class RouteLeases:
+    """In-flight accounting for requests routed on behalf of a client (/route).
+
+    `issue` counts the request as in flight and returns a token; the client
+    hands it back to `complete` when the request is done. A token not
+    completed within `ttl` seconds expires and is counted as finished, so
+    a client that never reports back cannot hold a server's count up
+    forever. A lease can carry a `tag` for the caller, such as the
+    circuit breaker epoch the request was routed in. Tokens are issued
+    with the same ttl, so insertion order is expiry order and `expire`
+    only looks at the oldest ones.
+    """
+
+    def __init__(self, in_flight, ttl=60.0):
+        self.in_flight = in_flight
+        self.ttl = ttl
+        self.expired = 0
+        self._leases = {}  # token -> (server_id, issued at, expires at, tag)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._leases)
+
+    def issue(self, server_id, now=None, tag=None):
+        now = time.monotonic() if now is None else now
+        token = secrets.token_urlsafe(12)
+        self.in_flight.start(server_id)
+        with self._lock:
+            self._expire(now)
+            self._leases[token] = (server_id, now, now + self.ttl, tag)
+        return token
+
+    def complete(self, token, now=None):
+        """Finish the request behind `token`; returns (server_id, seconds since issue, tag), or None if unknown"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+            lease = self._leases.pop(token, None)
+        if lease is None:
+            return None
+        server_id, issued, _, tag = lease
+        self.in_flight.finish(server_id)
+        return server_id, now - issued, tag
+
+    def expire(self, now=None):
+        """Finish every lease past its ttl; returns how many expired"""
+        with self._lock:
+            return self._expire(time.monotonic() if now is None else now)
+
+    def _expire(self, now):
+        expired = []
+        for token, (server_id, _, expires, _) in self._leases.items():
+            if expires > now:
+                break
+            expired.append((token, server_id))
+        for token, server_id in expired:
+            del self._leases[token]
+            self.in_flight.finish(server_id)
+        self.expired += len(expired)
+        return len(expired)
+
+
+class RoutingStrategy:
+    """Chooses a server from a published BalancerSnapshot"""
+
+    name = None
+
+    def choose(self, snapshot, in_flight, key=None):
+        raise NotImplementedError
+
+
+class PredictiveStrategy(RoutingStrategy):
+    """Health-weighted pick among servers that are neither overloaded nor high-risk"""
+
+    name = 'predictive_load_balancing'
+
+    def choose(self, snapshot, in_flight, key=None):
+        if not snapshot.routable_servers:
+            return snapshot.fallback_server
+        return snapshot.selector.pick()
+
+
+class LeastOutstandingStrategy(RoutingStrategy):
+    """Routable server with the fewest in-flight requests (O(n) scan)"""
+
+    name = 'least_outstanding_requests'
+
+    def choose(self, snapshot, in_flight, key=None):
+        candidates = snapshot.routable_servers or snapshot.serving_servers
+        if not candidates:
+            return None
+        # Start the scan at a random offset so ties don't all land on the first server
+        offset = random.randrange(len(candidates))
+        best, best_load = None, None
+        for i in range(len(candidates)):
+            server_id = candidates[(offset + i) % len(candidates)]
+            load = in_flight.get(server_id)
+            if best_load is None or load < best_load:
+                best, best_load = server_id, load
+                if load == 0:
+                    break
+        return best
+
+
+class PowerOfTwoStrategy(RoutingStrategy):
+    """Sample two servers by health weight and keep the less loaded one (O(1))"""
+
+    name = 'power_of_two_choices'
+
+    def choose(self, snapshot, in_flight, key=None):
+        if not snapshot.routable_servers:
+            return snapshot.fallback_server
+        first = snapshot.selector.pick()
+        second = snapshot.selector.pick()
+        if in_flight.get(second) < in_flight.get(first):
+            return second
+        return first
+
+
+class ConsistentHashStrategy(PredictiveStrategy):
+    """Sticky routing: a key keeps going to the same server while that server can take it.
+
+    Keys are placed on a consistent-hash ring of the fleet. A server that is
+    overloaded, high-risk or draining is skipped, as is one already holding
+    more than `load_factor` times the mean in-flight count (consistent
+    hashing with bounded loads), so hot keys spill to the next server
+    clockwise instead of piling up. Health changes never touch the ring.
+    A ring is never changed once requests use it: a membership change
+    derives a new one, hashing only the servers that changed, and swaps it
+    in, so concurrent requests each look up a complete ring of their own
+    snapshot's fleet. Requests without a key are routed like the
+    predictive strategy.
+    """
+
+    name = 'consistent_hashing'
+
+    def __init__(self, vnodes=160, load_factor=1.25):
+        self.load_factor = load_factor
+        # (snapshot version, server_ids, ring) of the newest snapshot routed so far
+        self._ring = (-1, (), HashRing(vnodes))
+
+    def ring_for(self, snapshot):
+        """Ring holding exactly the snapshot's fleet"""
+        version, server_ids, ring = self._ring
+        # Metrics-only updates keep the same server_ids tuple, so this is usually an identity check
+        if snapshot.fleet.server_ids is server_ids or snapshot.fleet.server_ids == server_ids:
+            return ring
+        ring = ring.synced(snapshot.fleet.server_ids)
+        # A request still holding an older snapshot must not replace a newer ring
+        if snapshot.version >= version:
+            self._ring = (snapshot.version, snapshot.fleet.server_ids, ring)
+        return ring
+
+    def choose(self, snapshot, in_flight, key=None):
+        if key is None or not snapshot.routable_servers:
+            return super().choose(snapshot, in_flight)
+        ring = self.ring_for(snapshot)
+        routable = snapshot.routable_set
+        # Capacities add up to more than the in-flight total, so some server always qualifies
+        limit = math.ceil(self.load_factor * (in_flight.total() + 1) / len(routable))
+        server_id = ring.lookup(key, lambda s: s in routable and in_flight.get(s) < limit)
+        return server_id or snapshot.fallback_server
+
+
+STRATEGIES = {
+    cls.name: cls
+    for cls in (PredictiveStrategy, LeastOutstandingStrategy, PowerOfTwoStrategy, ConsistentHashStrategy)
+}
+
+
+class Router:
+    """Per-endpoint strategy selection and in-flight accounting over published snapshots"""
+
+    def __init__(self, routing_config, server_ids, instrumentation=None, breakers=None):
+        self.strategies = {name: cls() for name, cls in STRATEGIES.items()}
+        hash_config = routing_config.get('consistent_hash', {})
+        self.strategies[ConsistentHashStrategy.name] = ConsistentHashStrategy(
+            hash_config.get('vnodes', 160), hash_config.get('load_factor', 1.25)
+        )
+        self.default_strategy = routing_config.get('default_strategy', 'predictive_load_balancing')
+        # Longest path prefix wins when picking a per-endpoint strategy
+        self.endpoint_strategies = sorted(
+            routing_config.get('endpoints', {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        for name in [self.default_strategy] + [name for _, name in self.endpoint_strategies]:
+            if name not in self.strategies:
+                raise ValueError(f"Unknown routing strategy '{name}'")
+        self.in_flight = InFlightCounters(server_ids)
+        # Routes handed out to clients, finished by their token or after route_ttl seconds
+        self.leases = RouteLeases(self.in_flight, routing_config.get('route_ttl', 60.0))
+        # metrics_export.Instrumentation: decision latency and per-server route counts
+        self.instrumentation = instrumentation
+        # circuit_breaker.BreakerBoard: half-open servers get their trial requests from here
+        self.breakers = breakers
+
+    def strategy_for(self, path):
+        """Name of the strategy configured for a request path"""
+        for prefix, name in self.endpoint_strategies:
+            if path.startswith(prefix):
+                return name
+        return self.default_strategy
+
+    def choose(self, snapshot, path='/', strategy=None, key=None):
+        """Pick a server from `snapshot`; returns (server_id, strategy_name).
+
+        A request carrying a `key` (session, user, cache key) is routed by
+        consistent hashing unless a strategy is named explicitly. While a
+        server's circuit breaker is half-open, unkeyed requests are sent to
+        it as trial requests before the strategy is consulted.
+        """
+        name = strategy or (ConsistentHashStrategy.name if key is not None else self.strategy_for(path))
+        if name not in self.strategies:
+            raise ValueError(f"Unknown routing strategy '{name}'")
+        if self.instrumentation is None:
+            return self._pick(snapshot, name, key), name
+        start = time.perf_counter()
+        server_id = self._pick(snapshot, name, key)
+        self.instrumentation.route_histogram(name).observe(time.perf_counter() - start)
+        if server_id is not None:
+            self.instrumentation.routes.inc((server_id, name))
+        return server_id, name
+
+    def _pick(self, snapshot, name, key):
+        if self.breakers is not None and self.breakers.half_open and key is None:
+            probe = self.breakers.take_probe()
+            if probe is not None and probe in snapshot.fleet and probe not in snapshot.draining:
+                return probe
+        return self.strategies[name].choose(snapshot, self.in_flight, key)
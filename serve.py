@@ -0,0 +1,87 @@
+"""Production entry point: uvicorn workers routing from one shared state owner.
+
+The launching process owns all mutable state: it runs PredictiveLoadBalancer
+with its background tasks and writes every snapshot it publishes, together
+with the traffic history, into one shared memory segment. Each uvicorn
+worker maps the segment and serves /route, /predict and /metrics straight
+from it, so all workers predict and score from the same state.
+
+Workers route around servers the owner's circuit breakers have ejected,
+but they do not report request outcomes back: traffic served by the
+workers never trips a breaker. Outcome-driven ejection needs the proxy
+or the Flask app, which run in the balancer's own process.
+
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+
+import uvicorn
+
+from asgi_app import create_asgi_app
+from consistent_hash import DEFAULT_KEY_HEADER
+from fleet_metrics import DEFAULT_HEALTH_WEIGHTS
+from predictive_balancer import PredictiveLoadBalancer
+from shared_state import SharedStateReader, SharedStateWriter
+
+SHARED_STATE_ENV = 'PLB_SHARED_STATE'
+
+
+def create_worker_app():
+    """uvicorn app factory, called once in every worker process"""
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    reader = SharedStateReader(
+        os.environ[SHARED_STATE_ENV], config.get('routing', {}), config['servers'],
+        {**DEFAULT_HEALTH_WEIGHTS, **config.get('health_weights', {})}, config['overload_thresholds']
+    )
+    key_header = config.get('routing', {}).get('consistent_hash', {}).get('key_header', DEFAULT_KEY_HEADER)
+    return create_asgi_app(reader, key_header)
+
+
+def main():
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    serve_config = config.get('serve', {})
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=serve_config.get('host', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=serve_config.get('port', 8000))
+    parser.add_argument('--workers', type=int, default=serve_config.get('workers', os.cpu_count()))
+    parser.add_argument('--no-background-tasks', action='store_true',
+                        help='keep state static (for load testing)')
+    args = parser.parse_args()
+
+    balancer = PredictiveLoadBalancer(start_background_tasks=not args.no_background_tasks)
+    history = balancer.predictor.traffic_history
+    writer = SharedStateWriter(serve_config.get('max_servers', 1024), history.capacity)
+    # The segment has a fixed number of server rows; membership changes past it are refused
+    if len(balancer.pool.members) > writer.max_servers:
+        writer.close()
+        sys.exit(f"❌ {len(balancer.pool.members)} servers do not fit serve.max_servers={writer.max_servers}")
+    balancer.pool.max_members = writer.max_servers
+    balancer.snapshot_listeners.append(lambda snapshot: writer.publish(snapshot, history))
+    writer.publish(balancer.snapshot, history)
+
+    # Workers are spawned processes and inherit the segment name
+    os.environ[SHARED_STATE_ENV] = writer.name
+
+    print(f"🚀 Serving /route, /predict and /metrics on http://{args.host}:{args.port} "
+          f"with {args.workers} workers")
+    print("🛑 Press Ctrl+C to stop the server")
+    # uvicorn re-raises SIGTERM once it has shut down; exit normally so the segment is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        uvicorn.run(
+            'serve:create_worker_app', factory=True, host=args.host, port=args.port,
+            workers=args.workers, log_level='warning', access_log=False
+        )
+    finally:
+        writer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,83 +1,98 @@
 import json
-import random
-from datetime import datetime
+import time
+
+from fleet_metrics import DEFAULT_HEALTH_WEIGHTS, HEALTH_SCALES, FleetMetrics
+from state_store import CopyOnWriteStore
+
 #Created a class to monitor server health and predict overload risks.
 class ServerHealthMonitor:
-    def __init__(self):
-        with open('config.json', 'r') as f:
-            self.config = json.load(f)
-        self.server_metrics = {}
+    def __init__(self, config=None):
+        # `config` (health_weights, overload_thresholds) defaults to config.json
+        if config is None:
+            with open('config.json', 'r') as f:
+                config = json.load(f)
+        self.config = config
+        self.health_weights = {**DEFAULT_HEALTH_WEIGHTS, **self.config.get('health_weights', {})}
+        # Copy-on-write: every update publishes a new columnar FleetMetrics table
+        self._fleet = CopyOnWriteStore(
+            FleetMetrics.empty(self.health_weights, self.config['overload_thresholds'])
+        )
         print("🏥 Server Health Monitor Started!")
+    
+    @property
+    def fleet(self):
+        """Latest FleetMetrics table (read-only, lock-free)"""
+        return self._fleet.value
+    
+    @property
+    def server_metrics(self):
+        """Read-only view of the latest metrics for every server"""
+        return self.fleet.as_dicts
         
     def update_server_metrics(self, server_id, metrics):
         """Update metrics for a specific server"""
-        self.server_metrics[server_id] = {
-            **metrics,
-            'last_update': datetime.now(),
-            'health_score': self.calculate_health_score(metrics)
-        }
+        self.bulk_update_server_metrics({server_id: metrics})
+    
+    def bulk_update_server_metrics(self, updates, add_new=True):
+        """Update several servers at once; readers see all of them change together.
+
+        With `add_new` False, updates for servers not in the fleet are dropped
+        (periodic reporters use this so they cannot revive a removed server).
+        Returns the published FleetMetrics table.
+        """
+        now = time.time()
+        return self._fleet.update(lambda fleet: fleet.with_updates(updates, now, add_new))
+    
+    def remove_servers(self, server_ids):
+        """Drop servers from the fleet in one update"""
+        self._fleet.update(lambda fleet: fleet.without(server_ids))
+    
+    def bulk_update_metric_columns(self, server_ids, columns):
+        """Apply metric arrays (NaN = unchanged) in one vectorized pass; servers not in the fleet are skipped.
+
+        Returns the published FleetMetrics table.
+        """
+        now = time.time()
+        return self._fleet.update(lambda fleet: fleet.with_columns(server_ids, columns, now))
     
     def calculate_health_score(self, metrics):
         """Calculate a simple health score (0-100)"""
-        scores = []
-        
-        # CPU Score (lower usage = better)
-        cpu_score = max(0, 100 - (metrics.get('cpu_usage', 0) * 100))
-        scores.append(cpu_score)
-        
-        # Memory Score
-        memory_score = max(0, 100 - (metrics.get('memory_usage', 0) * 100))
-        scores.append(memory_score)
-        
-        # Response Time Score (faster = better)
-        response_time = metrics.get('response_time', 0)
-        response_score = max(0, 100 - (response_time * 10))  # 0.1s = 99, 1s = 90, 10s = 0
-        scores.append(response_score)
-        
-        # Error Rate Score
-        error_rate = metrics.get('error_rate', 0)
-        error_score = max(0, 100 - (error_rate * 1000))  # 0.01 = 90, 0.1 = 0
-        scores.append(error_score)
+        # Each metric scores 100 at zero and falls linearly to 0 at its scale limit:
+        # cpu/memory 100%, response time 10s, error rate 10%
+        total = 0.0
+        weight_sum = 0.0
+        for name, scale in HEALTH_SCALES.items():
+            weight = self.health_weights.get(name, 0.0)
+            if weight:
+                total += weight * max(0, 100 - metrics.get(name, 0) * scale)
+                weight_sum += weight
         
-        # Average the scores
-        avg_score = sum(scores) / len(scores)
-        return avg_score
+        # Weighted average of the scores
+        return total / weight_sum if weight_sum else total
     
-    def get_best_server(self):
+    def get_best_server(self, fleet=None):
         """Get the healthiest server"""
-        if not self.server_metrics:
-            return None
-            
-        # Find server with highest health score
-        best_server = max(self.server_metrics.items(), key=lambda x: x[1]['health_score'])
-        return best_server[0]  # Return server ID
+        fleet = self.fleet if fleet is None else fleet
+        return fleet.best_server()
     
-    def is_server_overloaded(self, server_id):
+    def is_server_overloaded(self, server_id, fleet=None):
         """Check if a server is overloaded"""
-        if server_id not in self.server_metrics:
+        fleet = self.fleet if fleet is None else fleet
+        if server_id not in fleet:
             return True  # If we don't know, assume it's bad
-            
-        metrics = self.server_metrics[server_id]
         
-        # Check thresholds from config
-        thresholds = self.config['overload_thresholds']
-        if (metrics.get('cpu_usage', 0) > thresholds['cpu_usage'] or
-            metrics.get('memory_usage', 0) > thresholds['memory_usage'] or
-            metrics.get('response_time', 0) > thresholds['response_time'] or
-            metrics.get('error_rate', 0) > thresholds['error_rate']):
-            return True
-            
-        return False
+        # Thresholds from config are applied to the whole fleet when it is published
+        return bool(fleet.overloaded[fleet.slots[server_id]])
     
-    def predict_overload_risk(self, server_id, predicted_traffic):
+    def predict_overload_risk(self, server_id, predicted_traffic, fleet=None):
         """Simple overload risk prediction"""
-        if server_id not in self.server_metrics:
+        fleet = self.fleet if fleet is None else fleet
+        if server_id not in fleet:
             return "unknown"
-            
-        current_metrics = self.server_metrics[server_id]
-        current_traffic = current_metrics.get('request_rate', 1)
         
         # Simple calculation: if predicted traffic is much higher, risk is high
+        # (more than 1.5x the current request rate is medium, more than 2x is high)
+        current_traffic = fleet.columns['request_rate'][fleet.slots[server_id]]
         traffic_increase = predicted_traffic / max(1, current_traffic)
         
         if traffic_increase > 2.0:
@@ -0,0 +1,279 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+
+from state_store import CopyOnWriteStore
+
+logger = logging.getLogger(__name__)
+
+# Server ids end up in file names, metric labels and fixed 64-byte shared memory fields
+SERVER_ID_PATTERN = re.compile(r'[A-Za-z0-9][A-Za-z0-9_.:-]{0,63}')
+
+
+def parse_address(address):
+    """Split a 'host:port' address, raising ValueError unless the host is non-empty and the port is 1-65535"""
+    if not isinstance(address, str):
+        raise ValueError(f"Invalid address {address!r}: expected 'host:port'")
+    host, sep, port = address.rpartition(':')
+    if not sep or not host or not (port.isascii() and port.isdigit()) or not 1 <= int(port) <= 65535:
+        raise ValueError(f"Invalid address {address!r}: expected 'host:port' with a port from 1 to 65535")
+    return host, int(port)
+
+
+def validate_servers(servers):
+    """Raise ValueError unless every id and address in `servers` ({server_id: address or None}) is well formed"""
+    for server_id, address in servers.items():
+        if not isinstance(server_id, str) or not SERVER_ID_PATTERN.fullmatch(server_id):
+            raise ValueError(
+                f"Invalid server id {server_id!r}: expected 1-64 letters, digits, '_', '.', ':' or '-', "
+                f"starting with a letter or digit"
+            )
+        if address is not None:
+            try:
+                parse_address(address)
+            except ValueError as e:
+                raise ValueError(f"Invalid address for server {server_id}: {e}") from None
+
+
+@dataclass(frozen=True)
+class Member:
+    """One backend in the pool; `draining_since` is set once it stops taking new requests"""
+    server_id: str
+    address: str = None
+    draining_since: float = None
+
+    @property
+    def draining(self):
+        return self.draining_since is not None
+
+
+@dataclass(frozen=True)
+class MembershipChange:
+    """What one `add` / `drain` / `sync` call changed, in server ids"""
+    added: tuple = ()
+    drained: tuple = ()
+    readdressed: tuple = ()
+
+    def __bool__(self):
+        return bool(self.added or self.drained or self.readdressed)
+
+
+class ServerPool:
+    """Runtime server membership: which backends exist, where they are and which are draining.
+
+    The member table is copy-on-write like the rest of the balancer state,
+    so readers iterate a consistent mapping without locking. Every call
+    applies a delta: only the servers named in it are touched, and a batch
+    of any size is published once. Removed servers are not dropped straight
+    away but marked draining; the balancer stops routing to them and calls
+    `forget` once their in-flight requests finish or the drain times out.
+    With `max_members` set, an `add` that would grow the pool (draining
+    servers included) past it raises ValueError and changes nothing.
+    """
+
+    def __init__(self, servers=(), upstreams=None, max_members=None):
+        self.max_members = max_members
+        upstreams = upstreams or {}
+        validate_servers({server_id: upstreams.get(server_id) for server_id in servers})
+        members = {server_id: Member(server_id, upstreams.get(server_id)) for server_id in servers}
+        # (members, active ids, draining ids) published together
+        self._state = CopyOnWriteStore((MappingProxyType(members), tuple(members), frozenset()))
+
+    @property
+    def members(self):
+        """Read-only {server_id: Member}, including draining servers"""
+        return self._state.value[0]
+
+    @property
+    def active(self):
+        """Ids of the servers that take new requests"""
+        return self._state.value[1]
+
+    @property
+    def draining(self):
+        return self._state.value[2]
+
+    def address(self, server_id):
+        member = self.members.get(server_id)
+        return member.address if member else None
+
+    def checkpoint(self):
+        """The current membership, to hand to `restore` if a change has to be undone"""
+        return self._state.value
+
+    def restore(self, checkpoint):
+        """Publish a membership returned by `checkpoint` again, undoing every change since"""
+        self._state.publish(checkpoint)
+
+    def _apply(self, fn):
+        """Run `fn` on a copy of the member dict and publish it with the active and draining sets"""
+        with self._state.lock:
+            current, active, draining = self._state.value
+            members = dict(current)
+            change = fn(members)
+            if change:
+                # Only the ids that changed state are moved between the two sets
+                changed = change.added + change.drained if isinstance(change, MembershipChange) else change
+                active = dict.fromkeys(active)
+                draining = set(draining)
+                for server_id in changed:
+                    member = members.get(server_id)
+                    if member is None or member.draining:
+                        active.pop(server_id, None)
+                    else:
+                        active[server_id] = None
+                    if member is not None and member.draining:
+                        draining.add(server_id)
+                    else:
+                        draining.discard(server_id)
+                self._state.publish((MappingProxyType(members), tuple(active), frozenset(draining)))
+            return change
+
+    def add(self, servers):
+        """Add or re-address servers ({server_id: address or None}); re-adding a draining server revives it.
+
+        Raises ValueError, changing nothing, if any id or address is malformed.
+        """
+        validate_servers(servers)
+
+        def apply(members):
+            if self.max_members is not None:
+                new = sum(server_id not in members for server_id in servers)
+                if new and len(members) + new > self.max_members:
+                    raise ValueError(
+                        f'Adding {new} servers would exceed the limit of {self.max_members} '
+                        f'({len(members)} members, draining included)'
+                    )
+            added, readdressed = [], []
+            for server_id, address in servers.items():
+                member = members.get(server_id)
+                if member is None:
+                    members[server_id] = Member(server_id, address)
+                    added.append(server_id)
+                elif member.draining:
+                    members[server_id] = Member(server_id, address or member.address)
+                    added.append(server_id)
+                elif address and address != member.address:
+                    members[server_id] = replace(member, address=address)
+                    readdressed.append(server_id)
+            return MembershipChange(added=tuple(added), readdressed=tuple(readdressed))
+
+        return self._apply(apply)
+
+    def drain(self, server_ids, now=None):
+        """Stop routing to `server_ids`; they stay members until forgotten"""
+        now = time.time() if now is None else now
+
+        def apply(members):
+            drained = []
+            for server_id in server_ids:
+                member = members.get(server_id)
+                if member is not None and not member.draining:
+                    members[server_id] = replace(member, draining_since=now)
+                    drained.append(server_id)
+            return MembershipChange(drained=tuple(drained))
+
+        return self._apply(apply)
+
+    def sync(self, servers, now=None):
+        """Make the active set equal `servers` ({server_id: address}); missing servers start draining"""
+        validate_servers(servers)
+        added = self.add(servers)
+        drained = self.drain([server_id for server_id in self.active if server_id not in servers], now)
+        return MembershipChange(added.added, drained.drained, added.readdressed)
+
+    def drained(self, in_flight, timeout, now=None):
+        """Draining servers with nothing in flight, or draining for longer than `timeout` seconds"""
+        now = time.time() if now is None else now
+        return [
+            server_id for server_id, member in self.members.items()
+            if member.draining and (in_flight.get(server_id) == 0 or now - member.draining_since >= timeout)
+        ]
+
+    def forget(self, server_ids):
+        """Remove drained servers from the pool; returns the ids that were still draining"""
+        def apply(members):
+            forgotten = []
+            for server_id in server_ids:
+                member = members.get(server_id)
+                if member is not None and member.draining:
+                    del members[server_id]
+                    forgotten.append(server_id)
+            return forgotten
+
+        return self._apply(apply)
+
+
+def read_server_list(path):
+    """{server_id: address} from a JSON file.
+
+    Accepts either a flat {"server1": "host:port"} mapping or a config-style
+    document with a "servers" list and an optional "upstreams" mapping.
+    Raises ValueError for malformed ids or addresses.
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get('servers'), list):
+        upstreams = data.get('upstreams', {})
+        if not all(isinstance(server_id, str) for server_id in data['servers']):
+            raise ValueError(f'{path} is not a server list')
+        data = {server_id: upstreams.get(server_id) for server_id in data['servers']}
+    if not isinstance(data, dict):
+        raise ValueError(f'{path} is not a server list')
+    validate_servers(data)
+    return data
+
+
+class ServerListWatcher:
+    """Polls a server list file and calls `on_change(servers)` whenever its mtime changes.
+
+    Polling one `os.stat` per interval avoids platform-specific file
+    notification APIs and works on network filesystems. A file that fails
+    to parse (e.g. caught mid-write) is skipped until it changes again, and
+    an error raised by `on_change` is logged without stopping the watcher.
+    """
+
+    def __init__(self, path, on_change, interval=2.0):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._mtime = self._stat()
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def check(self):
+        """Apply the file if it changed since the last check; returns True if it was applied"""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            servers = read_server_list(self.path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring server list {self.path}: {e}")
+            return False
+        try:
+            self.on_change(servers)
+        except Exception:
+            logger.exception("Applying server list %s failed", self.path)
+            return False
+        return True
+
+    def run_forever(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+
+    def start_in_thread(self):
+        thread = threading.Thread(target=self.run_forever, daemon=True)
+        thread.start()
+        return thread
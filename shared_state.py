@@ -0,0 +1,209 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from fleet_metrics import METRIC_COLUMNS, FleetMetrics
+from routing_strategies import Router
+from snapshot import BalancerSnapshot
+
+MAGIC = 0x504C4253  # 'PLBS'
+SERVER_ID_DTYPE = np.dtype('S64')
+SLOTS = 4
+
+# Segment layout, all native-endian:
+#   header  int64 x 8: magic, latest version, active slot, slot count, max servers, history capacity
+#   slots   SLOTS x (int64 seq, version, server count, history appended;
+#                    float64 current traffic, predicted traffic, spike flag;
+#                    float64 metric columns and last_update, max servers each;
+#                    float64 history timestamps and values, history capacity each;
+#                    64-byte server ids, max servers)
+HEADER_SIZE = 8
+MAGIC_FIELD, VERSION_FIELD, ACTIVE_FIELD, SLOTS_FIELD, MAX_SERVERS_FIELD, HISTORY_FIELD = range(6)
+SEQ, SLOT_VERSION, COUNT, APPENDED = range(4)
+
+
+def slot_size(max_servers, history_capacity):
+    floats = 3 + (len(METRIC_COLUMNS) + 1) * max_servers + 2 * history_capacity
+    return 4 * 8 + floats * 8 + max_servers * SERVER_ID_DTYPE.itemsize
+
+
+class SharedSlot:
+    """NumPy views onto one slot of the segment"""
+
+    def __init__(self, buffer, offset, max_servers, history_capacity):
+        def take(dtype, count):
+            nonlocal offset
+            array = np.ndarray(count, dtype=dtype, buffer=buffer, offset=offset)
+            offset += array.nbytes
+            return array
+
+        self.meta = take(np.int64, 4)
+        self.scalars = take(np.float64, 3)
+        self.columns = {name: take(np.float64, max_servers) for name in METRIC_COLUMNS}
+        self.last_update = take(np.float64, max_servers)
+        self.history_timestamps = take(np.float64, history_capacity)
+        self.history_values = take(np.float64, history_capacity)
+        self.server_ids = take(SERVER_ID_DTYPE, max_servers)
+
+
+def map_segment(buffer, max_servers, history_capacity):
+    header = np.ndarray(HEADER_SIZE, dtype=np.int64, buffer=buffer)
+    size = slot_size(max_servers, history_capacity)
+    slots = [
+        SharedSlot(buffer, HEADER_SIZE * 8 + i * size, max_servers, history_capacity)
+        for i in range(SLOTS)
+    ]
+    return header, slots
+
+
+class SharedStateWriter:
+    """Publishes balancer snapshots and traffic history into one shared memory segment.
+
+    There is exactly one writer. Each publish fills the slot after the
+    active one, bracketed by a sequence counter that is odd while the slot
+    is being written, and then flips the header to point at it. Readers in
+    other processes therefore never see a slot mid-write, and the slot they
+    are reading is not reused until SLOTS - 1 newer versions have been
+    published.
+    """
+
+    def __init__(self, max_servers=1024, history_capacity=100, name=None):
+        self.max_servers = max_servers
+        self.history_capacity = history_capacity
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=True,
+            size=HEADER_SIZE * 8 + SLOTS * slot_size(max_servers, history_capacity)
+        )
+        self.name = self.shm.name
+        self.header, self.slots = map_segment(self.shm.buf, max_servers, history_capacity)
+        self.header[:] = (MAGIC, 0, 0, SLOTS, max_servers, history_capacity, 0, 0)
+
+    def publish(self, snapshot, history=None):
+        """Write `snapshot` (and a TrafficRingBuffer `history`) to the next slot and make it active"""
+        # Workers route from the fleet alone, so servers not serving new requests
+        # (draining, or ejected by their circuit breaker) are left out of it
+        fleet = snapshot.fleet
+        if snapshot.draining or snapshot.ejected:
+            fleet = fleet.without(frozenset(fleet.server_ids).difference(snapshot.serving_servers))
+        count = len(fleet)
+        if count > self.max_servers:
+            raise ValueError(f'{count} servers do not fit a segment sized for {self.max_servers}')
+        if history is not None and history.capacity != self.history_capacity:
+            raise ValueError('History capacity does not match the shared segment')
+
+        index = (int(self.header[ACTIVE_FIELD]) + 1) % SLOTS
+        slot = self.slots[index]
+        slot.meta[SEQ] += 1  # odd: slot is being written
+        slot.meta[SLOT_VERSION] = snapshot.version
+        slot.meta[COUNT] = count
+        slot.scalars[:] = (snapshot.current_traffic, snapshot.predicted_traffic, snapshot.traffic_spike)
+        for name in METRIC_COLUMNS:
+            slot.columns[name][:count] = fleet.columns[name]
+        slot.last_update[:count] = fleet.last_update
+        slot.server_ids[:count] = fleet.server_ids
+        if history is not None:
+            slot.meta[APPENDED] = history.appended
+            slot.history_timestamps[:] = history.timestamps
+            slot.history_values[:] = history.values
+        slot.meta[SEQ] += 1  # even: slot is complete
+
+        self.header[ACTIVE_FIELD] = index
+        self.header[VERSION_FIELD] = snapshot.version
+
+    def close(self):
+        """Release and remove the segment"""
+        del self.header, self.slots
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SharedStateReader:
+    """Routing worker's view of a SharedStateWriter segment.
+
+    Snapshots are rebuilt only when the writer's version changes, from a
+    copy of the active slot taken under its sequence check: nothing is
+    unpickled, every worker scores and routes from the same numbers, and a
+    snapshot a request still holds is unaffected when the writer later
+    reuses the slot. Offers the same routing interface as
+    PredictiveLoadBalancer (`snapshot`, `choose_server`, `in_flight`,
+    `route_leases`); in-flight counts and route tokens are local to the
+    worker. Readers are meant to run in child processes of the writer's
+    process, sharing its resource tracker, so that only the writer removes
+    the segment.
+    """
+
+    def __init__(self, name, routing_config, server_ids, weights, thresholds):
+        self.shm = shared_memory.SharedMemory(name=name)
+        header = np.ndarray(HEADER_SIZE, dtype=np.int64, buffer=self.shm.buf)
+        if header[MAGIC_FIELD] != MAGIC or header[SLOTS_FIELD] != SLOTS:
+            raise ValueError(f"Shared memory segment '{name}' is not balancer state")
+        self.header, self.slots = map_segment(
+            self.shm.buf, int(header[MAX_SERVERS_FIELD]), int(header[HISTORY_FIELD])
+        )
+        self.weights = weights
+        self.thresholds = thresholds
+        self.router = Router(routing_config, server_ids)
+        self.in_flight = self.router.in_flight
+        self.route_leases = self.router.leases
+        self._server_ids = (b'', ())
+        self._current = (0, None)
+
+    @property
+    def snapshot(self):
+        """Latest published snapshot; rebuilt only after the writer publishes"""
+        version, snapshot = self._current
+        if self.header[VERSION_FIELD] != version or snapshot is None:
+            snapshot = self._load()
+            self._current = (snapshot.version, snapshot)
+        return snapshot
+
+    def _read_slot(self, build):
+        """Run `build(slot)` against the active slot until it completes without a concurrent write"""
+        while True:
+            slot = self.slots[int(self.header[ACTIVE_FIELD])]
+            seq = int(slot.meta[SEQ])
+            if seq % 2 == 0:
+                result = build(slot)
+                if int(slot.meta[SEQ]) == seq:
+                    return result
+
+    def _decode_ids(self, slot, count):
+        raw = slot.server_ids[:count].tobytes()
+        if raw != self._server_ids[0]:
+            self._server_ids = (raw, tuple(server_id.decode() for server_id in slot.server_ids[:count]))
+        return self._server_ids[1]
+
+    def _load(self):
+        def build(slot):
+            count = int(slot.meta[COUNT])
+            # Copies, not views: the writer reuses this slot SLOTS publishes later
+            fleet = FleetMetrics(
+                self._decode_ids(slot, count),
+                {name: slot.columns[name][:count].copy() for name in METRIC_COLUMNS},
+                slot.last_update[:count].copy(), self.weights, self.thresholds
+            )
+            current, predicted, spike = slot.scalars.tolist()
+            return BalancerSnapshot.from_fleet(int(slot.meta[SLOT_VERSION]), current, predicted, bool(spike), fleet)
+
+        return self._read_slot(build)
+
+    def traffic_history(self, size=None):
+        """Last `size` (timestamps, values) of traffic history in chronological order"""
+        def build(slot):
+            capacity = len(slot.history_values)
+            appended = int(slot.meta[APPENDED])
+            count = min(appended, capacity) if size is None else min(size, appended, capacity)
+            end = appended % capacity
+            start = end - count
+            if start >= 0:
+                return slot.history_timestamps[start:end].copy(), slot.history_values[start:end].copy()
+            return (np.concatenate((slot.history_timestamps[start:], slot.history_timestamps[:end])),
+                    np.concatenate((slot.history_values[start:], slot.history_values[:end])))
+
+        return self._read_slot(build)
+
+    def strategy_for(self, path):
+        return self.router.strategy_for(path)
+
+    def choose_server(self, path='/', strategy=None, key=None):
+        return self.router.choose(self.snapshot, path, strategy, key)
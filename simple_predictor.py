@@ -1,61 +1,121 @@
 import numpy as np
-import pandas as pd
-import json
-from datetime import datetime, timedelta
-import random
+import time
+
+from anomaly import StreamingDetector, detector_params
+from forecasting import DEFAULT_HORIZONS, DEFAULT_QUANTILES, HorizonForecast, create_forecaster, horizon_spreads
+from ring_buffer import TrafficRingBuffer
 
 class SimpleTrafficPredictor:
-    def __init__(self):
+    def __init__(self, max_history=100, forecasting_config=None, default_prediction=100.0, anomaly_config=None):
         print("🚀 Simple Traffic Predictor Started!")
-        self.traffic_history = []
-        self.max_history = 100
+        self.max_history = max_history
+        # Oldest samples are overwritten in place once the buffer is full
+        self.traffic_history = TrafficRingBuffer(self.max_history)
+        self.forecaster = create_forecaster(forecasting_config)
+        self.default_prediction = default_prediction
+        # Streaming baseline for spike detection, updated once per sample
+        self.spike_detector = StreamingDetector(1, **detector_params(anomaly_config))
+        self.last_anomaly = (0.0, 0, 0)  # (score, spike code, shift code) of the latest sample
+        self.last_anomaly_sample = 0  # traffic_history.appended when last_anomaly was scored
+        # (samples appended, arguments) -> forecasts / peak; valid until the next sample
+        self._forecast_cache = (None, ())
+        self._peak_cache = (None, None)
         
-    def add_traffic_data(self, current_traffic):
+    def add_traffic_data(self, current_traffic, timestamp=None):
         """Add current traffic data to history"""
-        timestamp = datetime.now()
-        self.traffic_history.append({
-            'timestamp': timestamp,
-            'traffic': current_traffic,
-            'hour': timestamp.hour,
-            'day_of_week': timestamp.weekday()
-        })
-        
-        # Keep only recent history
-        if len(self.traffic_history) > self.max_history:
-            self.traffic_history.pop(0)
+        if timestamp is None:
+            timestamp = time.time()
+        self.traffic_history.append(timestamp, current_traffic)
+        self.forecaster.update(timestamp, current_traffic)
+        scores, spikes, shifts = self.spike_detector.update([current_traffic])
+        self.last_anomaly = (float(scores[0]), int(spikes[0]), int(shifts[0]))
+        self.last_anomaly_sample = self.traffic_history.appended
     
-    def predict_next_traffic(self):
-        """Simple prediction based on time patterns"""
-        if len(self.traffic_history) < 10:
-            return random.uniform(50, 150)  # Default prediction
-            
-        current_hour = datetime.now().hour
-        current_day = datetime.now().weekday()
-        
-        # Simple pattern recognition
-        recent_traffic = [item['traffic'] for item in self.traffic_history[-10:]]
-        avg_recent = sum(recent_traffic) / len(recent_traffic)
-        
-        # Time-based adjustments
-        if current_hour >= 9 and current_hour <= 17:  # Business hours
-            prediction = avg_recent * 1.3
-        elif current_hour >= 18 and current_hour <= 22:  # Evening peak
-            prediction = avg_recent * 1.5
-        else:  # Night time
-            prediction = avg_recent * 0.7
-            
-        # Weekend adjustment
-        if current_day >= 5:  # Weekend
-            prediction = prediction * 0.8
-            
-        return max(10, prediction)  # Ensure positive value
+    def predict_next_traffic(self, steps=1):
+        """Forecast traffic `steps` samples ahead with the configured model"""
+        if not self.forecaster.ready:
+            # Not enough data for the model yet: fall back to the last observation
+            latest = self.traffic_history.latest()
+            return latest[1] if latest else self.default_prediction
+
+        return max(10, float(self.forecaster.predict(steps)))  # Ensure positive value
+
+    def predict_traffic(self, steps):
+        """predict_next_traffic for an array of step counts, in one vectorized pass"""
+        if not self.forecaster.ready:
+            latest = self.traffic_history.latest()
+            return np.full(len(steps), latest[1] if latest else self.default_prediction, dtype=np.float64)
+        # fmax, like max(10, nan), gives 10 for a NaN forecast
+        return np.fmax(10, self.forecaster.predict_many(steps))
     
-    def detect_spike(self, current_traffic):
-        """Detect if current traffic is unusually high"""
+    def detect_spike(self, current_traffic, sample=None):
+        """Detect if current traffic is unusually high.
+
+        When `current_traffic` is a recorded sample, pass its `sample` number
+        (traffic_history.appended right after it was added): the latest
+        sample keeps the verdict it got when it was added.
+        """
         if len(self.traffic_history) < 5:
             return False
-            
-        recent_avg = sum([item['traffic'] for item in self.traffic_history[-5:]]) / 5
         
-        # If current traffic is 50% higher than recent average, it's a spike
-        return current_traffic > recent_avg * 1.5
\ No newline at end of file
+        if not self.spike_detector.ready[0]:
+            # Too few samples for a baseline: 50% above the recent average is a spike
+            return current_traffic > self.traffic_history.window_mean(5) * 1.5
+        
+        if sample is not None and sample == self.last_anomaly_sample:
+            # The latest sample was already scored against the baseline before it
+            return self.last_anomaly[1] > 0
+        return bool(self.spike_detector.score([current_traffic])[0] > self.spike_detector.threshold)
+
+    def _steps(self, horizons_seconds, default_interval):
+        interval = self.forecaster.interval or default_interval
+        return np.maximum(1, np.round(np.asarray(horizons_seconds, dtype=np.float64) / max(interval, 1e-9))).astype(int)
+
+    def forecast(self, horizons=DEFAULT_HORIZONS, quantiles=DEFAULT_QUANTILES, default_interval=5.0):
+        """Point forecast and quantile interval per horizon (seconds); a tuple of HorizonForecast.
+
+        Intervals come from the empirical spread of past changes over the
+        same number of steps. While a spike is flagged, quantiles at or
+        above the median never fall below the current traffic. Results are
+        cached until the next sample arrives.
+        """
+        key = (self.traffic_history.appended, tuple(horizons), tuple(quantiles), default_interval)
+        if self._forecast_cache[0] == key:
+            return self._forecast_cache[1]
+
+        steps = self._steps(horizons, default_interval)
+        points = self.predict_traffic(steps)
+        levels = points[:, None] + horizon_spreads(self.traffic_history.last_values(), steps, quantiles)
+        latest = self.traffic_history.latest()
+        if latest and self.detect_spike(latest[1], self.traffic_history.appended):
+            upper = np.asarray(quantiles) >= 0.5
+            levels[:, upper] = np.maximum(levels[:, upper], latest[1])
+        levels = np.maximum(levels, 0.0)
+
+        forecasts = tuple(
+            HorizonForecast(float(horizon), step, float(point), dict(zip(quantiles, row)))
+            for horizon, step, point, row in zip(horizons, steps.tolist(), points.tolist(), levels.tolist())
+        )
+        self._forecast_cache = (key, forecasts)
+        return forecasts
+
+    def forecast_peak(self, horizon_seconds, default_interval=5.0, max_points=60, quantile=None):
+        """Highest forecast over the next `horizon_seconds`; returns (peak, steps ahead).
+
+        With a `quantile` (e.g. 0.95) each step's forecast is raised to that
+        quantile of its prediction interval, so capacity is sized for the
+        likely upper end rather than the point estimate. Cached until the
+        next sample arrives.
+        """
+        key = (self.traffic_history.appended, horizon_seconds, default_interval, max_points, quantile)
+        if self._peak_cache[0] == key:
+            return self._peak_cache[1]
+
+        steps = int(self._steps([horizon_seconds], default_interval)[0])
+        # Long horizons are sampled at up to `max_points` evenly spaced steps
+        candidates = np.unique(np.linspace(1, steps, min(steps, max_points)).round().astype(int))
+        peaks = self.predict_traffic(candidates)
+        if quantile is not None:
+            peaks += horizon_spreads(self.traffic_history.last_values(), candidates, [quantile])[:, 0]
+        self._peak_cache = (key, (float(peaks.max()), steps))
+        return self._peak_cache[1]
@@ -0,0 +1,150 @@
+import time
+from dataclasses import dataclass
+from functools import cached_property
+from types import MappingProxyType
+
+import numpy as np
+
+from fleet_metrics import METRIC_COLUMNS, RISK_LEVELS, FleetMetrics
+from weighted_selector import AliasTable
+
+
+@dataclass(frozen=True)
+class ServerState:
+    """Per-server view frozen at snapshot time"""
+    server_id: str
+    cpu_usage: float
+    memory_usage: float
+    response_time: float
+    error_rate: float
+    request_rate: float
+    health_score: float
+    overloaded: bool
+    risk_level: str
+
+
+@dataclass(frozen=True, eq=False)
+class BalancerSnapshot:
+    """Everything request handlers need, computed once per background tick.
+
+    Snapshots are never mutated after publishing; the balancer swaps in a new
+    one by rebinding a single attribute, so readers always see a consistent
+    set of values without taking a lock. Per-server flags are computed over
+    the columnar FleetMetrics table in one vectorized pass; the per-server
+    ServerState objects are only materialised if something asks for them.
+    """
+    version: int
+    created_at: float
+    current_traffic: float
+    predicted_traffic: float
+    traffic_spike: bool
+    fleet: FleetMetrics
+    risk_codes: np.ndarray
+    routable_servers: tuple
+    selector: AliasTable
+    fallback_server: str
+    healthy_count: int
+    serving_servers: tuple = ()
+    draining: frozenset = frozenset()
+    ejected: frozenset = frozenset()
+
+    @classmethod
+    def build(cls, version, current_traffic, predictor, health_monitor, draining=frozenset(), ejected=frozenset(),
+              sample=None):
+        # `sample`: current_traffic's sample number in the predictor's history, if it is one
+        return cls.from_fleet(
+            version, current_traffic, predictor.predict_next_traffic(),
+            predictor.detect_spike(current_traffic, sample), health_monitor.fleet, draining, ejected
+        )
+
+    @classmethod
+    def from_fleet(cls, version, current_traffic, predicted_traffic, traffic_spike, fleet, draining=frozenset(),
+                   ejected=frozenset()):
+        # Everything is evaluated against one published FleetMetrics table,
+        # so the snapshot never mixes two fleet updates
+        risk_codes = fleet.risk_codes(predicted_traffic)
+        serving_mask = np.ones(len(fleet), dtype=bool)
+        # Draining servers keep their metrics but take no new requests
+        serving_mask[[fleet.slots[server_id] for server_id in draining if server_id in fleet]] = False
+        # So do servers ejected by their circuit breaker, unless that would leave
+        # nothing to serve from (then ejections are ignored rather than failing everything)
+        available_mask = serving_mask.copy()
+        available_mask[[fleet.slots[server_id] for server_id in ejected if server_id in fleet]] = False
+        if not available_mask.any():
+            available_mask = serving_mask
+        routable_mask = available_mask & ~fleet.overloaded & (risk_codes < RISK_LEVELS.index("high"))
+
+        routable = tuple(fleet.ids[routable_mask])
+        fallback = fleet.best_server()
+        if (draining or ejected) and available_mask.any():
+            fallback = fleet.server_ids[int(np.argmax(np.where(available_mask, fleet.health, -np.inf)))]
+        elif draining:
+            fallback = None
+        return cls(
+            version=version,
+            created_at=time.time(),
+            current_traffic=current_traffic,
+            predicted_traffic=predicted_traffic,
+            traffic_spike=traffic_spike,
+            fleet=fleet,
+            risk_codes=risk_codes,
+            routable_servers=routable,
+            # Routable servers are picked in proportion to their health score
+            selector=AliasTable(routable, fleet.health[routable_mask].tolist()),
+            fallback_server=fallback,
+            healthy_count=len(fleet) - int(np.count_nonzero(fleet.overloaded)),
+            serving_servers=tuple(fleet.ids[available_mask]) if draining or ejected else fleet.server_ids,
+            draining=frozenset(draining),
+            ejected=frozenset(ejected)
+        )
+
+    @cached_property
+    def routable_set(self):
+        """routable_servers as a frozenset, for membership tests on the request path"""
+        return frozenset(self.routable_servers)
+
+    @cached_property
+    def servers(self):
+        """Per-server ServerState objects keyed by server id"""
+        fleet = self.fleet
+        columns = {name: fleet.columns[name].tolist() for name in METRIC_COLUMNS}
+        health = fleet.health.tolist()
+        overloaded = fleet.overloaded.tolist()
+        risk = self.risk_codes.tolist()
+        return MappingProxyType({
+            server_id: ServerState(
+                server_id=server_id,
+                cpu_usage=columns['cpu_usage'][slot],
+                memory_usage=columns['memory_usage'][slot],
+                response_time=columns['response_time'][slot],
+                error_rate=columns['error_rate'][slot],
+                request_rate=columns['request_rate'][slot],
+                health_score=health[slot],
+                overloaded=overloaded[slot],
+                risk_level=RISK_LEVELS[risk[slot]]
+            )
+            for slot, server_id in enumerate(fleet.server_ids)
+        })
+
+    def to_dashboard_data(self):
+        """Dashboard payload in the shape the UI expects"""
+        return {
+            'current_traffic': self.current_traffic,
+            'predicted_traffic': self.predicted_traffic,
+            'traffic_spike': self.traffic_spike,
+            'healthy_servers': self.healthy_count,
+            'total_servers': len(self.fleet),
+            'draining_servers': sorted(self.draining),
+            'ejected_servers': sorted(self.ejected),
+            'servers': {
+                server_id: {
+                    'cpu_usage': state.cpu_usage,
+                    'memory_usage': state.memory_usage,
+                    'response_time': state.response_time,
+                    'error_rate': state.error_rate,
+                    'health_score': state.health_score,
+                    'risk_level': state.risk_level
+                }
+                for server_id, state in self.servers.items()
+            }
+        }
@@ -0,0 +1,41 @@
+import threading
+
+
+class CopyOnWriteStore:
+    """Holds one immutable value that readers load without locking.
+
+    Writers serialise on a re-entrant lock, build a fresh value and publish
+    it with a single reference assignment, which is atomic under the GIL.
+    Readers therefore never block and never observe a half-applied update,
+    as long as published values are not mutated afterwards.
+    """
+
+    def __init__(self, value=None):
+        self.lock = threading.RLock()
+        self._current = (0, value)
+
+    @property
+    def value(self):
+        return self._current[1]
+
+    @property
+    def version(self):
+        return self._current[0]
+
+    def read(self):
+        """Return (version, value) from one consistent publication"""
+        return self._current
+
+    def publish(self, value):
+        """Replace the current value; returns the new version"""
+        with self.lock:
+            version = self._current[0] + 1
+            self._current = (version, value)
+            return version
+
+    def update(self, fn):
+        """Publish fn(current_value) atomically with respect to other writers"""
+        with self.lock:
+            value = fn(self._current[1])
+            self.publish(value)
+            return value
@@ -0,0 +1,127 @@
+import threading
+
+import numpy as np
+import pytest
+
+from autoscaler import AutoscalePlanner
+from fleet_metrics import METRIC_COLUMNS, FleetMetrics
+from snapshot import BalancerSnapshot
+
+CONFIG = {'min_servers': 1, 'max_servers': 20, 'scale_up_cooldown': 60, 'scale_down_cooldown': 600}
+
+
+def make_snapshot(servers=4, draining=()):
+    """Fleet of busy servers that each handle 100 req/s at full cpu"""
+    server_ids = [f'server{i}' for i in range(servers)]
+    columns = {name: np.zeros(servers) for name in METRIC_COLUMNS}
+    columns['cpu_usage'] = np.full(servers, 0.5)
+    columns['request_rate'] = np.full(servers, 50.0)
+    fleet = FleetMetrics(server_ids, columns, np.ones(servers), {'cpu_usage': 1.0}, {'cpu_usage': 0.8})
+    return BalancerSnapshot.from_fleet(1, 0.0, 0.0, False, fleet, frozenset(draining))
+
+
+def test_scale_up_is_sized_for_target_utilization():
+    planner = AutoscalePlanner(CONFIG)
+    plan = planner.evaluate(make_snapshot(4), 480.0, now=1000.0)
+
+    # 480 req/s on 4 x 100 is 120% projected; 480 / (100 * 0.6) = 8 servers
+    assert plan.action == 'scale_up'
+    assert plan.desired_servers == 8
+    assert planner.last_scale_up == 1000.0
+
+
+def test_target_band_holds():
+    planner = AutoscalePlanner(CONFIG)
+    # 240 req/s on 4 servers is 60%, between the 40% and 75% thresholds
+    assert planner.evaluate(make_snapshot(4), 240.0, now=1000.0).action == 'hold'
+
+
+def test_scale_up_cooldown():
+    planner = AutoscalePlanner(CONFIG)
+    planner.evaluate(make_snapshot(4), 480.0, now=1000.0)
+
+    assert planner.evaluate(make_snapshot(4), 480.0, now=1059.0).action == 'hold'
+    assert planner.evaluate(make_snapshot(4), 480.0, now=1060.0).action == 'scale_up'
+
+
+def test_scale_down_waits_out_a_recent_scale_up():
+    planner = AutoscalePlanner(CONFIG)
+    planner.evaluate(make_snapshot(4), 480.0, now=1000.0)
+
+    held = planner.evaluate(make_snapshot(8), 60.0, now=1300.0)
+    assert held.action == 'hold'
+    assert 'cooldown' in held.reason
+    plan = planner.evaluate(make_snapshot(8), 60.0, now=1600.0)
+    assert plan.action == 'scale_down'
+    assert plan.desired_servers == 1
+
+
+def test_desired_count_is_clamped():
+    planner = AutoscalePlanner({**CONFIG, 'max_servers': 6})
+    assert planner.evaluate(make_snapshot(4), 4800.0, now=1000.0).desired_servers == 6
+
+
+def test_draining_servers_are_not_capacity():
+    planner = AutoscalePlanner(CONFIG)
+    # 240 req/s holds on 4 servers, but two of them are leaving
+    plan = planner.evaluate(make_snapshot(4, draining={'server0', 'server1'}), 240.0, now=1000.0)
+
+    assert plan.current_servers == 2
+    assert plan.action == 'scale_up'
+
+
+def test_all_servers_draining_scales_up_to_the_minimum():
+    planner = AutoscalePlanner({**CONFIG, 'min_servers': 2})
+    plan = planner.evaluate(make_snapshot(2, draining={'server0', 'server1'}), 0.0, now=1000.0)
+
+    assert plan.current_servers == 0
+    assert (plan.action, plan.desired_servers) == ('scale_up', 2)
+
+
+def test_failed_executor_does_not_start_the_cooldown():
+    calls = []
+
+    def executor(plan):
+        calls.append(plan)
+        raise RuntimeError('cloud API unavailable')
+
+    planner = AutoscalePlanner(CONFIG, executor=executor)
+    assert planner.evaluate(make_snapshot(4), 480.0, now=1000.0).action == 'scale_up'
+    assert planner.evaluate(make_snapshot(4), 480.0, now=1001.0).action == 'scale_up'
+    assert len(calls) == 2
+
+
+def test_history_keeps_only_actions():
+    planner = AutoscalePlanner(CONFIG)
+    planner.evaluate(make_snapshot(4), 480.0, now=1000.0)
+    for i in range(150):
+        planner.evaluate(make_snapshot(4), 240.0, now=1001.0 + i)
+
+    assert planner.latest.action == 'hold'
+    assert [plan.action for plan in planner.recent_actions()] == ['scale_up']
+
+
+@pytest.mark.parametrize('name', ['default_capacity', 'target_utilization'])
+def test_non_positive_capacity_settings_are_rejected(name):
+    with pytest.raises(ValueError):
+        AutoscalePlanner({**CONFIG, name: 0})
+
+
+def test_evaluations_do_not_overlap():
+    results, waiting = [], []
+
+    def evaluate_again():
+        results.append(planner.evaluate(make_snapshot(4), 480.0, now=1000.5))
+
+    def executor(plan):
+        # An evaluation started while this one runs has to wait for it
+        other = threading.Thread(target=evaluate_again)
+        other.start()
+        other.join(0.1)
+        waiting.append(other)
+
+    planner = AutoscalePlanner(CONFIG, executor=executor)
+    assert planner.evaluate(make_snapshot(4), 480.0, now=1000.0).action == 'scale_up'
+    assert not results
+    waiting[0].join(5)
+    assert [plan.action for plan in results] == ['hold']
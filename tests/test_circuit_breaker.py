@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, BreakerBoard
+from predictive_balancer import PredictiveLoadBalancer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG = {'consecutive_failures': 3, 'base_ejection_time': 5.0, 'max_ejection_percent': 1.0}
+
+
+def trip(board, server_id, now=0.0):
+    for _ in range(board.config['consecutive_failures']):
+        board.record(server_id, False, 0.01, now)
+
+
+def test_outcome_routed_while_closed_is_not_taken_for_the_probe():
+    board = BreakerBoard(CONFIG)
+    board.record('server1', True, 0.01, 0.0)
+    slow_request = board.epoch('server1')
+    trip(board, 'server1')
+    board.sweep(6.0)
+    assert board.breakers['server1'].state == HALF_OPEN
+
+    # The slow response from before the ejection lands first and is ignored
+    board.record('server1', True, 2.0, 6.5, epoch=slow_request)
+    assert board.breakers['server1'].state == HALF_OPEN
+
+    assert board.take_probe() == 'server1'
+    board.record('server1', True, 0.01, 7.0, epoch=board.epoch('server1'))
+    assert board.breakers['server1'].state == CLOSED
+
+
+def test_late_probe_outcome_after_reopening_is_ignored():
+    board = BreakerBoard(CONFIG)
+    trip(board, 'server1')
+    board.sweep(6.0)
+    probe = board.epoch('server1')
+    board.record('server1', False, 0.01, 6.1, epoch=probe)
+    assert board.breakers['server1'].state == OPEN
+
+    board.record('server1', True, 0.01, 6.2, epoch=probe)
+    assert board.breakers['server1'].state == OPEN
+
+
+def test_outcomes_without_epoch_are_always_counted():
+    board = BreakerBoard(CONFIG)
+    trip(board, 'server1')
+    board.sweep(6.0)
+    board.record('server1', True, 0.01, 6.1)
+    assert board.breakers['server1'].state == CLOSED
+
+
+def test_consecutive_failures_open_then_half_open_probe_closes():
+    board = BreakerBoard(CONFIG)
+    board.record('server1', False, 0.01, 0.0)
+    board.record('server1', False, 0.01, 0.0)
+    assert board.breakers['server1'].state == CLOSED
+    board.record('server1', False, 0.01, 0.0)
+    assert board.breakers['server1'].state == OPEN
+    assert board.ejected == {'server1'}
+
+    # Still ejected until the back-off runs out
+    board.sweep(4.9)
+    assert board.breakers['server1'].state == OPEN
+    assert board.take_probe() is None
+    board.sweep(5.0)
+    assert board.breakers['server1'].state == HALF_OPEN
+    assert board.half_open == {'server1'}
+    assert 'server1' in board.ejected
+
+    assert board.take_probe() == 'server1'
+    assert board.take_probe() is None  # one trial request at a time
+    board.record('server1', True, 0.01, 5.1, epoch=board.epoch('server1'))
+    assert board.breakers['server1'].state == CLOSED
+    assert board.ejected == frozenset()
+    assert board.half_open == frozenset()
+
+
+def test_failed_probe_reopens_with_a_longer_ejection():
+    board = BreakerBoard(CONFIG)
+    trip(board, 'server1')
+    board.sweep(5.0)
+    assert board.take_probe() == 'server1'
+    board.record('server1', False, 0.01, 5.1, epoch=board.epoch('server1'))
+
+    breaker = board.breakers['server1']
+    assert breaker.state == OPEN
+    assert breaker.reason == 'failed half-open probe'
+    assert breaker.until == pytest.approx(5.1 + 10.0)
+    board.sweep(15.0)
+    assert breaker.state == OPEN
+    board.sweep(15.1)
+    assert breaker.state == HALF_OPEN
+
+
+def test_lost_probe_is_handed_out_again():
+    board = BreakerBoard(CONFIG)
+    trip(board, 'server1')
+    board.sweep(5.0)
+    assert board.take_probe() == 'server1'
+    probed_at = board.breakers['server1'].probed_at
+    board.sweep(probed_at + 1.0)
+    assert board.take_probe() is None
+    board.sweep(probed_at + 5.0)
+    assert board.take_probe() == 'server1'
+
+
+def test_ejection_cap_keeps_servers_routable():
+    board = BreakerBoard({**CONFIG, 'max_ejection_percent': 0.5})
+    for server_id in ['a', 'b', 'c', 'd']:
+        board.record(server_id, True, 0.01, 0.0)
+    for server_id in ['a', 'b', 'c']:
+        trip(board, server_id)
+    assert board.ejected == {'a', 'b'}
+    assert board.breakers['c'].state == CLOSED
+
+
+def test_ejection_cap_counts_servers_without_a_breaker_yet():
+    fleet = ['a', 'b', 'c', 'd', 'e', 'f']
+    board = BreakerBoard({**CONFIG, 'max_ejection_percent': 0.5}, fleet_size=lambda: len(fleet))
+    for server_id in ['a', 'b']:
+        trip(board, server_id)
+    # Only two breakers exist, but three of six servers may be out
+    assert board.ejected == {'a', 'b'}
+
+    fleet = ['a', 'b']
+    trip(board, 'c')
+    assert 'c' not in board.ejected
+
+
+def test_sweep_ejects_error_rate_and_latency_outliers():
+    board = BreakerBoard({**CONFIG, 'consecutive_failures': 100, 'min_requests': 4, 'max_ejection_percent': 1.0})
+    for i in range(10):
+        for server_id in ['a', 'b', 'c', 'd']:
+            board.record(server_id, True, 0.02, 0.0)
+        board.record('flaky', i % 2 == 0, 0.02, 0.0)
+        board.record('slow', True, 1.0, 0.0)
+
+    assert board.sweep(1.0) == {'flaky', 'slow'}
+    assert board.breakers['flaky'].reason == 'error rate 50%'
+    assert board.breakers['slow'].reason == 'latency 1000 ms'
+
+
+def test_listeners_hear_about_ejections_and_forget_drops_the_server():
+    board = BreakerBoard(CONFIG)
+    calls = []
+    board.listeners.append(lambda: calls.append(board.ejected))
+    trip(board, 'server1')
+    assert calls == [frozenset({'server1'})]
+    board.forget(['server1'])
+    assert calls[-1] == frozenset()
+    assert 'server1' not in board.breakers
+
+
+def test_tripping_a_breaker_does_not_wait_for_the_snapshot_lock(tmp_path, monkeypatch):
+    with open(os.path.join(ROOT, 'config.json')) as f:
+        config = json.load(f)
+    config['circuit_breaker'] = {**config.get('circuit_breaker', {}), **CONFIG, 'enabled': True}
+    (tmp_path / 'config.json').write_text(json.dumps(config))
+    monkeypatch.chdir(tmp_path)
+    balancer = PredictiveLoadBalancer(start_background_tasks=False)
+    server_id = balancer.pool.active[0]
+
+    held, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with balancer._snapshots.lock:
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    held.wait(5)
+    started = time.monotonic()
+    for _ in range(CONFIG['consecutive_failures']):
+        balancer.record_outcome(server_id, False, 0.01)
+    assert time.monotonic() - started < 0.5
+    assert server_id not in balancer.snapshot.ejected
+
+    release.set()
+    holder.join()
+    deadline = time.monotonic() + 5
+    while server_id not in balancer.snapshot.ejected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server_id in balancer.snapshot.ejected
@@ -0,0 +1,23 @@
+import json
+import os
+
+from cluster_sim import STRATEGIES, ClusterSimulator, ServiceModel, TrafficProfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_simulator_uses_the_config_it_is_given(tmp_path, monkeypatch):
+    with open(os.path.join(ROOT, 'config.json')) as f:
+        config = json.load(f)
+    config['overload_thresholds'] = {**config['overload_thresholds'], 'cpu_usage': 0.01}
+    # No ./config.json to fall back on
+    monkeypatch.chdir(tmp_path)
+
+    simulator = ClusterSimulator(
+        ['server1', 'server2'], [1.0, 1.0], 1, STRATEGIES['predictive_load_balancing'](),
+        TrafficProfile(100.0, 0.0), ServiceModel(0.002, 'exponential'), config
+    )
+    assert simulator.health_monitor.fleet.thresholds['cpu_usage'] == 0.01
+    result = simulator.run(30.0)
+    assert result.requests > 0
+    assert result.overload_events > 0
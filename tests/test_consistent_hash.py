@@ -0,0 +1,99 @@
+import numpy as np
+
+from consistent_hash import HashRing
+from fleet_metrics import METRIC_COLUMNS, FleetMetrics
+from routing_strategies import ConsistentHashStrategy, InFlightCounters
+from snapshot import BalancerSnapshot
+
+KEYS = [f'session-{i}' for i in range(2000)]
+
+
+def make_snapshot(server_ids, version=1, draining=frozenset()):
+    columns = {name: np.full(len(server_ids), 0.2) for name in METRIC_COLUMNS}
+    columns['request_rate'] = np.full(len(server_ids), 1000.0)
+    fleet = FleetMetrics(server_ids, columns, np.ones(len(server_ids)), {'cpu_usage': 1.0}, {'cpu_usage': 0.8})
+    return BalancerSnapshot.from_fleet(version, 100.0, 100.0, False, fleet, draining)
+
+
+def owners(ring):
+    return [ring.lookup(key) for key in KEYS]
+
+
+def test_empty_ring_has_no_owner():
+    assert HashRing(16).lookup('session-1') is None
+
+
+def test_adding_a_server_only_moves_keys_to_it():
+    ring = HashRing(64)
+    ring.add(['a', 'b', 'c'])
+    before = owners(ring)
+    ring.add(['d'])
+    after = owners(ring)
+
+    moved = [(old, new) for old, new in zip(before, after) if old != new]
+    assert moved
+    assert all(new == 'd' for _, new in moved)
+    ring.remove(['d'])
+    assert owners(ring) == before
+
+
+def test_placement_does_not_depend_on_insertion_order():
+    forward, backward = HashRing(64), HashRing(64)
+    forward.add(['a', 'b', 'c'])
+    for server_id in ['c', 'b', 'a']:
+        backward.add([server_id])
+    assert owners(forward) == owners(backward)
+
+
+def test_lookup_skips_rejected_servers():
+    ring = HashRing(64)
+    ring.add(['a', 'b', 'c'])
+    assert {ring.lookup(key, lambda s: s != 'a') for key in KEYS} == {'b', 'c'}
+    assert ring.lookup('session-1', lambda s: False) is None
+
+
+def test_synced_leaves_the_original_ring_unchanged():
+    ring = HashRing(64)
+    ring.add(['a', 'b', 'c'])
+    before = owners(ring)
+    derived = ring.synced(['b', 'c', 'd'])
+
+    assert owners(ring) == before
+    assert ring.servers == {'a', 'b', 'c'}
+    assert derived.servers == {'b', 'c', 'd'}
+    fresh = HashRing(64)
+    fresh.add(['b', 'c', 'd'])
+    assert owners(derived) == owners(fresh)
+
+
+def test_older_snapshot_does_not_replace_the_newer_ring():
+    strategy = ConsistentHashStrategy(vnodes=64)
+    in_flight = InFlightCounters(['a', 'b', 'c', 'd'])
+    new = make_snapshot(['a', 'b', 'c', 'd'], version=2)
+    old = make_snapshot(['a', 'b', 'c'], version=1)
+
+    new_ring = strategy.ring_for(new)
+    assert strategy.ring_for(old).servers == {'a', 'b', 'c'}
+    assert strategy.ring_for(new) is new_ring
+    assert all(strategy.choose(old, in_flight, key) != 'd' for key in KEYS[:200])
+
+
+def test_bounded_load_spills_a_hot_key():
+    strategy = ConsistentHashStrategy(vnodes=64, load_factor=1.25)
+    snapshot = make_snapshot(['a', 'b', 'c', 'd'])
+    in_flight = InFlightCounters(snapshot.fleet.server_ids)
+    chosen = []
+    for _ in range(40):
+        server_id = strategy.choose(snapshot, in_flight, 'hot-key')
+        in_flight.start(server_id)
+        chosen.append(server_id)
+
+    assert len(set(chosen)) == 4
+    assert max(in_flight.get(server_id) for server_id in 'abcd') <= 13
+
+
+def test_all_servers_draining_routes_nowhere():
+    servers = ['a', 'b']
+    snapshot = make_snapshot(servers, draining=frozenset(servers))
+    strategy = ConsistentHashStrategy(vnodes=16)
+    assert strategy.choose(snapshot, InFlightCounters(servers), 'session-1') is None
@@ -0,0 +1,88 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from forecasting import FORECASTERS, horizon_spreads, local_calendar, parse_horizon
+from simple_predictor import SimpleTrafficPredictor
+
+STEPS = np.array([1, 2, 6, 60, 180, 720, 5000])
+
+
+@pytest.fixture(params=['UTC', 'Europe/Berlin', 'America/New_York', 'Asia/Kolkata'])
+def timezone(request, monkeypatch):
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_local_calendar_matches_datetime(timezone):
+    # Every 17 minutes across 2024, which includes both daylight-saving changes
+    start = datetime(2024, 1, 1).timestamp()
+    for first in np.arange(start, start + 366 * 86400, 7 * 86400):
+        timestamps = first + 1020.0 * np.arange(600) + 0.25
+        hour, weekday, minute = local_calendar(timestamps)
+        expected = [(when.hour, when.weekday(), when.minute) for when in map(datetime.fromtimestamp, timestamps)]
+        assert list(zip(hour.tolist(), weekday.tolist(), minute.tolist())) == expected
+
+
+@pytest.mark.parametrize('name', sorted(FORECASTERS))
+def test_predict_many_matches_predict(name, timezone):
+    forecaster = FORECASTERS[name]()
+    rng = np.random.default_rng(1)
+    start = datetime(2024, 3, 30).timestamp()
+    for i in range(300):
+        forecaster.update(start + 60.0 * i, 200 + 50 * np.sin(i / 20) + rng.normal(0, 5))
+
+    expected = [forecaster.predict(int(step)) for step in STEPS]
+    np.testing.assert_allclose(forecaster.predict_many(STEPS), expected, rtol=1e-9)
+
+
+def test_predict_traffic_matches_predict_next_traffic():
+    predictor = SimpleTrafficPredictor(forecasting_config={'model': 'holt_winters'})
+    assert predictor.predict_traffic(STEPS).tolist() == [predictor.default_prediction] * len(STEPS)
+    for i in range(50):
+        predictor.add_traffic_data(float(i % 7), 1000.0 + 5 * i)
+
+    # Forecasts near zero are floored at 10 either way
+    expected = [predictor.predict_next_traffic(int(step)) for step in STEPS]
+    np.testing.assert_allclose(predictor.predict_traffic(STEPS), expected)
+
+
+def test_horizon_spreads_use_only_the_recent_window():
+    rng = np.random.default_rng(2)
+    recent = 100 + np.cumsum(rng.normal(0, 1, 500))
+    values = np.concatenate([rng.normal(0, 1000, 5000), recent])
+    steps = [1, 5, 60, 2000]
+
+    np.testing.assert_allclose(horizon_spreads(values, steps, [0.05, 0.95], window=500),
+                               horizon_spreads(recent, steps, [0.05, 0.95]))
+
+
+def test_forecast_peak_is_cached_until_the_next_sample(monkeypatch):
+    predictor = SimpleTrafficPredictor(max_history=200)
+    for i in range(100):
+        predictor.add_traffic_data(100.0 + i % 7, 1000.0 + 5 * i)
+    calls = []
+    spreads = horizon_spreads
+    monkeypatch.setattr('simple_predictor.horizon_spreads', lambda *args: calls.append(args) or spreads(*args))
+
+    first = predictor.forecast_peak(300, quantile=0.95)
+    assert predictor.forecast_peak(300, quantile=0.95) == first
+    assert len(calls) == 1
+    predictor.add_traffic_data(500.0, 1500.0)
+    predictor.forecast_peak(300, quantile=0.95)
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize('text', ['nan', 'inf', '-inf', 'infs', 'nanm', '1e400', '1e300', '367d', '0', '-5m', ''])
+def test_parse_horizon_rejects_non_finite_and_non_positive(text):
+    with pytest.raises(ValueError):
+        parse_horizon(text)
+
+
+def test_parse_horizon_units():
+    assert [parse_horizon(text) for text in ('30', '30s', '5m', '1.5h', '1d')] == [30, 30, 300, 5400, 86400]
@@ -0,0 +1,54 @@
+import asyncio
+
+from health_checker import HealthChecker
+
+
+class RecordingMonitor:
+    def __init__(self):
+        self.updates = []
+
+    def bulk_update_server_metrics(self, updates, add_new=True):
+        self.updates.append(updates)
+
+
+def make_checker(monitor, **options):
+    return HealthChecker(monitor, {'good': '127.0.0.1:1', 'bad': '127.0.0.1:2'}, jitter=0.0, timeout=0.5,
+                         **options)
+
+
+def test_a_probe_raising_anything_marks_only_its_server_unhealthy():
+    async def check(host, port):
+        if port == 2:
+            raise ValueError('garbled status line')
+        return True
+
+    monitor = RecordingMonitor()
+    checker = make_checker(monitor)
+    checker.probe_http = check
+    updates = asyncio.run(checker.run_round())
+
+    assert updates['good'] == {'response_time': updates['good']['response_time'], 'error_rate': 0.0}
+    assert updates['bad'] == {'response_time': 0.5, 'error_rate': 1.0}
+
+
+def test_a_failed_round_does_not_stop_the_loop():
+    async def check(host, port):
+        return True
+
+    rounds = []
+
+    def on_round():
+        rounds.append(checker.rounds)
+        if len(rounds) == 1:
+            raise RuntimeError('listener failed')
+
+    async def run():
+        task = asyncio.ensure_future(checker.run_forever())
+        while len(rounds) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    checker = make_checker(RecordingMonitor(), interval=0.01, on_round=on_round)
+    checker.probe_http = check
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert rounds == [1, 2]
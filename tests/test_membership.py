@@ -0,0 +1,56 @@
+import os
+import shutil
+
+import pytest
+
+from predictive_balancer import PredictiveLoadBalancer
+
+CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+
+class FailingChecker:
+    """Health checker whose first `set_targets` call raises"""
+
+    def __init__(self):
+        self.calls = []
+
+    def set_targets(self, targets):
+        self.calls.append(dict(targets))
+        if len(self.calls) == 1:
+            raise RuntimeError('probe setup failed')
+
+
+@pytest.fixture
+def balancer(tmp_path, monkeypatch):
+    shutil.copy(CONFIG, tmp_path / 'config.json')
+    monkeypatch.chdir(tmp_path)
+    return PredictiveLoadBalancer(start_background_tasks=False)
+
+
+def test_a_failed_membership_change_is_undone(balancer):
+    active = balancer.pool.active
+    version = balancer.snapshot.version
+    balancer.health_checker = FailingChecker()
+
+    with pytest.raises(RuntimeError):
+        balancer.add_servers({'new1': '127.0.0.1:9100'})
+
+    assert balancer.pool.active == active
+    assert 'new1' not in balancer.health_monitor.fleet
+    assert balancer.in_flight.get('new1') == 0
+    assert balancer.snapshot.version == version
+    assert 'new1' not in balancer.health_checker.calls[-1]
+
+    balancer.add_servers({'new1': '127.0.0.1:9100'})
+    assert 'new1' in balancer.pool.active
+    assert 'new1' in balancer.snapshot.fleet.server_ids
+
+
+def test_malformed_address_changes_nothing(balancer):
+    active = balancer.pool.active
+    version = balancer.snapshot.version
+    with pytest.raises(ValueError):
+        balancer.add_servers({'new1': 'not-an-address'})
+    assert balancer.pool.active == active
+    assert balancer.snapshot.version == version
+    assert sorted(balancer.health_monitor.fleet.server_ids) == sorted(active)
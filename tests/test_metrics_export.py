@@ -0,0 +1,49 @@
+import numpy as np
+
+from fleet_metrics import METRIC_COLUMNS, FleetMetrics
+from metrics_export import Instrumentation, OpenMetricsExporter
+from routing_strategies import Router
+from snapshot import BalancerSnapshot
+
+SERVERS = ['server1', 'server2', 'server3']
+
+
+def make_snapshot(version=1, draining=frozenset()):
+    columns = {name: np.full(len(SERVERS), 0.2) for name in METRIC_COLUMNS}
+    columns['request_rate'] = np.full(len(SERVERS), 1000.0)
+    fleet = FleetMetrics(SERVERS, columns, np.ones(len(SERVERS)), {'cpu_usage': 1.0}, {'cpu_usage': 0.8})
+    return BalancerSnapshot.from_fleet(version, 100.0, 100.0, False, fleet, draining)
+
+
+def scrape(exporter, snapshot, in_flight):
+    return b''.join(exporter.render(snapshot, in_flight)).decode()
+
+
+def test_in_flight_is_rendered_on_every_scrape_of_a_snapshot():
+    instrumentation = Instrumentation()
+    router = Router({}, SERVERS, instrumentation)
+    exporter = OpenMetricsExporter(instrumentation, chunk_size=2)
+    snapshot = make_snapshot()
+
+    first = scrape(exporter, snapshot, router.in_flight)
+    router.in_flight.start('server2')
+    second = scrape(exporter, snapshot, router.in_flight)
+
+    assert 'plb_server_in_flight{server="server2"} 0\n' in first
+    assert 'plb_server_in_flight{server="server2"} 1\n' in second
+    assert second.count('plb_server_in_flight{') == len(SERVERS)
+    assert second.endswith('# EOF\n')
+
+
+def test_unroutable_decisions_are_not_counted():
+    instrumentation = Instrumentation()
+    router = Router({}, SERVERS, instrumentation)
+    snapshot = make_snapshot(draining=frozenset(SERVERS))
+
+    server_id, _ = router.choose(snapshot)
+    router.choose(make_snapshot(2))
+
+    assert server_id is None
+    assert all(key[0] is not None for key, _ in instrumentation.routes.items())
+    text = scrape(OpenMetricsExporter(instrumentation), snapshot, router.in_flight)
+    assert 'plb_routes_total{server=' in text
@@ -0,0 +1,115 @@
+import json
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from metrics_ingest import BINARY_TYPE, HEADER, SAMPLE_DTYPE, IngestError, decode_binary, encode_binary, ingest
+from server_health import ServerHealthMonitor
+
+NDJSON = 'application/x-ndjson'
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    # ServerHealthMonitor reads config.json from the working directory
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    monitor = ServerHealthMonitor()
+    monitor.bulk_update_server_metrics({'server1': {'cpu_usage': 0.1}, 'server2': {'cpu_usage': 0.1}})
+    return monitor
+
+
+def ndjson(*samples):
+    return '\n'.join(json.dumps(sample) for sample in samples).encode()
+
+
+def test_binary_round_trip_keeps_the_last_sample_per_server():
+    data = encode_binary([
+        ('server1', {'cpu_usage': 0.2}), ('server2', {'memory_usage': 0.5}), ('server1', {'cpu_usage': 0.7})
+    ])
+    server_ids, columns, count = decode_binary(data)
+    assert server_ids == ['server1', 'server2'] and count == 3
+    assert columns['cpu_usage'][0] == pytest.approx(0.7)
+    assert np.isnan(columns['cpu_usage'][1])
+    assert columns['memory_usage'][1] == pytest.approx(0.5)
+
+
+def test_empty_binary_batch():
+    server_ids, columns, count = decode_binary(encode_binary([]))
+    assert server_ids == [] and count == 0
+    assert all(len(column) == 0 for column in columns.values())
+
+
+@pytest.mark.parametrize('mangle', [
+    lambda data: data[:HEADER.size - 1],  # truncated header
+    lambda data: b'XXXX' + data[4:],  # bad magic
+    lambda data: data[:-1],  # sample section too short
+    lambda data: data[:HEADER.size] + b'\x07',  # truncated id table
+    lambda data: data[:HEADER.size] + b'\x02\xff\xfe' + data[HEADER.size + 3:],  # id not UTF-8
+    lambda data: data[:-SAMPLE_DTYPE.itemsize] + struct.pack('<H', 9) + data[2 - SAMPLE_DTYPE.itemsize:],  # bad index
+])
+def test_malformed_binary_frames_are_rejected(mangle):
+    data = encode_binary([('s1', {'cpu_usage': 0.2})])
+    with pytest.raises(IngestError):
+        decode_binary(mangle(data))
+
+
+@pytest.mark.parametrize('value', [float('nan'), float('inf'), float('-inf')])
+def test_non_finite_binary_metrics_are_rejected(value):
+    with pytest.raises(IngestError):
+        decode_binary(encode_binary([('server1', {'cpu_usage': value})]))
+
+
+@pytest.mark.parametrize('line', [
+    b'{"server": "server1", "cpu_usage": NaN}',
+    b'{"server": "server1", "cpu_usage": Infinity}',
+    b'{"server": "server1", "cpu_usage": "-inf"}',
+    b'{"server": ["server1"], "cpu_usage": 0.5}',
+    b'{"server": 1, "cpu_usage": 0.5}',
+    b'["server1"]',
+    b'{"cpu_usage": 0.5}',
+    b'not json',
+])
+def test_malformed_json_lines_are_rejected(monitor, line):
+    with pytest.raises(IngestError):
+        ingest(monitor, line, NDJSON, ['server1'])
+    assert monitor.fleet.as_dicts['server1']['cpu_usage'] == 0.1
+
+
+def test_unknown_servers_are_reported(monitor):
+    summary = ingest(monitor, ndjson({'server': 'server1', 'cpu_usage': 0.3}, {'server': 'ghost'}), NDJSON,
+                     ['server1', 'server2'])
+    assert summary == {'samples': 2, 'servers_updated': 1, 'unknown_servers': ['ghost']}
+    assert monitor.fleet.as_dicts['server1']['cpu_usage'] == 0.3
+
+
+@pytest.mark.parametrize('content_type', [NDJSON, BINARY_TYPE])
+def test_server_removed_after_the_membership_read_is_not_revived(monitor, content_type):
+    samples = [('server1', {'cpu_usage': 0.4}), ('server2', {'cpu_usage': 0.4})]
+    if content_type == NDJSON:
+        data = ndjson(*({'server': server_id, **metrics} for server_id, metrics in samples))
+    else:
+        data = encode_binary(samples)
+    members = ['server1', 'server2']
+    monitor.remove_servers(['server2'])
+
+    summary = ingest(monitor, data, content_type, members)
+    assert summary['servers_updated'] == 1
+    assert summary['unknown_servers'] == ['server2']
+    assert 'server2' not in monitor.fleet
+    assert monitor.fleet.as_dicts['server1']['cpu_usage'] == pytest.approx(0.4)
+
+
+def test_unsupported_content_type(monitor):
+    with pytest.raises(IngestError):
+        ingest(monitor, b'', 'text/csv', [])
+
+
+def test_non_finite_values_outside_the_field_mask_are_ignored():
+    data = bytearray(encode_binary([('server1', {'cpu_usage': 0.2})]))
+    # memory_usage (bit 1) is not in the mask; its slot holds NaN
+    struct.pack_into('<f', data, len(data) - SAMPLE_DTYPE.itemsize + 4 + 4, float('nan'))
+    _, columns, _ = decode_binary(bytes(data))
+    assert columns['cpu_usage'][0] == pytest.approx(0.2)
+    assert np.isnan(columns['memory_usage'][0])
@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from proxy import ReverseProxy
+from routing_strategies import InFlightCounters
+
+
+class FakeBalancer:
+    """Routes everything to 'up' and records the reported outcomes"""
+
+    def __init__(self):
+        self.removal_listeners = []
+        self.in_flight = InFlightCounters(['up'])
+        self.outcomes = []
+        self.pool = self
+
+    def address(self, server_id):
+        return None
+
+    def choose_server(self, path, key=None):
+        return 'up', 'predictive_load_balancing'
+
+    def breaker_epoch(self, server_id):
+        return None
+
+    def record_outcome(self, server_id, ok, latency, epoch=None):
+        self.outcomes.append((server_id, ok))
+
+
+async def exchange(upstream_handler, request, **options):
+    """Send `request` through a proxy in front of `upstream_handler`; returns (response bytes, balancer)"""
+    upstream = await asyncio.start_server(upstream_handler, '127.0.0.1', 0)
+    upstream_port = upstream.sockets[0].getsockname()[1]
+    balancer = FakeBalancer()
+    proxy = ReverseProxy(balancer, {'up': f'127.0.0.1:{upstream_port}'}, **options)
+    server = await proxy.start('127.0.0.1', 0)
+    reader, writer = await asyncio.open_connection('127.0.0.1', server.sockets[0].getsockname()[1])
+    writer.write(request)
+    response = await asyncio.wait_for(reader.read(), 5)
+    writer.close()
+    proxy.close()
+    server.close()
+    upstream.close()
+    return response, balancer
+
+
+def test_silent_upstream_times_out_with_504():
+    async def silent(reader, writer):
+        await reader.readuntil(b'\r\n\r\n')
+        await asyncio.sleep(5)
+
+    response, balancer = asyncio.run(exchange(silent, b'GET / HTTP/1.1\r\nHost: x\r\n\r\n', read_timeout=0.2))
+    assert response.startswith(b'HTTP/1.1 504 ')
+    assert balancer.outcomes == [('up', False)]
+
+
+async def chunked(reader, writer):
+    await reader.readuntil(b'\r\n\r\n')
+    writer.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+                 b'5\r\nhello\r\n7;ext=1\r\n, world\r\n0\r\nX-Trailer: 1\r\n\r\n')
+    await writer.drain()
+
+
+def test_chunked_response_is_dechunked_for_http10_clients():
+    response, _ = asyncio.run(exchange(chunked, b'GET / HTTP/1.0\r\n\r\n'))
+    head, body = response.split(b'\r\n\r\n', 1)
+
+    assert b'transfer-encoding' not in head.lower()
+    assert b'Connection: close' in head
+    assert body == b'hello, world'
+
+
+def test_chunked_response_is_relayed_verbatim_to_http11_clients():
+    response, _ = asyncio.run(exchange(chunked, b'GET / HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n'))
+    head, body = response.split(b'\r\n\r\n', 1)
+
+    assert b'Transfer-Encoding: chunked' in head
+    assert body == b'5\r\nhello\r\n7;ext=1\r\n, world\r\n0\r\nX-Trailer: 1\r\n\r\n'
+
+
+def test_upstream_stalling_mid_body_closes_the_client():
+    async def stalls(reader, writer):
+        await reader.readuntil(b'\r\n\r\n')
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\nabc')
+        await writer.drain()
+        await asyncio.sleep(5)
+
+    response, balancer = asyncio.run(exchange(stalls, b'GET / HTTP/1.1\r\nHost: x\r\n\r\n', read_timeout=0.2))
+    assert response.startswith(b'HTTP/1.1 200 ')
+    assert response.endswith(b'\r\n\r\nabc')
+    assert balancer.outcomes == [('up', True)]
+
+
+def test_content_length_is_not_forwarded_with_chunked_framing():
+    received = []
+
+    async def echo(reader, writer):
+        head = await reader.readuntil(b'\r\n\r\n')
+        received.append(head + await reader.readuntil(b'0\r\n\r\n'))
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n')
+        await writer.drain()
+
+    request = (b'POST / HTTP/1.1\r\nHost: x\r\nContent-Length: 3\r\nTransfer-Encoding: chunked\r\n'
+               b'Connection: close\r\n\r\n5\r\nhello\r\n0\r\n\r\n')
+    response, _ = asyncio.run(exchange(echo, request))
+    assert response.startswith(b'HTTP/1.1 200 ')
+    head, body = received[0].split(b'\r\n\r\n', 1)
+    assert b'content-length' not in head.lower()
+    assert b'Transfer-Encoding: chunked' in head
+    assert body == b'5\r\nhello\r\n0\r\n\r\n'
+
+
+@pytest.mark.parametrize('framing', [
+    b'Content-Length: 3\r\nContent-Length: 4\r\n',
+    b'Content-Length: 3, 4\r\n',
+    b'Content-Length: -1\r\n',
+    b'Content-Length: +3\r\n',
+    b'Transfer-Encoding: chunked, gzip\r\n',
+])
+def test_ambiguous_request_framing_is_rejected(framing):
+    async def unreachable(reader, writer):
+        raise AssertionError('request should not be forwarded')
+
+    response, balancer = asyncio.run(exchange(unreachable, b'POST / HTTP/1.1\r\nHost: x\r\n' + framing + b'\r\nabc'))
+    assert response.startswith(b'HTTP/1.1 400 ')
+    assert balancer.outcomes == []
+
+
+def test_repeated_equal_content_length_is_accepted():
+    async def ok(reader, writer):
+        await reader.readuntil(b'\r\n\r\n')
+        assert await reader.readexactly(3) == b'abc'
+        writer.write(b'HTTP/1.1 204 No Content\r\n\r\n')
+        await writer.drain()
+
+    request = b'POST / HTTP/1.1\r\nHost: x\r\nContent-Length: 3\r\nContent-Length: 3\r\nConnection: close\r\n\r\nabc'
+    response, _ = asyncio.run(exchange(ok, request))
+    assert response.startswith(b'HTTP/1.1 204 ')
+
+
+def test_malformed_member_address_answers_502():
+    async def run():
+        balancer = FakeBalancer()
+        balancer.address = lambda server_id: 'no-port-here'
+        proxy = ReverseProxy(balancer, {})
+        server = await proxy.start('127.0.0.1', 0)
+        responses = []
+        for _ in range(2):
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.sockets[0].getsockname()[1])
+            writer.write(b'GET / HTTP/1.1\r\nHost: x\r\n\r\n')
+            responses.append(await asyncio.wait_for(reader.read(), 5))
+            writer.close()
+        proxy.close()
+        server.close()
+        return responses
+
+    for response in asyncio.run(run()):
+        assert response.startswith(b'HTTP/1.1 502 ')
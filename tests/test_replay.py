@@ -0,0 +1,47 @@
+import json
+import os
+
+import pytest
+
+from replay import RESYNC_RECORDS, LogReplayer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    with open(os.path.join(ROOT, 'config.json')) as f:
+        config = json.load(f)
+    # Everything must come from the config passed in, not ./config.json
+    monkeypatch.chdir(tmp_path)
+    return config
+
+
+def requests(start, count, spacing=0.5):
+    return [(start + i * spacing, '/', 0.01, 200) for i in range(count)]
+
+
+def test_one_millisecond_timestamp_is_skipped(config):
+    replayer = LogReplayer(config, interval=5.0)
+    records = requests(1700000000.0, 20) + [(1700000010000.0, '/', 0.01, 200)] + requests(1700000010.0, 20)
+    replayer.run(records)
+
+    assert replayer.stats.requests == 40
+    assert replayer.stats.outliers == 1
+    assert replayer.stats.ticks == 4
+
+
+def test_a_real_jump_in_the_log_is_followed(config):
+    replayer = LogReplayer(config, interval=5.0, max_gap=60.0)
+    replayer.run(requests(1700000000.0, 20) + requests(1700090000.0, RESYNC_RECORDS + 10))
+
+    # The first RESYNC_RECORDS - 1 lines after the jump are taken for outliers
+    assert replayer.stats.outliers == RESYNC_RECORDS - 1
+    assert replayer.stats.requests == 20 + 11
+    assert replayer.stats.ticks == 2 + 2
+
+
+def test_health_thresholds_come_from_the_config(config):
+    config['overload_thresholds'] = {**config['overload_thresholds'], 'cpu_usage': 0.01}
+    replayer = LogReplayer(config)
+    assert replayer.health_monitor.fleet.thresholds['cpu_usage'] == 0.01
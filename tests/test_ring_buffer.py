@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from ring_buffer import TrafficRingBuffer
+
+
+def filled(capacity, count):
+    buffer = TrafficRingBuffer(capacity)
+    for i in range(count):
+        buffer.append(1000.0 + i, float(i))
+    return buffer
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        TrafficRingBuffer(0)
+
+
+def test_empty_buffer():
+    buffer = TrafficRingBuffer(4)
+    assert len(buffer) == 0
+    assert buffer.latest() is None
+    assert buffer.window_sum(3) == 0.0
+    assert buffer.window_mean(3) == 0.0
+    assert buffer.last_values().tolist() == []
+
+
+@pytest.mark.parametrize('count', [1, 3, 5, 8, 11, 16, 23])
+def test_wrapping_keeps_the_newest_samples_in_order(count):
+    buffer = filled(5, count)
+    kept = list(range(max(0, count - 5), count))
+
+    assert len(buffer) == len(kept)
+    assert buffer.appended == count
+    assert buffer.latest() == (1000.0 + count - 1, float(count - 1))
+    assert buffer.last_values().tolist() == kept
+    assert buffer.last_timestamps().tolist() == [1000.0 + i for i in kept]
+    assert buffer.last_values(2).tolist() == kept[-2:]
+    assert buffer.last_values(100).tolist() == kept
+
+
+@pytest.mark.parametrize('count', [1, 4, 5, 9, 17])
+def test_window_sum_and_mean_match_the_last_values(count):
+    buffer = filled(5, count)
+    for size in range(0, 8):
+        values = buffer.last_values(size) if size else np.array([])
+        assert buffer.window_sum(size) == pytest.approx(values.sum())
+        assert buffer.window_mean(size) == pytest.approx(values.mean() if size else 0.0)
+
+
+def test_clear_forgets_everything():
+    buffer = filled(3, 7)
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.appended == 0
+    buffer.append(1.0, 42.0)
+    assert buffer.last_values().tolist() == [42.0]
+    assert buffer.window_sum(5) == 42.0
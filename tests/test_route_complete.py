@@ -0,0 +1,60 @@
+import importlib
+import os
+import shutil
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    # load_balancer builds its balancer from ./config.json on import
+    directory = tmp_path_factory.mktemp('app')
+    shutil.copy(os.path.join(ROOT, 'config.json'), directory / 'config.json')
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        module = importlib.import_module('load_balancer')
+    finally:
+        os.chdir(cwd)
+    return module.app.test_client()
+
+
+def route(client):
+    return client.get('/route').get_json()['token']
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'token', 7])
+def test_non_object_body_is_rejected(client, body):
+    token = route(client)
+    response = client.post('/route/complete', json=body)
+    assert response.status_code == 400
+    # The token was not used up by the rejected call
+    assert client.post('/route/complete', json={'token': token}).status_code == 200
+
+
+def test_token_completes_once(client):
+    token = route(client)
+    assert client.post('/route/complete', json={'token': token, 'status': 200}).status_code == 200
+    assert client.post('/route/complete', json={'token': token}).status_code == 409
+
+
+@pytest.mark.parametrize('outcome', [
+    {'status': 500, 'latency': 'slow'},
+    {'status': 500, 'latency': [1]},
+    {'status': 500, 'latency': 'nan'},
+    {'status': 500, 'latency': 'inf'},
+    {'status': 500, 'latency': -1},
+    {'status': 'broken'},
+])
+def test_malformed_outcomes_are_rejected(client, outcome):
+    token = route(client)
+    assert client.post('/route/complete', json={'token': token, **outcome}).status_code == 400
+    assert client.post('/route/complete', json={'token': token}).status_code == 200
+
+
+def test_outcome_in_query_string_is_accepted(client):
+    token = route(client)
+    response = client.post(f'/route/complete?token={token}&status=503&latency=0.25')
+    assert response.status_code == 200
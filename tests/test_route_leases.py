@@ -0,0 +1,65 @@
+from routing_strategies import InFlightCounters, RouteLeases
+
+
+def make_leases(ttl=10.0):
+    in_flight = InFlightCounters(['server1', 'server2'])
+    return in_flight, RouteLeases(in_flight, ttl)
+
+
+def test_issue_and_complete_balance_in_flight():
+    in_flight, leases = make_leases()
+    token = leases.issue('server1', now=0.0)
+    assert in_flight.get('server1') == 1
+
+    assert leases.complete(token, now=2.5) == ('server1', 2.5, None)
+    assert in_flight.get('server1') == 0
+    assert len(leases) == 0
+
+
+def test_unknown_and_repeated_tokens_are_rejected():
+    in_flight, leases = make_leases()
+    token = leases.issue('server1', now=0.0)
+    leases.issue('server1', now=0.0)
+
+    assert leases.complete('not-a-token', now=1.0) is None
+    assert leases.complete(token, now=1.0) is not None
+    assert leases.complete(token, now=1.0) is None
+    # The other request on server1 is still counted
+    assert in_flight.get('server1') == 1
+
+
+def test_leases_expire_after_ttl():
+    in_flight, leases = make_leases(ttl=10.0)
+    old = leases.issue('server1', now=0.0)
+    leases.issue('server2', now=5.0)
+
+    assert leases.expire(now=9.9) == 0
+    assert leases.expire(now=10.0) == 1
+    assert in_flight.get('server1') == 0
+    assert in_flight.get('server2') == 1
+    assert leases.complete(old, now=10.0) is None
+    assert leases.expired == 1
+
+
+def test_issuing_expires_stale_leases():
+    in_flight, leases = make_leases(ttl=1.0)
+    for _ in range(3):
+        leases.issue('server1', now=0.0)
+    leases.issue('server2', now=5.0)
+    assert in_flight.get('server1') == 0
+    assert len(leases) == 1
+
+
+def test_completion_after_server_removal_is_ignored():
+    in_flight, leases = make_leases()
+    token = leases.issue('server1', now=0.0)
+    in_flight.remove_server('server1')
+    assert leases.complete(token, now=1.0) == ('server1', 1.0, None)
+    assert in_flight.get('server1') == 0
+    assert in_flight.total() == 0
+
+
+def test_tags_come_back_on_completion():
+    _, leases = make_leases()
+    token = leases.issue('server2', now=0.0, tag=3)
+    assert leases.complete(token, now=0.5) == ('server2', 0.5, 3)
@@ -0,0 +1,89 @@
+import json
+import os
+
+import pytest
+
+from server_pool import ServerListWatcher, ServerPool, read_server_list
+
+
+@pytest.mark.parametrize('server_id', ['web/1', '../x', '', '.hidden', 'a' * 65, 'has space', 7, None])
+def test_malformed_ids_are_rejected(server_id):
+    pool = ServerPool(['server1'])
+    with pytest.raises(ValueError):
+        pool.add({server_id: None})
+    with pytest.raises(ValueError):
+        pool.sync({'server1': None, server_id: None})
+    assert pool.active == ('server1',)
+    assert not pool.draining
+
+
+def test_well_formed_ids_are_accepted():
+    pool = ServerPool()
+    change = pool.add({'api-2.eu_west': '10.0.0.2:80', 'host:8080': None, 'a' * 64: None})
+    assert len(change.added) == 3
+
+
+def test_config_ids_are_validated():
+    with pytest.raises(ValueError):
+        ServerPool(['server1', 'web/1'])
+
+
+@pytest.mark.parametrize('address', [9001, 'localhost', ':80', 'host:', 'host:http', 'host:0', 'host:65536',
+                                     'host:-1', 'host:²'])
+def test_malformed_addresses_are_rejected(address):
+    pool = ServerPool(['server1'])
+    with pytest.raises(ValueError):
+        pool.add({'server2': address})
+    with pytest.raises(ValueError):
+        pool.add({'server1': address})
+    assert pool.active == ('server1',)
+    assert pool.address('server1') is None
+
+
+def test_well_formed_addresses_are_accepted():
+    pool = ServerPool()
+    pool.add({'a': '10.0.0.1:1', 'b': 'backend.internal:65535', 'c': '[::1]:8080'})
+    assert pool.address('c') == '[::1]:8080'
+
+
+def test_read_server_list_rejects_bad_ids(tmp_path):
+    path = tmp_path / 'servers.json'
+    path.write_text(json.dumps({'servers': ['server1', '../x']}))
+    with pytest.raises(ValueError):
+        read_server_list(str(path))
+    path.write_text(json.dumps({'server1': '127.0.0.1:9001'}))
+    assert read_server_list(str(path)) == {'server1': '127.0.0.1:9001'}
+
+
+def test_watcher_survives_a_failing_on_change(tmp_path):
+    path = tmp_path / 'servers.json'
+    path.write_text('{}')
+    calls = []
+
+    def on_change(servers):
+        calls.append(servers)
+        if len(calls) == 1:
+            raise RuntimeError('boom')
+
+    watcher = ServerListWatcher(str(path), on_change)
+    for mtime, servers in ((10, {'server1': None}), (20, {'server2': None})):
+        path.write_text(json.dumps(servers))
+        os.utime(path, ns=(mtime * 10**9, mtime * 10**9))
+        watcher.check()
+    assert calls == [{'server1': None}, {'server2': None}]
+
+
+def test_max_members_refuses_growth_past_the_limit():
+    pool = ServerPool(['server1', 'server2'], max_members=3)
+    with pytest.raises(ValueError):
+        pool.add({'server3': None, 'server4': None})
+    assert pool.active == ('server1', 'server2')
+
+    pool.add({'server3': None})
+    # Re-adding or re-addressing existing members is not growth
+    pool.add({'server1': '10.0.0.1:80'})
+    pool.drain(['server3'])
+    with pytest.raises(ValueError):
+        pool.add({'server4': None})  # server3 still counts while draining
+    pool.add({'server3': None})
+    assert len(pool.active) == 3
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from fleet_metrics import DEFAULT_HEALTH_WEIGHTS, METRIC_COLUMNS, FleetMetrics
+from ring_buffer import TrafficRingBuffer
+from shared_state import SLOTS, SharedStateReader, SharedStateWriter
+from snapshot import BalancerSnapshot
+
+SERVERS = ['server1', 'server2']
+THRESHOLDS = {'cpu_usage': 0.8}
+
+
+def make_snapshot(version, cpu):
+    columns = {name: np.full(len(SERVERS), 0.2) for name in METRIC_COLUMNS}
+    columns['cpu_usage'] = np.full(len(SERVERS), cpu)
+    fleet = FleetMetrics(SERVERS, columns, np.full(len(SERVERS), float(version)), DEFAULT_HEALTH_WEIGHTS, THRESHOLDS)
+    return BalancerSnapshot.from_fleet(version, 100.0, 100.0, False, fleet)
+
+
+@pytest.fixture
+def shared():
+    writer = SharedStateWriter(max_servers=4, history_capacity=8)
+    reader = SharedStateReader(writer.name, {}, SERVERS, DEFAULT_HEALTH_WEIGHTS, THRESHOLDS)
+    yield writer, reader
+    reader.shm.close()
+    writer.close()
+
+
+def test_held_snapshot_survives_slot_reuse(shared):
+    writer, reader = shared
+    history = TrafficRingBuffer(8)
+    writer.publish(make_snapshot(1, 0.1), history)
+    held = reader.snapshot
+    for version in range(2, 2 + SLOTS + 1):
+        writer.publish(make_snapshot(version, 0.9), history)
+
+    assert reader.snapshot.version == SLOTS + 2
+    assert held.version == 1
+    assert held.fleet.columns['cpu_usage'].tolist() == [0.1, 0.1]
+    assert held.fleet.last_update.tolist() == [1.0, 1.0]
+    assert held.fleet.as_dicts['server1']['cpu_usage'] == 0.1
+
+
+def test_traffic_history_is_a_copy(shared):
+    writer, reader = shared
+    history = TrafficRingBuffer(8)
+    for i in range(3):
+        history.append(float(i), 10.0 * i)
+    writer.publish(make_snapshot(1, 0.1), history)
+    _, values = reader.traffic_history()
+    for version in range(2, 2 + SLOTS):
+        # Wrap the ring so the slots' history arrays are fully rewritten
+        for i in range(history.capacity):
+            history.append(float(version * 100 + i), 99.0)
+        writer.publish(make_snapshot(version, 0.1), history)
+    assert values.tolist() == [0.0, 10.0, 20.0]
+
+
+def test_fleet_larger_than_the_segment_is_refused(shared):
+    writer, _ = shared
+    columns = {name: np.zeros(5) for name in METRIC_COLUMNS}
+    fleet = FleetMetrics([f's{i}' for i in range(5)], columns, np.zeros(5), DEFAULT_HEALTH_WEIGHTS, THRESHOLDS)
+    with pytest.raises(ValueError):
+        writer.publish(BalancerSnapshot.from_fleet(1, 0.0, 0.0, False, fleet))
@@ -0,0 +1,27 @@
+from simple_predictor import SimpleTrafficPredictor
+
+
+def make_predictor(samples=40):
+    predictor = SimpleTrafficPredictor(max_history=50, anomaly_config={'warmup': 10})
+    for i in range(samples):
+        predictor.add_traffic_data(100.0 + (i % 5), 1000.0 + 5 * i)
+    return predictor
+
+
+def test_spike_verdict_is_kept_for_the_latest_sample():
+    predictor = make_predictor()
+    predictor.add_traffic_data(1000.0, 1500.0)
+
+    assert predictor.last_anomaly[1] > 0
+    assert predictor.detect_spike(1000.0, predictor.traffic_history.appended)
+    assert not predictor.detect_spike(101.0)
+
+
+def test_equal_traffic_that_is_not_the_sample_is_scored_again():
+    predictor = make_predictor()
+    # Pretend the latest sample (104.0) was flagged when it was added
+    predictor.last_anomaly = (9.0, 1, 0)
+
+    assert predictor.detect_spike(104.0, predictor.traffic_history.appended)
+    assert not predictor.detect_spike(104.0)
+    assert not predictor.detect_spike(104.0, predictor.traffic_history.appended - 1)
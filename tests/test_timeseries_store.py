@@ -0,0 +1,61 @@
+import importlib
+import os
+import sys
+import types
+
+import numpy as np
+
+import timeseries_store
+from fleet_metrics import METRIC_COLUMNS, FleetMetrics
+from timeseries_store import TimeSeriesStore, server_series_name
+
+
+def make_fleet(server_ids, timestamp=1.0):
+    columns = {name: np.full(len(server_ids), 0.2) for name in METRIC_COLUMNS}
+    return FleetMetrics(
+        server_ids, columns, np.full(len(server_ids), timestamp), {'cpu_usage': 1.0}, {'cpu_usage': 0.8}
+    )
+
+
+def test_server_ids_are_encoded_into_one_file_name(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / 'history'))
+    store.record_fleet(make_fleet(['web/1', '../x', 'server1']))
+    store.close()
+
+    assert sorted(os.listdir(tmp_path)) == ['history']
+    names = os.listdir(tmp_path / 'history')
+    assert 'server-web%2F1.raw' in names
+    assert 'server-..%2Fx.raw' in names
+    assert 'server-server1.raw' in names
+
+
+def test_plain_ids_keep_their_file_names():
+    assert server_series_name('server1') == 'server-server1'
+    assert server_series_name('api-2.eu_west') == 'server-api-2.eu_west'
+
+
+def test_reopened_store_reads_encoded_series(tmp_path):
+    store = TimeSeriesStore(str(tmp_path))
+    store.record_fleet(make_fleet(['web/1'], timestamp=5.0))
+    store.release_servers(['web/1'])
+    timestamps, _ = store.server('web/1').tail(10)
+    store.close()
+    assert timestamps.tolist() == [5.0]
+
+
+def test_store_works_without_fcntl(tmp_path, monkeypatch):
+    locked = []
+    msvcrt = types.ModuleType('msvcrt')
+    msvcrt.LK_NBLCK = 2
+    msvcrt.locking = lambda fd, mode, size: locked.append((mode, size))
+    monkeypatch.setitem(sys.modules, 'fcntl', None)
+    monkeypatch.setitem(sys.modules, 'msvcrt', msvcrt)
+    try:
+        module = importlib.reload(timeseries_store)
+        store = module.TimeSeriesStore(str(tmp_path))
+        assert store.writable
+        assert locked == [(2, 1)]
+        store.close()
+    finally:
+        monkeypatch.undo()
+        importlib.reload(timeseries_store)
@@ -0,0 +1,40 @@
+import random
+from collections import Counter
+
+import pytest
+
+from weighted_selector import AliasTable
+
+
+def frequencies(table, picks=100000):
+    counts = Counter(table.pick() for _ in range(picks))
+    return {item: count / picks for item, count in counts.items()}
+
+
+def test_empty_table_picks_nothing():
+    table = AliasTable([], [])
+    assert len(table) == 0
+    assert table.pick() is None
+
+
+@pytest.mark.parametrize('weights', [[1, 2, 3, 4], [10, 0.5, 0.5, 0.01], [5, 5, 5, 5], [0, 3, 0, 1]])
+def test_picks_follow_the_weights(weights):
+    table = AliasTable('abcd', weights, random.Random(7))
+    total = sum(weights)
+    seen = frequencies(table)
+    for item, weight in zip('abcd', weights):
+        assert seen.get(item, 0.0) == pytest.approx(weight / total, abs=0.01)
+        if not weight:
+            assert item not in seen
+
+
+def test_all_zero_or_negative_weights_pick_uniformly():
+    table = AliasTable('abc', [0, -1, 0], random.Random(7))
+    seen = frequencies(table)
+    assert set(seen) == set('abc')
+    assert all(share == pytest.approx(1 / 3, abs=0.01) for share in seen.values())
+
+
+def test_single_item_is_always_picked():
+    table = AliasTable(['only'], [0.3], random.Random(7))
+    assert {table.pick() for _ in range(100)} == {'only'}
@@ -0,0 +1,359 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+from fleet_metrics import METRIC_COLUMNS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Every file: a 32-byte header (magic, record size, record count, reserved)
+# followed by fixed-size records. The count is written after the record, so
+# a crash mid-append leaves at most one unused record past the end.
+MAGIC = b'PLBTS001'
+HEADER = struct.Struct('<8sQQ8x')
+COUNT_OFFSET = 16
+INITIAL_CAPACITY = 1024
+
+# Rollup resolutions: label -> bucket width in seconds
+ROLLUPS = {'1s': 1, '1m': 60, '1h': 3600}
+
+DEFAULT_RETENTION = {'raw': 86400, '1s': 7 * 86400, '1m': 90 * 86400, '1h': None}
+
+
+def raw_dtype(width):
+    return np.dtype([('ts', '<f8'), ('values', '<f8', (width,))])
+
+
+def rollup_dtype(width):
+    return np.dtype([
+        ('ts', '<f8'), ('count', '<f8'),
+        ('sum', '<f8', (width,)), ('min', '<f8', (width,)), ('max', '<f8', (width,))
+    ])
+
+
+def try_lock(file):
+    """Take an exclusive lock on `file` without waiting; False if another process holds it"""
+    if fcntl is not None:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+    file.seek(0)
+    try:
+        msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+    except PermissionError:  # held by another process
+        return False
+    return True
+
+
+def server_series_name(server_id):
+    """Series name for a server; the id is percent-encoded so any id is one plain file name"""
+    return 'server-' + quote(str(server_id), safe='')
+
+
+class MappedArray:
+    """Append-only file of fixed-size NumPy records, memory-mapped.
+
+    Opening a file maps it and reads the 32-byte header, so the cost does not
+    depend on how many records it holds. The file doubles in size when full.
+    Reads return copies, so the mapping can be grown or replaced at any time.
+    """
+
+    def __init__(self, path, dtype, writable=True):
+        self.path = path
+        self.dtype = dtype
+        self.writable = writable
+        if not os.path.exists(path):
+            if not writable:
+                raise FileNotFoundError(path)
+            with open(path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, dtype.itemsize, 0))
+                f.truncate(HEADER.size + INITIAL_CAPACITY * dtype.itemsize)
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'r+b' if self.writable else 'rb')
+        self._mm = mmap.mmap(
+            self._file.fileno(), 0, access=mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ
+        )
+        magic, record_size, self.count = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or record_size != self.dtype.itemsize:
+            raise ValueError(f'{self.path} is not a time-series file with this record layout')
+        self.capacity = (len(self._mm) - HEADER.size) // self.dtype.itemsize
+        self.records = np.ndarray(self.capacity, dtype=self.dtype, buffer=self._mm, offset=HEADER.size)
+        # Records past the count may be a half-written append from a crash
+        self.count = min(self.count, self.capacity)
+
+    def _close(self):
+        del self.records
+        self._mm.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def _set_count(self, count):
+        self.count = count
+        struct.pack_into('<Q', self._mm, COUNT_OFFSET, count)
+
+    def _reserve(self, extra):
+        if self.count + extra <= self.capacity:
+            return
+        capacity = max(self.capacity * 2, self.count + extra)
+        self._close()
+        with open(self.path, 'r+b') as f:
+            f.truncate(HEADER.size + capacity * self.dtype.itemsize)
+        self._open()
+
+    def extend(self, records):
+        self._reserve(len(records))
+        self.records[self.count:self.count + len(records)] = records
+        self._set_count(self.count + len(records))
+
+    def last(self):
+        """Copy of the last record, or None if empty"""
+        return self.records[self.count - 1].copy() if self.count else None
+
+    def replace_last(self, record):
+        self.records[self.count - 1] = record
+
+    def tail(self, n):
+        """Copy of the last `n` records"""
+        if not self.writable:
+            self.refresh()
+        return self.records[max(0, self.count - n):self.count].copy()
+
+    def between(self, start, end):
+        """Copy of the records with start <= ts < end (timestamps are ascending)"""
+        if not self.writable:
+            self.refresh()
+        ts = self.records['ts'][:self.count]
+        lo, hi = np.searchsorted(ts, [start, end])
+        return self.records[lo:hi].copy()
+
+    def drop_before(self, cutoff):
+        """Rewrite the file without records older than `cutoff`; returns how many were dropped"""
+        first = int(np.searchsorted(self.records['ts'][:self.count], cutoff))
+        if first == 0:
+            return 0
+        kept = self.records[first:self.count].copy()
+        tmp_path = self.path + '.compact'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.dtype.itemsize, len(kept)))
+            f.write(kept.tobytes())
+            f.truncate(HEADER.size + max(INITIAL_CAPACITY, 2 * len(kept)) * self.dtype.itemsize)
+            f.flush()
+            os.fsync(f.fileno())
+        self._close()
+        os.replace(tmp_path, self.path)
+        self._open()
+        return first
+
+    def flush(self):
+        self._mm.flush()
+
+    def refresh(self):
+        """Read-only mappings: pick up appends, growth and compaction by the writer"""
+        if os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino:
+            self._close()
+            self._open()
+            return
+        (count,) = struct.unpack_from('<Q', self._mm, COUNT_OFFSET)
+        if count > self.capacity:
+            self._close()
+            self._open()
+        else:
+            self.count = count
+
+    def close(self):
+        if self.writable:
+            self.flush()
+        self._close()
+
+
+class TimeSeries:
+    """One named series: raw samples plus 1s / 1m / 1h rollups (count, sum, min, max per field)"""
+
+    def __init__(self, directory, name, fields, writable=True):
+        self.name = name
+        self.fields = tuple(fields)
+        width = len(self.fields)
+        self.raw = MappedArray(os.path.join(directory, f'{name}.raw'), raw_dtype(width), writable)
+        self.rollups = {
+            label: MappedArray(os.path.join(directory, f'{name}.{label}'), rollup_dtype(width), writable)
+            for label in ROLLUPS
+        }
+
+    def extend(self, timestamps, values):
+        """Append samples (ascending timestamps, values shaped (n, fields)) and update every rollup"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64).reshape(len(timestamps), len(self.fields))
+        if not len(timestamps):
+            return
+        records = np.empty(len(timestamps), dtype=self.raw.dtype)
+        records['ts'] = timestamps
+        records['values'] = values
+        self.raw.extend(records)
+
+        for label, seconds in ROLLUPS.items():
+            rollup = self.rollups[label]
+            buckets = np.floor(timestamps / seconds) * seconds
+            # Samples older than the open bucket are folded into it rather than reopening history
+            last = rollup.last()
+            if last is not None:
+                buckets = np.maximum(buckets, last['ts'])
+            starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            new = np.empty(len(starts), dtype=rollup.dtype)
+            new['ts'] = buckets[starts]
+            new['count'] = np.diff(np.r_[starts, len(buckets)])
+            new['sum'] = np.add.reduceat(values, starts, axis=0)
+            new['min'] = np.minimum.reduceat(values, starts, axis=0)
+            new['max'] = np.maximum.reduceat(values, starts, axis=0)
+            if last is not None and new['ts'][0] == last['ts']:
+                merged = new[0].copy()
+                merged['count'] += last['count']
+                merged['sum'] += last['sum']
+                merged['min'] = np.minimum(merged['min'], last['min'])
+                merged['max'] = np.maximum(merged['max'], last['max'])
+                rollup.replace_last(merged)
+                new = new[1:]
+            rollup.extend(new)
+
+    def append(self, timestamp, values):
+        self.extend([timestamp], [values])
+
+    def tail(self, n):
+        """Last `n` raw samples as (timestamps, values)"""
+        records = self.raw.tail(n)
+        return records['ts'], records['values']
+
+    def between(self, start, end, resolution='raw'):
+        """Records in [start, end) from the raw file or one of the rollups"""
+        source = self.raw if resolution == 'raw' else self.rollups[resolution]
+        return source.between(start, end)
+
+    def compact(self, now, retention):
+        """Drop records older than each resolution's retention (None keeps everything)"""
+        dropped = 0
+        for label, source in (('raw', self.raw), *self.rollups.items()):
+            if retention.get(label) is not None:
+                dropped += source.drop_before(now - retention[label])
+        return dropped
+
+    def flush(self):
+        for source in (self.raw, *self.rollups.values()):
+            source.flush()
+
+    def close(self):
+        for source in (self.raw, *self.rollups.values()):
+            source.close()
+
+
+class TimeSeriesStore:
+    """On-disk history of traffic and per-server metrics.
+
+    Holds a 'traffic' series and one 'server-<id>' series per server (the id
+    percent-encoded), each a set of append-only memory-mapped files. Only one
+    process may write a store; a second opener gets a read-only view (used by
+    the Flask reloader and by tools inspecting a running balancer's history).
+    """
+
+    def __init__(self, directory, retention=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.retention = {**DEFAULT_RETENTION, **(retention or {})}
+        self.lock = threading.Lock()
+        self._lock_file = open(os.path.join(directory, '.lock'), 'a')
+        self.writable = try_lock(self._lock_file)
+        if not self.writable:
+            print(f"⚠️ History store {directory} is in use by another process; opening it read-only")
+        self._series = {}
+        self._last_fleet = None
+        self._last_recorded = {}  # server id -> timestamp of its last stored row
+
+    def series(self, name, fields):
+        """Open (creating if writable) a series; returns None if it does not exist read-only"""
+        with self.lock:
+            if name not in self._series:
+                if not self.writable and not os.path.exists(os.path.join(self.directory, f'{name}.raw')):
+                    return None
+                self._series[name] = TimeSeries(self.directory, name, fields, self.writable)
+            return self._series[name]
+
+    def traffic(self):
+        return self.series('traffic', ('traffic',))
+
+    def server(self, server_id):
+        return self.series(server_series_name(server_id), METRIC_COLUMNS)
+
+    def record_traffic(self, timestamp, traffic):
+        if self.writable:
+            series = self.traffic()
+            with self.lock:
+                series.append(timestamp, [traffic])
+
+    def record_fleet(self, fleet):
+        """Append the rows of a FleetMetrics table that changed since they were last stored"""
+        if not self.writable or fleet is self._last_fleet:
+            return
+        self._last_fleet = fleet
+        rows = np.column_stack([fleet.columns[name] for name in METRIC_COLUMNS])
+        for slot, server_id in enumerate(fleet.server_ids):
+            timestamp = float(fleet.last_update[slot])
+            series = self.server(server_id)
+            with self.lock:
+                if server_id not in self._last_recorded:
+                    last = series.raw.last()
+                    self._last_recorded[server_id] = float(last['ts']) if last is not None else 0.0
+                # Rows a partial update did not touch keep their timestamp and are not stored again
+                if timestamp > self._last_recorded[server_id]:
+                    series.append(timestamp, rows[slot])
+                    self._last_recorded[server_id] = timestamp
+
+    def release_servers(self, server_ids):
+        """Close the series of servers that left the fleet; their files stay on disk"""
+        with self.lock:
+            for server_id in server_ids:
+                series = self._series.pop(server_series_name(server_id), None)
+                if series is not None:
+                    series.close()
+                self._last_recorded.pop(server_id, None)
+
+    def traffic_tail(self, n):
+        """Last `n` traffic samples as (timestamps, values); reads only the end of the file"""
+        series = self.traffic()
+        if series is None:
+            return np.zeros(0), np.zeros(0)
+        with self.lock:
+            timestamps, values = series.tail(n)
+        return timestamps, values[:, 0]
+
+    def compact(self, now=None):
+        """Apply retention to every open series; returns the number of records dropped"""
+        if not self.writable:
+            return 0
+        now = time.time() if now is None else now
+        with self.lock:
+            return sum(series.compact(now, self.retention) for series in self._series.values())
+
+    def flush(self):
+        with self.lock:
+            for series in self._series.values():
+                series.flush()
+
+    def close(self):
+        with self.lock:
+            for series in self._series.values():
+                series.close()
+            self._series.clear()
+            self._lock_file.close()
@@ -0,0 +1,262 @@
+import threading
+
+import numpy as np
+
+from anomaly import StreamingDetector, detector_params
+
+DEFAULT_TRAFFIC_SERIES = {
+    'max_series': 100000,
+    'window': 32,
+    'tick_interval': 5.0,
+    'idle_ttl': 3600.0,
+    'level_alpha': 0.3,
+    'trend_beta': 0.05,
+    'tenant_header': 'X-Tenant',
+    'default_tenant': 'default',
+    'route_depth': 2,
+    'anomaly_detection': {}
+}
+
+SORT_FIELDS = ('rate', 'forecast', 'score')
+
+
+def route_of(path, depth=2):
+    """The first `depth` segments of a request path, so ids deeper in the path don't explode the key space"""
+    segments = [segment for segment in path.split('?', 1)[0].split('/') if segment]
+    return '/' + '/'.join(segments[:depth])
+
+
+class TrafficSeriesStore:
+    """Request-rate series per key, e.g. (tenant, route), all advanced together once per tick.
+
+    `record` only bumps a pending count in a dict under a short lock, so the
+    request path never touches the arrays. `tick` turns the counts into one
+    rate sample for every live series (a series with no requests gets a 0)
+    and advances all of them in one vectorized pass: a ring of the last
+    `window` rates, a Holt level and trend for forecasts, and a
+    StreamingDetector for spikes. State lives in NumPy arrays indexed by
+    slot that grow by doubling up to `max_series`; past that, and for
+    series idle longer than `idle_ttl` seconds, the least recently active
+    series are evicted and their slots reused.
+    """
+
+    def __init__(self, config=None, initial_capacity=1024):
+        self.config = {**DEFAULT_TRAFFIC_SERIES, **(config or {})}
+        self.window = self.config['window']
+        self.max_series = self.config['max_series']
+        self.lock = threading.Lock()  # guards the pending counts
+        self.state_lock = threading.Lock()  # guards the arrays: tick vs. queries
+        self._pending = {}
+        self.slots = {}  # key -> slot
+        self.keys = []  # slot -> key, None when free
+        self.free = []
+        self.ticks = 0
+        self.last_tick = None
+        self.evicted = 0
+        self.dropped = 0  # new series turned away in a tick that had more than max_series
+        capacity = max(1, min(initial_capacity, self.max_series))
+        self.live = np.zeros(0, dtype=bool)
+        self.rates = np.zeros((0, self.window), dtype=np.float32)
+        self.first_tick = np.zeros(0, dtype=np.int64)
+        self.last_active = np.zeros(0)
+        self.level = np.zeros(0)
+        self.trend = np.zeros(0)
+        self.spikes = np.zeros(0, dtype=np.int8)
+        self.detector = StreamingDetector(0, **detector_params(self.config['anomaly_detection']))
+        self._grow(capacity)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, key):
+        return key in self.slots
+
+    @property
+    def capacity(self):
+        return len(self.live)
+
+    def record(self, key, amount=1):
+        """Count `amount` requests for `key` in the current tick"""
+        with self.lock:
+            self._pending[key] = self._pending.get(key, 0) + amount
+
+    def _grow(self, capacity):
+        old = self.capacity
+        for name in ('live', 'first_tick', 'last_active', 'level', 'trend', 'spikes'):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+        rates = np.zeros((capacity, self.window), dtype=np.float32)
+        rates[:old] = self.rates
+        self.rates = rates
+        self.detector.resize(capacity)
+        self.keys.extend([None] * (capacity - old))
+        # Popped from the end, so low slots are used first
+        self.free.extend(range(capacity - 1, old - 1, -1))
+
+    def _evict(self, slots):
+        for slot in slots.tolist():
+            del self.slots[self.keys[slot]]
+            self.keys[slot] = None
+            self.free.append(slot)
+        self.live[slots] = False
+        self.evicted += len(slots)
+
+    def _least_recent(self, count):
+        rows = np.flatnonzero(self.live)
+        if count >= len(rows):
+            return rows
+        return rows[np.argpartition(self.last_active[rows], count)[:count]]
+
+    def _allocate(self, keys, now):
+        shortfall = len(keys) - len(self.free)
+        if shortfall > 0 and self.capacity < self.max_series:
+            self._grow(min(self.max_series, max(2 * self.capacity, self.capacity + shortfall)))
+            shortfall = len(keys) - len(self.free)
+        if shortfall > 0:
+            self._evict(self._least_recent(shortfall))
+        if len(keys) > len(self.free):
+            self.dropped += len(keys) - len(self.free)
+            keys = keys[:len(self.free)]
+
+        slots = np.array([self.free.pop() for _ in keys], dtype=np.int64)
+        for key, slot in zip(keys, slots.tolist()):
+            self.slots[key] = slot
+            self.keys[slot] = key
+        self.live[slots] = True
+        self.rates[slots] = 0.0
+        self.first_tick[slots] = self.ticks
+        self.last_active[slots] = now
+        self.level[slots] = 0.0
+        self.trend[slots] = 0.0
+        self.spikes[slots] = 0
+        self.detector.reset(slots)
+
+    def tick(self, now):
+        """Close the current interval: one rate sample per live series; returns the events found.
+
+        Events are (key, rate, baseline, score) for series whose rate spiked.
+        """
+        with self.lock:
+            pending, self._pending = self._pending, {}
+        config = self.config
+        with self.state_lock:
+            elapsed = now - self.last_tick if self.last_tick is not None else config['tick_interval']
+            self.last_tick = now
+
+            keys = list(pending)
+            slot_of = self.slots.get
+            found = np.fromiter((slot_of(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+            known = found >= 0
+            # Series active this tick are the most recent, so eviction never picks them
+            self.last_active[found[known]] = now
+            idle = np.flatnonzero(self.live & (self.last_active < now - config['idle_ttl']))
+            if len(idle):
+                self._evict(idle)
+            if not known.all():
+                evicted = self.evicted
+                new = np.flatnonzero(~known)
+                self._allocate([keys[index] for index in new.tolist()], now)
+                if self.evicted != evicted:
+                    # Only a tick with more new series than room evicts active ones; look every key up again
+                    new = np.arange(len(keys))
+                found[new] = np.fromiter((slot_of(keys[index], -1) for index in new.tolist()), dtype=np.int64)
+
+            counts = np.zeros(self.capacity)
+            tracked = found >= 0
+            counts[found[tracked]] = np.fromiter(pending.values(), dtype=np.float64, count=len(keys))[tracked]
+            rows = np.flatnonzero(self.live)
+            rates = counts[rows] / max(elapsed, 1e-9)
+            self.rates[rows, self.ticks % self.window] = rates
+
+            alpha, beta = config['level_alpha'], config['trend_beta']
+            fresh = self.first_tick[rows] == self.ticks
+            level, trend = self.level[rows], self.trend[rows]
+            new_level = np.where(fresh, rates, alpha * rates + (1 - alpha) * (level + trend))
+            self.trend[rows] = np.where(fresh, 0.0, beta * (new_level - level) + (1 - beta) * trend)
+            self.level[rows] = new_level
+
+            baseline = self.detector.mean[rows]
+            scores, spikes, _ = self.detector.update(rates, rows)
+            self.spikes[rows] = spikes
+            self.ticks += 1
+            return [
+                (self.keys[rows[i]], float(rates[i]), float(baseline[i]), float(scores[i]))
+                for i in np.flatnonzero(spikes > 0).tolist()
+            ]
+
+    def _rows(self, tenant=None, spiking=False):
+        if tenant is not None:
+            rows = np.array([slot for key, slot in self.slots.items() if key[0] == tenant], dtype=np.int64)
+        else:
+            rows = np.flatnonzero(self.live)
+        if spiking:
+            rows = rows[self.spikes[rows] > 0]
+        return rows
+
+    def _samples(self, rows):
+        return np.minimum(self.window, self.ticks - self.first_tick[rows])
+
+    def latest(self, rows):
+        return self.rates[rows, (self.ticks - 1) % self.window].astype(np.float64)
+
+    def forecast(self, rows, steps=1):
+        """Holt forecast `steps` ticks ahead for slot `rows`"""
+        return np.maximum(0.0, self.level[rows] + steps * self.trend[rows])
+
+    def query(self, tenant=None, spiking=False, sort='rate', limit=100, steps=1):
+        """Summaries of the top `limit` series by `sort` ('rate', 'forecast' or 'score'), highest first"""
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort '{sort}', expected one of {list(SORT_FIELDS)}")
+        with self.state_lock:
+            rows = self._rows(tenant, spiking)
+            if sort == 'rate':
+                order = self.latest(rows)
+            elif sort == 'forecast':
+                order = self.forecast(rows, steps)
+            else:
+                order = self.detector.last_score[rows]
+            if limit and len(rows) > limit:
+                top = np.argpartition(-order, limit)[:limit]
+                rows, order = rows[top], order[top]
+            rows = rows[np.argsort(-order, kind='stable')]
+            return [self._summary(row, steps) for row in rows.tolist()]
+
+    def _summary(self, row, steps):
+        return {
+            'key': self.keys[row],
+            # Rates are stored as float32; rounding keeps the float64 conversion from showing noise
+            'rate': round(float(self.rates[row, (self.ticks - 1) % self.window]), 3),
+            'forecast': float(self.forecast(row, steps)),
+            'baseline': float(self.detector.mean[row]),
+            'score': float(self.detector.last_score[row]),
+            'spike': bool(self.spikes[row] > 0),
+            'samples': int(min(self.window, self.ticks - self.first_tick[row]))
+        }
+
+    def series(self, key, steps=1):
+        """Summary and rate history (oldest first) of one series, or None if it is not tracked"""
+        with self.state_lock:
+            row = self.slots.get(key)
+            if row is None:
+                return None
+            samples = int(self._samples(row))
+            columns = np.arange(self.ticks - samples, self.ticks) % self.window
+            history = np.round(self.rates[row, columns].astype(np.float64), 3).tolist()
+            return {**self._summary(row, steps), 'history': history}
+
+    def stats(self):
+        return {
+            'series': len(self.slots),
+            'capacity': self.capacity,
+            'max_series': self.max_series,
+            'ticks': self.ticks,
+            'evicted': self.evicted,
+            'dropped': self.dropped,
+            'bytes': sum(array.nbytes for array in (
+                self.live, self.rates, self.first_tick, self.last_active, self.level, self.trend, self.spikes
+            )) + sum(getattr(self.detector, name).nbytes for name in (
+                'mean', 'var', 'count', 'cusum_high', 'cusum_low', 'last_score'
+            ))
+        }
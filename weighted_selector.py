@@ -0,0 +1,53 @@
+import random
+
+
+class AliasTable:
+    """Weighted random selection in O(1) per pick (Vose's alias method).
+
+    Building the table is O(n) and happens off the request path whenever
+    weights change; each pick then costs one random number and two list
+    lookups regardless of how many items there are.
+    """
+
+    def __init__(self, items, weights, rng=None):
+        self.items = list(items)
+        self._random = (rng or random).random
+        n = len(self.items)
+        self._prob = [1.0] * n
+        self._alias = list(range(n))
+        if n == 0:
+            return
+
+        weights = [max(0.0, float(w)) for w in weights]
+        total = sum(weights)
+        if total <= 0:
+            return  # all weights zero: uniform selection
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large[-1]
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            if scaled[l] < 1.0:
+                small.append(large.pop())
+        # Whatever is left is 1.0 up to rounding error
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.items)
+
+    def pick(self):
+        """Return one item with probability proportional to its weight, or None if empty"""
+        n = len(self.items)
+        if not n:
+            return None
+        u = self._random() * n
+        i = int(u)
+        if u - i < self._prob[i]:
+            return self.items[i]
+        return self.items[self._alias[i]]